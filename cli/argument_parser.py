@@ -38,9 +38,14 @@ This script contains functions that create an argument parser object.
 This object is to be used by the main command line interface.
 """
 
+import copy
+import shlex
 import argparse
 
 from treebank_parser import treebank_formats as formats
+from treebank_parser import output_writer as tbp_output_writer
+from treebank_parser import async_io as tbp_async_io
+from treebank_parser import treebank_directory_parser
 
 from cli.argument_parser_CoNLLU import add_arguments_CoNLLU_parser
 from cli.argument_parser_head_vector import add_arguments_head_vector_parser
@@ -52,6 +57,18 @@ class ConditionallyRequired(argparse.Action):
 			parser.error(f"{option_string} can only be used when -t/--input-treebank-collection is specified")
 		setattr(namespace, self.dest, True)
 
+def shard_type(value):
+	r"""
+	Converts a string "i/N" into the pair of integers (i, N), with 0 <= i < N.
+	"""
+	try:
+		index, num_shards = map(int, value.split('/'))
+	except ValueError:
+		raise argparse.ArgumentTypeError(f"invalid shard '{value}': expected the form i/N")
+	if num_shards < 1 or not (0 <= index < num_shards):
+		raise argparse.ArgumentTypeError(f"invalid shard '{value}': expected 0 <= i < N")
+	return index, num_shards
+
 def add_arguments_main_parser(parser):
 	r"""
 	Adds the necessary arguments to the main CLI parser (not for the
@@ -63,7 +80,7 @@ def add_arguments_main_parser(parser):
 		'-i', '--input-treebank-file',
 		metavar = 'input_treebank_file',
 		type = str,
-		help = 'Name of the input treebank file to be parsed.'
+		help = 'Name of the input treebank file to be parsed. Use "-" to read the treebank from the standard input.'
 	)
 	group.add_argument(
 		'-t', '--input-treebank-collection',
@@ -71,6 +88,30 @@ def add_arguments_main_parser(parser):
 		type = str,
 		help = 'Name of the input treebank collection to be parsed.'
 	)
+	group.add_argument(
+		'-a', '--input-treebank-archive',
+		metavar = 'input_treebank_archive',
+		type = str,
+		help = 'Name of a tar archive (possibly compressed with gzip, bzip2 or xz) of treebank files to be parsed without extracting it, such as a release of the Universal Dependencies treebanks. Use "-" to read the archive from the standard input.'
+	)
+	group.add_argument(
+		'-d', '--input-treebank-directory',
+		metavar = 'input_treebank_directory',
+		type = str,
+		help = 'Name of a directory where the treebank files to be parsed are searched, also in its subdirectories.'
+	)
+	group.add_argument(
+		'-j', '--jobs-file',
+		metavar = 'jobs_file',
+		type = str,
+		help = 'Name of a manifest file listing several jobs to be run within this process. Each line is either of the form "input output format [actions...]" or a JSON object with keys "input", "output", "format" and "actions".'
+	)
+	group.add_argument(
+		'--daemon',
+		metavar = 'socket_file',
+		type = str,
+		help = 'Run as a daemon that serves parsing requests over the Unix domain socket socket_file. Each request is a JSON object in a single line with keys "format", "actions" and either "data" (the contents of a treebank) or "input" (the name of a treebank file). The response is a JSON object in a single line with the head vectors.'
+	)
 
 	parser.add_argument(
 		'-c', '--consistency-in-sentences',
@@ -82,12 +123,203 @@ def add_arguments_main_parser(parser):
 		help = 'When processing a treebank collection, a sentence of a treebank will not be written to the output if the equivalent sentence in another treebank is discarded.'
 	)
 
+	parser.add_argument(
+		'--checkpoint-interval',
+		metavar = 'seconds',
+		default = None,
+		type = float,
+		required = False,
+		help = 'Save a checkpoint of the parse of every treebank file every this many seconds, so that an interrupted run can be continued with --resume. The head vectors are written into the file "<output>.partial" as they are made, and the checkpoint is saved in "<output>.checkpoint". Default: no checkpoints (60 seconds with --resume).'
+	)
+	parser.add_argument(
+		'--resume',
+		default = False,
+		action = 'store_true',
+		required = False,
+		help = 'Continue an interrupted run from its last checkpoint (see --checkpoint-interval). The arguments must be the same as those of the interrupted run. When processing a treebank collection, the treebanks whose output file is complete are not parsed again.'
+	)
+	parser.add_argument(
+		'--work-queue',
+		default = False,
+		action = 'store_true',
+		required = False,
+		help = 'When processing a treebank collection, share the work with other processes (possibly on other machines) that run the same command on the same output directory. The processes claim treebanks from a queue of lock files in the output directory, and the last one merges the results.'
+	)
+	parser.add_argument(
+		'--chunk-sentences',
+		metavar = 'num_sentences',
+		default = 0,
+		type = int,
+		required = False,
+		help = 'With --work-queue, split every treebank into tasks of this many sentences on average, with a similar estimated cost, instead of making one task per treebank. Default: 0 (one task per treebank).'
+	)
+	parser.add_argument(
+		'--lease-timeout',
+		metavar = 'seconds',
+		default = 600,
+		type = float,
+		required = False,
+		help = 'With --work-queue, time after which the tasks of a process that stopped refreshing its leases (e.g., because it crashed) can be claimed by other processes. Default: 600.'
+	)
+
 	parser.add_argument(
 		'-o', '--output',
 		metavar = 'output',
 		type = str,
-		required = True,
-		help = 'If a single treebank file was passed, this is the name of the output .heads file. If a treebank collection was passed, this is the output directory.'
+		required = False,
+		help = 'If a single treebank file was passed, this is the name of the output .heads file. If a treebank collection, archive or directory was passed, this is the output directory. Required unless -j/--jobs-file is used. Use "-" to write the head vectors to the standard output as soon as they are made (only with -i).'
+	)
+	parser.add_argument(
+		'--variant',
+		metavar = '"output [actions...]"',
+		action = 'append',
+		default = [],
+		required = False,
+		help = 'Also write into the file output the head vectors obtained with the given actions of the format command instead of those passed to the format command (e.g., --variant "punct.heads --RemovePunctuationMarks"). The input file is read only once for all the variants. Can be used several times (only with -i).'
+	)
+	parser.add_argument(
+		'--single-pass',
+		default = False,
+		action = 'store_true',
+		required = False,
+		help = 'When running the jobs in -j/--jobs-file, run the jobs with the same input file and format together, reading the input file only once (as with --variant).'
+	)
+	parser.add_argument(
+		'--batch-size',
+		metavar = 'num_head_vectors',
+		default = 1,
+		type = int,
+		required = False,
+		help = 'When writing to the standard output (-o -), number of head vectors written at once before flushing the output. When reading from the standard input (-i -) or writing to the standard output, (CoNLL-U only) also the number of sentences read before they are processed. Default: 1.'
+	)
+	parser.add_argument(
+		'--sentence-batch-size',
+		metavar = 'num_sentences',
+		default = 1000,
+		type = int,
+		required = False,
+		help = '(CoNLL-U only) Number of sentences read before the actions are applied to all of them at once. Not used when reading from the standard input or writing to the standard output (see --batch-size). Default: 1000.'
+	)
+	parser.add_argument(
+		'--output-buffer-size',
+		metavar = 'bytes',
+		default = tbp_output_writer.DefaultBufferSize,
+		type = int,
+		required = False,
+		help = f'Size of the blocks in which the head vectors are written into the output files. Default: {tbp_output_writer.DefaultBufferSize}.'
+	)
+	parser.add_argument(
+		'--fsync',
+		default = tbp_output_writer.FsyncClose,
+		choices = [tbp_output_writer.FsyncNever, tbp_output_writer.FsyncClose, tbp_output_writer.FsyncAlways],
+		required = False,
+		help = f'When to force the contents of the output files to the disk: "{tbp_output_writer.FsyncNever}", "{tbp_output_writer.FsyncClose}" (once, before the complete file replaces the output file) or "{tbp_output_writer.FsyncAlways}" (after every block). Default: {tbp_output_writer.FsyncClose}.'
+	)
+	parser.add_argument(
+		'--quarantine',
+		default = False,
+		action = 'store_true',
+		required = False,
+		help = 'Write a record of every sentence rejected because of an error (its number, ID, starting line and error code) into the file "<output>.quarantine.jsonl", in JSON Lines format, instead of logging the errors of every sentence. Only the number of sentences rejected with every error is logged.'
+	)
+	parser.add_argument(
+		'--sentence-ids',
+		default = False,
+		action = 'store_true',
+		required = False,
+		help = 'Write the file "<output>.ids.tsv" with one line per head vector of the output file: the number of the sentence, its ID ("_" if unknown) and its starting line, separated by tabs.'
+	)
+	parser.add_argument(
+		'--scan-stats',
+		default = False,
+		action = 'store_true',
+		required = False,
+		help = 'Do not make any head vector. Instead, read the input treebank file without building any tree, and write into the output file the histograms of the length of its sentences before and after removing punctuation marks and/or function words, and the number of multiword tokens, empty tokens and tokens whose head is not an integer. The actions are not applied.'
+	)
+	parser.add_argument(
+		'--async-io',
+		default = False,
+		action = 'store_true',
+		required = False,
+		help = 'Read the input files ahead of the parse, and write the head vectors behind it, in separate threads, so that parsing overlaps with reading and writing.'
+	)
+	parser.add_argument(
+		'--io-queue-size',
+		metavar = 'num_chunks',
+		default = tbp_async_io.DefaultQueueSize,
+		type = int,
+		required = False,
+		help = f'With --async-io, maximum number of chunks read ahead (of {tbp_async_io.DefaultChunkSize} bytes) or blocks of head vectors waiting to be written (of --output-buffer-size bytes) kept in memory. Default: {tbp_async_io.DefaultQueueSize}.'
+	)
+	parser.add_argument(
+		'--tokens-cache',
+		default = False,
+		action = 'store_true',
+		required = False,
+		help = 'Keep the tokens of every CoNLL-U treebank file in a binary cache file "<input>.tbpcache", written the first time the whole file is parsed, and read it instead of the treebank file in later runs while the treebank file does not change. Ignored with checkpoints.'
+	)
+	parser.add_argument(
+		'--cache-dir',
+		metavar = 'cache_directory',
+		default = None,
+		type = str,
+		required = False,
+		help = 'Like --tokens-cache, but keep the cache files in the directory cache_directory (created if it does not exist) instead of next to the treebank files.'
+	)
+	parser.add_argument(
+		'--pattern',
+		metavar = 'pattern',
+		default = treebank_directory_parser.DefaultPattern,
+		type = str,
+		required = False,
+		help = f'With -a/--input-treebank-archive or -d/--input-treebank-directory, shell-style pattern of the names (without directories) of the treebank files to be parsed. Default: "{treebank_directory_parser.DefaultPattern}".'
+	)
+	parser.add_argument(
+		'--workers',
+		metavar = 'num_workers',
+		default = 1,
+		type = int,
+		required = False,
+		help = 'Number of worker processes used to run the jobs listed in -j/--jobs-file or to parse the treebanks of -a/--input-treebank-archive, -d/--input-treebank-directory or -t/--input-treebank-collection with -c, or number of worker threads serving requests in --daemon mode. Default: 1.'
+	)
+	parser.add_argument(
+		'--shard',
+		metavar = 'i/N',
+		default = None,
+		type = shard_type,
+		required = False,
+		help = 'Process only the i-th of N shards of the sentences of the treebank (0 <= i < N). Sentence k (starting at 1) belongs to shard (k - 1) mod N, unless --select-by id is used.'
+	)
+	parser.add_argument(
+		'--sample-rate',
+		metavar = 'p',
+		default = None,
+		type = float,
+		required = False,
+		help = 'Process only a random sample of the sentences: every sentence is selected with probability p (0 < p <= 1). The sample is reproducible: it only depends on --seed and on the sentence number (or ID, see --select-by).'
+	)
+	parser.add_argument(
+		'--seed',
+		metavar = 's',
+		default = 0,
+		type = int,
+		required = False,
+		help = 'Seed of the sample made with --sample-rate. Default: 0.'
+	)
+	parser.add_argument(
+		'--max-sentences',
+		metavar = 'K',
+		default = None,
+		type = int,
+		required = False,
+		help = 'Process at most K sentences (among those selected by --shard and --sample-rate) and stop reading the treebank afterwards.'
+	)
+	parser.add_argument(
+		'--select-by',
+		default = 'number',
+		choices = ['number', 'id'],
+		required = False,
+		help = 'Select the sentences for --shard and --sample-rate by their number in the file, or by the hash of their ID (the "sent_id" comment of CoNLL-U files). Sentences without ID are selected by number. Default: number.'
 	)
 	parser.add_argument(
 		'--verbose',
@@ -170,7 +402,7 @@ def create_parser():
 	# add a subparser for the treebank format.
 	subparsers = parser.add_subparsers(
 		help = 'Choose a format command for the input treebank file.',
-		required = True,
+		required = False,
 		dest = 'treebank_format'
 	)
 	
@@ -178,3 +410,140 @@ def create_parser():
 	create_format_subparsers(subparsers)
 
 	return parser
+
+def make_variant_arguments(parser, args):
+	r"""
+	Returns a list with the arguments of every variant in `args.variant`, a
+	list of strings "output [actions...]". The arguments of a variant are a
+	copy of `args` where the output file and the actions of the format command
+	are those of the variant. Calls `parser.error` if some variant is not
+	valid.
+	"""
+	
+	add_format_arguments = {
+		formats.CoNLLU_key_str: add_arguments_CoNLLU_parser,
+		formats.Stanford_key_str: add_arguments_Stanford_parser,
+		formats.head_vector_key_str: add_arguments_head_vector_parser
+	}
+	format_parser = argparse.ArgumentParser(prog = f"--variant output {args.treebank_format}")
+	add_format_arguments[args.treebank_format](format_parser)
+	
+	variant_args = []
+	for variant in args.variant:
+		fields = shlex.split(variant)
+		if len(fields) == 0:
+			parser.error("--variant needs at least an output file")
+		output, actions = fields[0], fields[1:]
+		if output == "-" or output == args.output or output in [a.output for a in variant_args]:
+			parser.error(f"the output file '{output}' of --variant must be a file different from the other output files")
+		
+		actions_args = format_parser.parse_args(actions)
+		
+		a = copy.copy(args)
+		for key, value in vars(actions_args).items():
+			setattr(a, key, value)
+		a.output = output
+		a.variant = []
+		variant_args.append(a)
+	
+	return variant_args
+
+def check_arguments(parser, args):
+	r"""
+	Checks the arguments that cannot be checked by `parser` on its own. Calls
+	`parser.error` (which terminates the program) if something is wrong.
+	"""
+	
+	if args.workers < 1:
+		parser.error("--workers must be at least 1")
+	if args.batch_size < 1:
+		parser.error("--batch-size must be at least 1")
+	if args.sentence_batch_size < 1:
+		parser.error("--sentence-batch-size must be at least 1")
+	if args.output_buffer_size < 1:
+		parser.error("--output-buffer-size must be at least 1")
+	if args.io_queue_size < 1:
+		parser.error("--io-queue-size must be at least 1")
+	if args.sample_rate is not None and not (0 < args.sample_rate <= 1):
+		parser.error("--sample-rate must be in the interval (0, 1]")
+	if args.max_sentences is not None and args.max_sentences < 1:
+		parser.error("--max-sentences must be at least 1")
+	if args.work_queue:
+		if args.input_treebank_collection is None:
+			parser.error("--work-queue can only be used together with -t")
+		if args.consistency_in_sentences:
+			parser.error("--work-queue cannot be used together with -c")
+		if args.chunk_sentences > 0 and args.max_sentences is not None:
+			# every chunk would select its own first sentences
+			parser.error("--max-sentences cannot be used together with --work-queue and --chunk-sentences")
+	if args.resume and args.checkpoint_interval is None:
+		args.checkpoint_interval = 60
+	if args.checkpoint_interval is not None:
+		if args.checkpoint_interval < 0:
+			parser.error("--checkpoint-interval cannot be negative")
+		if args.input_treebank_file == "-" or args.output == "-":
+			parser.error("checkpoints cannot be used with the standard input or output")
+		if args.input_treebank_archive is not None:
+			parser.error("checkpoints cannot be used together with -a")
+		if args.consistency_in_sentences:
+			parser.error("checkpoints cannot be used together with -c")
+		if args.work_queue:
+			parser.error("checkpoints cannot be used together with --work-queue")
+	if args.quarantine:
+		if args.output == "-":
+			parser.error("--quarantine cannot be used when writing to the standard output")
+		if args.work_queue:
+			parser.error("--quarantine cannot be used together with --work-queue")
+	if args.sentence_ids:
+		if args.output == "-":
+			parser.error("--sentence-ids cannot be used when writing to the standard output")
+		if args.work_queue:
+			parser.error("--sentence-ids cannot be used together with --work-queue")
+	if args.scan_stats:
+		if args.input_treebank_file is None:
+			parser.error("--scan-stats can only be used together with -i")
+		if args.checkpoint_interval is not None:
+			parser.error("--scan-stats cannot be used together with checkpoints")
+		if len(args.variant) > 0:
+			parser.error("--scan-stats cannot be used together with --variant")
+	if len(args.variant) > 0:
+		if args.input_treebank_file is None:
+			parser.error("--variant can only be used together with -i")
+		if args.checkpoint_interval is not None:
+			parser.error("--variant cannot be used together with checkpoints")
+	if args.chunk_sentences < 0:
+		parser.error("--chunk-sentences cannot be negative")
+	if args.lease_timeout <= 0:
+		parser.error("--lease-timeout must be positive")
+	
+	if args.jobs_file is not None or args.daemon is not None:
+		# the input, output and format of every job (or request) are given in
+		# the jobs file (or in the request)
+		if args.treebank_format is not None:
+			parser.error("a format command cannot be used together with -j/--jobs-file or --daemon")
+		if args.scan_stats:
+			parser.error("--scan-stats cannot be used together with -j/--jobs-file or --daemon")
+		if args.jobs_file is not None and args.single_pass and args.checkpoint_interval is not None:
+			parser.error("--single-pass cannot be used together with checkpoints")
+		if args.daemon is not None:
+			# the head vectors of a request are not written into any file
+			if args.checkpoint_interval is not None:
+				parser.error("checkpoints cannot be used together with --daemon")
+			if args.quarantine:
+				parser.error("--quarantine cannot be used together with --daemon")
+			if args.sentence_ids:
+				parser.error("--sentence-ids cannot be used together with --daemon")
+		return
+	
+	if args.output is None:
+		parser.error("the following arguments are required: -o/--output")
+	if args.treebank_format is None:
+		parser.error("a format command is required: choose from " + ", ".join(formats.treebankformat_key_str.values()))
+	
+	args.variant_args = make_variant_arguments(parser, args)
+	
+	if args.output == "-":
+		if args.input_treebank_file is None:
+			parser.error("-o - can only be used together with -i")
+		# the standard output is reserved for the head vectors
+		args.quiet = True
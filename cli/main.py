@@ -54,21 +54,27 @@ to see the usage of the command line for the specific format FORMAT. Usage examp
 	python3 cli/main.py -i catalan.conllu -o catalan.heads --verbose 2 --lal CoNLLU
 	python3 cli/main.py -i catalan.conllu -o catalan.heads --verbose 2 CoNLLU --RemoveFunctionWords
 	python3 cli/main.py -i catalan.conllu -o catalan.heads --verbose 2 CoNLLU --RemoveFunctionWords --DiscardSentencesShorter 3
+	python3 cli/main.py -i - -o - CoNLLU --RemovePunctuationMarks < catalan.conllu > catalan.heads
+	python3 cli/main.py -i catalan.conllu -o catalan.stats --scan-stats CoNLLU
+	python3 cli/main.py -a ud-treebanks.tgz -o output/ --workers 4 CoNLLU
+	python3 cli/main.py -d ud-treebanks/ -o output/ --workers 4 CoNLLU
+	python3 cli/main.py -j jobs.txt --workers 4
+	python3 cli/main.py --daemon /tmp/treebank-parser.sock --workers 4
 """
 
+import os
 import sys
 import logging
 
 # set up paths before actual cli's start up
-import os
 import pathlib
 sys.path.insert(0, str(pathlib.Path(__file__).parent.absolute()) + "/..")
-del os, pathlib
+del pathlib
 # finish setting up path
 
 import argument_parser
 
-from cli import run_parser
+from cli import run_parser, run_jobs, run_daemon
 
 # create the parser object
 parser = argument_parser.create_parser()
@@ -85,6 +91,7 @@ if len(sys.argv) == 2:
 		args = parser.parse_args(sys.argv[1:])
 else:
 	args = parser.parse_args(sys.argv[1:])
+argument_parser.check_arguments(parser, args)
 
 # configure logging
 run_parser.configure_logging(args)
@@ -100,4 +107,16 @@ if not r[0]:
 	logging.critical(r[1])
 	exit(1)
 
-run_parser.run(args, lal)
+if args.jobs_file is not None:
+	exit(run_jobs.run(args, lal))
+if args.daemon is not None:
+	exit(run_daemon.run(args, lal))
+
+try:
+	run_parser.run(args, lal)
+except BrokenPipeError:
+	# the head vectors were written to the standard output (-o -) and the
+	# reader stopped reading them
+	devnull = os.open(os.devnull, os.O_WRONLY)
+	os.dup2(devnull, sys.stdout.fileno())
+	exit(1)
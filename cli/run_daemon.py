@@ -0,0 +1,222 @@
+################################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+################################################################################
+
+r"""
+Runs the treebank parser as a daemon that serves parsing requests over a Unix
+domain socket. The LAL module and the parser classes are loaded only once, when
+the daemon starts.
+
+Every request is a JSON object in a single line, such as
+
+	{"format": "CoNLL-U", "actions": ["--RemovePunctuationMarks"], "data": "1\tThe\t..."}
+	{"format": "CoNLL-U", "actions": [], "input": "/path/to/treebank.conllu"}
+
+where `data` is the contents of a treebank and `input` is the name of a treebank
+file (only one of the two is needed). The daemon answers every request with a
+JSON object in a single line:
+
+	{"ok": true, "num_sentences": 2, "head_vectors": ["0 1 1", "2 0"]}
+	{"ok": false, "error": "..."}
+
+A client may send several requests through the same connection. Requests are
+served concurrently by a pool of worker threads.
+"""
+
+import io
+import os
+import json
+import signal
+import socket
+import logging
+import functools
+import threading
+import socketserver
+import concurrent.futures
+
+from cli import argument_parser, run_parser, run_jobs
+from treebank_parser import treebank_formats
+
+# the LAL module used to serve the requests
+_lal_module = None
+
+# argparse objects are not meant to be shared among threads
+_arguments_lock = threading.Lock()
+
+@functools.lru_cache(maxsize = 256)
+def _make_arguments(treebank_format, actions, global_arguments):
+	r"""
+	Returns the parsed arguments for a request of format `treebank_format` with
+	the action flags in the tuple `actions` and the global options of the
+	daemon in the tuple `global_arguments` (see
+	`run_jobs.make_global_argument_list`).
+	"""
+	argument_list = list(global_arguments) + ["-i", "", "-o", "", treebank_format] + list(actions)
+	with _arguments_lock:
+		return argument_parser.create_parser().parse_args(argument_list)
+
+def serve_request(request, args):
+	r"""
+	Serves a single request (a dictionary) and returns the response (another
+	dictionary).
+	"""
+	
+	treebank_format = request.get("format")
+	if treebank_format not in treebank_formats.treebankformat_key_str.values():
+		return {"ok": False, "error": f"Unknown format '{treebank_format}'"}
+	
+	if "data" in request:
+		input_file = io.StringIO(str(request["data"]))
+	elif "input" in request:
+		input_file = str(request["input"])
+	else:
+		return {"ok": False, "error": "The request needs either 'data' or 'input'"}
+	
+	try:
+		parser_args = _make_arguments(
+			treebank_format,
+			tuple(str(a) for a in request.get("actions", [])),
+			tuple(run_jobs.make_global_argument_list(args))
+		)
+	except SystemExit:
+		return {"ok": False, "error": f"Invalid actions {request.get('actions')}"}
+	
+	try:
+		parser = run_parser.get_parser_module(treebank_format)
+		p = parser.parser(input_file, None, parser_args, _lal_module)
+		p.parse()
+	except Exception as e:
+		return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+	
+	return {
+		"ok": True,
+		"num_sentences": p.get_num_sentences(),
+		"head_vectors": [hv for hv in p.m_head_vector_collection if hv is not None]
+	}
+
+class _request_handler(socketserver.StreamRequestHandler):
+	r"""
+	Handles a connection to the daemon: reads one request per line and writes
+	one response per line.
+	"""
+	def handle(self):
+		for line in self.rfile:
+			if line.strip() == b"": continue
+			
+			try:
+				request = json.loads(line)
+				if not isinstance(request, dict):
+					raise ValueError("the request is not a JSON object")
+				response = serve_request(request, self.server.m_args)
+			except ValueError as e:
+				response = {"ok": False, "error": f"Malformed request: {e}"}
+			
+			self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+			self.wfile.flush()
+
+class _pooled_unix_server(socketserver.UnixStreamServer):
+	r"""
+	A Unix domain socket server whose connections are handled by a fixed pool
+	of worker threads.
+	"""
+	def __init__(self, socket_file, args):
+		super().__init__(socket_file, _request_handler)
+		self.m_args = args
+		self.m_pool = concurrent.futures.ThreadPoolExecutor(max_workers = args.workers)
+	
+	def _process_request_in_pool(self, request, client_address):
+		try:
+			self.finish_request(request, client_address)
+		except Exception:
+			self.handle_error(request, client_address)
+		finally:
+			self.shutdown_request(request)
+	
+	def process_request(self, request, client_address):
+		self.m_pool.submit(self._process_request_in_pool, request, client_address)
+	
+	def server_close(self):
+		super().server_close()
+		self.m_pool.shutdown(wait = True)
+
+def _is_socket_alive(socket_file):
+	r"""
+	Returns whether or not some process is listening at `socket_file`.
+	"""
+	with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+		try:
+			s.connect(socket_file)
+		except OSError:
+			return False
+	return True
+
+def run(args, lal_module):
+	r"""
+	Runs the daemon at the socket `args.daemon` until it is interrupted.
+	
+	Returns the exit status of the daemon.
+	"""
+	
+	global _lal_module
+	_lal_module = lal_module
+	
+	# load all the parser classes now, not when the first request arrives
+	for treebank_format in treebank_formats.treebankformat_key_str.values():
+		run_parser.get_parser_module(treebank_format)
+	
+	if os.path.exists(args.daemon):
+		if _is_socket_alive(args.daemon):
+			logging.critical(f"Another daemon is already listening at '{args.daemon}'.")
+			return 1
+		# left behind by a daemon that did not stop gracefully
+		logging.warning(f"Removing stale socket file '{args.daemon}'.")
+		os.remove(args.daemon)
+	
+	# stop gracefully when the daemon is terminated
+	def _interrupt(signum, frame):
+		signal.signal(signal.SIGTERM, signal.SIG_IGN)
+		raise KeyboardInterrupt()
+	signal.signal(signal.SIGTERM, _interrupt)
+	
+	try:
+		with _pooled_unix_server(args.daemon, args) as server:
+			logging.info(f"Listening at '{args.daemon}' with {args.workers} worker(s)")
+			try:
+				server.serve_forever()
+			except KeyboardInterrupt:
+				logging.info("Daemon interrupted")
+	finally:
+		if os.path.exists(args.daemon):
+			os.remove(args.daemon)
+	
+	return 0
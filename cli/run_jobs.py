@@ -0,0 +1,329 @@
+################################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+################################################################################
+
+r"""
+Runs several jobs of the treebank parser within a single process (or within a
+single pool of worker processes), so that the LAL module and the parser classes
+are loaded only once.
+
+The jobs are listed in a manifest file. Every non-empty line that does not start
+with '#' describes one job and is either
+
+	input output format [actions...]
+
+where `format` is a format command (e.g., `CoNLL-U`) and `actions` are the flags
+of that format command (e.g., `--RemovePunctuationMarks`), or a JSON object
+
+	{"input": "...", "output": "...", "format": "CoNLL-U", "actions": ["--RemovePunctuationMarks"]}
+
+With --single-pass, the jobs with the same input file and format are run
+together, reading the input file only once (see `generic_parser.add_variant`).
+
+With several workers, the jobs with the largest input files are started first,
+and the report shows the utilisation of every worker (the fraction of the run
+it spent running jobs).
+"""
+
+import os
+import json
+import shlex
+import logging
+import time
+
+from cli import argument_parser, run_parser
+from treebank_parser import treebank_formats
+import treebank_parser.worker_pool as tbp_worker_pool
+
+def read_jobs_file(jobs_file):
+	r"""
+	Reads the manifest file `jobs_file` and returns the list of jobs in it. Each
+	job is a dictionary with keys "input", "output", "format", "actions" and
+	"line" (the line number of the job in the manifest).
+	
+	Raises a `ValueError` if some line is not well-formed.
+	"""
+	
+	jobs = []
+	with open(jobs_file, 'r', encoding = "utf-8") as f:
+		for linenumber, line in enumerate(f, start = 1):
+			line = line.strip()
+			if line == "" or line[0] == '#': continue
+			
+			if line[0] == '{':
+				try:
+					contents = json.loads(line)
+				except json.JSONDecodeError as e:
+					raise ValueError(f"Line {linenumber} of '{jobs_file}' is not valid JSON: {e}")
+				
+				missing = [key for key in ["input", "output", "format"] if key not in contents]
+				if len(missing) > 0:
+					raise ValueError(f"Line {linenumber} of '{jobs_file}' lacks the key(s) {missing}")
+				
+				job = {
+					"input": str(contents["input"]),
+					"output": str(contents["output"]),
+					"format": str(contents["format"]),
+					"actions": [str(a) for a in contents.get("actions", [])],
+				}
+			
+			else:
+				fields = shlex.split(line)
+				if len(fields) < 3:
+					raise ValueError(f"Line {linenumber} of '{jobs_file}' should be 'input output format [actions...]'")
+				
+				job = {
+					"input": fields[0],
+					"output": fields[1],
+					"format": fields[2],
+					"actions": fields[3:],
+				}
+			
+			if job["format"] not in treebank_formats.treebankformat_key_str.values():
+				raise ValueError(f"Line {linenumber} of '{jobs_file}' has an unknown format '{job['format']}'")
+			# the standard output is reserved for the report of the jobs
+			if job["output"] == "-":
+				raise ValueError(f"Line {linenumber} of '{jobs_file}' writes to the standard output")
+			
+			job["line"] = linenumber
+			jobs.append(job)
+	
+	return jobs
+
+# global options of the command line passed on to every job: the flags are
+# passed on when they are set, and the other options when they have a value
+_forwarded_flags = [
+	("lal", "--lal"),
+	("resume", "--resume"),
+	("quarantine", "--quarantine"),
+	("sentence_ids", "--sentence-ids"),
+	("async_io", "--async-io"),
+	("tokens_cache", "--tokens-cache"),
+]
+_forwarded_options = [
+	("checkpoint_interval", "--checkpoint-interval"),
+	("sentence_batch_size", "--sentence-batch-size"),
+	("output_buffer_size", "--output-buffer-size"),
+	("fsync", "--fsync"),
+	("io_queue_size", "--io-queue-size"),
+	("cache_dir", "--cache-dir"),
+	("sample_rate", "--sample-rate"),
+	("seed", "--seed"),
+	("max_sentences", "--max-sentences"),
+	("select_by", "--select-by"),
+]
+
+def make_global_argument_list(args):
+	r"""
+	Returns the list of command line arguments with the global options of
+	`args` (verbosity, LAL compilation, sentence selection, output files, ...)
+	that apply to every job.
+	"""
+	
+	argument_list = ["--quiet", "--verbose", str(args.verbose)]
+	for (dest, option) in _forwarded_flags:
+		if getattr(args, dest, False):
+			argument_list += [option]
+	for (dest, option) in _forwarded_options:
+		value = getattr(args, dest, None)
+		if value is not None:
+			argument_list += [option, str(value)]
+	shard = getattr(args, "shard", None)
+	if shard is not None:
+		argument_list += ["--shard", f"{shard[0]}/{shard[1]}"]
+	return argument_list
+
+def make_job_argument_list(job, args):
+	r"""
+	Returns the list of command line arguments that runs job `job` with the
+	global options of `args` (see `make_global_argument_list`).
+	"""
+	
+	argument_list = make_global_argument_list(args)
+	argument_list += ["-i", job["input"], "-o", job["output"], job["format"]]
+	argument_list += job["actions"]
+	return argument_list
+
+def group_jobs(jobs):
+	r"""
+	Returns the list of jobs `jobs` split into groups of jobs with the same
+	input file and format, in order of appearance.
+	"""
+	
+	groups = {}
+	for job in jobs:
+		groups.setdefault((job["input"], job["format"]), []).append(job)
+	return list(groups.values())
+
+def _input_size(group):
+	r"""
+	Returns the size of the input file of the group of jobs `group`, or 0 if
+	it cannot be known.
+	"""
+	try:
+		return os.path.getsize(group[0]["input"])
+	except OSError:
+		return 0
+
+def _run_jobs(group, lal_module):
+	r"""
+	Runs a group of jobs with the same input file and format in a single pass
+	over the input file, using the LAL module `lal_module`: the first job is
+	run by a parser and the others by its variants. Returns a list with a
+	dictionary with the statistics of the run of every job, including the
+	process that ran it ("worker").
+	"""
+	
+	all_stats = [{
+		"line": job["line"],
+		"input": job["input"],
+		"output": job["output"],
+		"ok": False,
+		"error": "",
+		"num_sentences": 0,
+		"num_written": 0,
+		"time": 0.0,
+		"worker": os.getpid(),
+	} for job in group]
+	
+	begin = time.perf_counter()
+	try:
+		parser = run_parser.get_parser_module(group[0]["args"].treebank_format)
+		ps = [parser.parser(job["input"], job["output"], job["args"], lal_module) for job in group]
+		for p in ps[1:]:
+			ps[0].add_variant(p)
+		ps[0].parse()
+		ps[0].dump_contents()
+		
+		for p, stats in zip(ps, all_stats):
+			stats["num_sentences"] = p.get_num_sentences()
+			stats["num_written"] = p.get_num_head_vectors()
+			stats["ok"] = True
+	
+	except Exception as e:
+		for stats in all_stats:
+			stats["error"] = f"{type(e).__name__}: {e}"
+	
+	end = time.perf_counter()
+	for stats in all_stats:
+		stats["time"] = end - begin
+	return all_stats
+
+def _run_jobs_in_worker(group):
+	r"""
+	Runs a group of jobs in a worker process of the pool. See `_run_jobs`.
+	"""
+	return _run_jobs(group, tbp_worker_pool.get_lal_module())
+
+def print_report(all_stats, total_time, worker_times = None):
+	r"""
+	Prints the statistics of all jobs, and the utilisation of the workers that
+	ran them, where `worker_times` is the time every worker spent running jobs.
+	"""
+	
+	num_ok = sum(1 for s in all_stats if s["ok"])
+	num_failed = len(all_stats) - num_ok
+	
+	print("--------------------------------------")
+	print(f"Jobs finished: {num_ok} ok, {num_failed} failed ({len(all_stats)} in total) in {total_time:.3f} s.")
+	for s in all_stats:
+		if s["ok"]:
+			print(f"    [ok]     line {s['line']}: '{s['input']}' -> '{s['output']}': {s['num_sentences']} sentences ({s['num_written']} written) in {s['time']:.3f} s.")
+		else:
+			print(f"    [failed] line {s['line']}: '{s['input']}' -> '{s['output']}': {s['error']}")
+	print(f"Total: {sum(s['num_sentences'] for s in all_stats)} sentences ({sum(s['num_written'] for s in all_stats)} written).")
+	if worker_times is not None and len(worker_times) > 1:
+		for (i, busy) in enumerate(sorted(worker_times.values(), reverse = True), start = 1):
+			utilisation = 100*busy/total_time if total_time > 0 else 0
+			print(f"    Worker {i}: busy {busy:.3f} s of {total_time:.3f} s ({utilisation:.1f}%)")
+	print("--------------------------------------")
+
+def run(args, lal_module):
+	r"""
+	Runs all the jobs in the manifest file `args.jobs_file`, possibly in a pool
+	of `args.workers` processes.
+	
+	Returns the exit status of the whole run: 0 if all jobs succeeded, 1 otherwise.
+	"""
+	
+	try:
+		jobs = read_jobs_file(args.jobs_file)
+	except (OSError, ValueError) as e:
+		logging.critical(str(e))
+		return 1
+	
+	# parse and check the arguments of every job before running any of them
+	# so that mistakes in the manifest are reported as soon as possible
+	cli_parser = argument_parser.create_parser()
+	valid_jobs = []
+	all_stats = []
+	for job in jobs:
+		try:
+			job["args"] = cli_parser.parse_args(make_job_argument_list(job, args))
+			argument_parser.check_arguments(cli_parser, job["args"])
+			valid_jobs.append(job)
+		except SystemExit:
+			all_stats.append({
+				"line": job["line"], "input": job["input"], "output": job["output"],
+				"ok": False, "error": "Invalid arguments", "num_sentences": 0,
+				"num_written": 0, "time": 0.0,
+			})
+	
+	if args.single_pass:
+		groups = group_jobs(valid_jobs)
+	else:
+		groups = [[job] for job in valid_jobs]
+	
+	# time spent by every worker running jobs (the jobs of a group are run
+	# together, so the time of the group is counted once)
+	worker_times = {}
+	
+	begin = time.perf_counter()
+	if args.workers == 1 or len(groups) <= 1:
+		for group in groups:
+			all_stats += _run_jobs(group, lal_module)
+	else:
+		# the groups are handed out one at a time, the largest first
+		groups.sort(key = lambda group: -_input_size(group))
+		with tbp_worker_pool.make_pool(min(args.workers, len(groups)), lal_module) as pool:
+			for group_stats in pool.imap_unordered(_run_jobs_in_worker, groups):
+				all_stats += group_stats
+				worker = group_stats[0]["worker"]
+				worker_times[worker] = worker_times.get(worker, 0) + group_stats[0]["time"]
+	end = time.perf_counter()
+	
+	all_stats.sort(key = lambda s: s["line"])
+	if not args.quiet:
+		print_report(all_stats, end - begin, worker_times)
+	
+	return 0 if all(s["ok"] for s in all_stats) else 1
@@ -34,7 +34,7 @@
 
 import logging
 
-from treebank_parser import treebank_formats, output_log, treebank_collection_parser
+from treebank_parser import treebank_formats, output_log, treebank_collection_parser, treebank_archive_parser, treebank_directory_parser
 from treebank_parser.conllu import action_type as conllu_action_type
 from treebank_parser.stanford import action_type as stanford_action_type
 from treebank_parser.head_vector import action_type as head_vector_action_type
@@ -75,23 +75,37 @@ def make_actions_list(args):
 			yield f"{head_vector_action_type.ChunkTree_key_str} -- {args.ChunkSyntacticDependencyTree}"
 
 
-def configure_logging(args):
-	# configure logging
+def configure_output_log(verbose):
+	r"""
+	Sets the level of the logging messages and redirects the logging functions
+	of the treebank parser library to the `logging` module.
+	"""
+	
 	logging.basicConfig(
 		level = logging.DEBUG,
 		format = "[%(levelname)s] %(asctime)s : %(message)s",
 		datefmt = '%Y-%m-%d %H:%M:%S'
 	)
 
-	if args.verbose != None:
-		if args.verbose == 0:
+	if verbose != None:
+		if verbose == 0:
 			logging.disable(logging.WARNING)
-		elif args.verbose == 1:
+		elif verbose == 1:
 			logging.disable(logging.INFO)
-		elif args.verbose == 2:
+		elif verbose == 2:
 			logging.disable(logging.DEBUG)
 		else:
 			logging.disable(logging.NOTSET)
+	
+	output_log.info = logging.info
+	output_log.debug = logging.debug
+	output_log.warning = logging.warning
+	output_log.error = logging.error
+	output_log.critical = logging.critical
+
+def configure_logging(args):
+	# configure logging
+	configure_output_log(args.verbose)
 
 	# Print some debugging information regarding parameters
 	if not args.quiet:
@@ -100,24 +114,57 @@ def configure_logging(args):
 		if args.input_treebank_file is not None:
 			print(f"Treebank file to be parsed: '{args.input_treebank_file}'")
 			print(f"Head vector file to create: '{args.output}'")
-		else:
+		elif args.input_treebank_collection is not None:
 			print(f"Treebank collection to be parsed: '{args.input_treebank_collection}'")
 			print(f"Head vector collection file to create: '{args.output}'")
 			print(f"Keep consistency among sentences? {args.consistency_in_sentences}")
-
-		print(f"Input file's format: '{args.treebank_format}'")
+			if args.work_queue:
+				print(f"Work queue in the output directory (chunks of {args.chunk_sentences} sentences, lease timeout {args.lease_timeout} s)")
+		elif args.input_treebank_archive is not None:
+			print(f"Treebank archive to be parsed: '{args.input_treebank_archive}' (members '{args.pattern}')")
+			print(f"Head vector collection file to create: '{args.output}'")
+			print(f"Number of workers: {args.workers}")
+		elif args.input_treebank_directory is not None:
+			print(f"Treebank directory to be parsed: '{args.input_treebank_directory}' (files '{args.pattern}')")
+			print(f"Head vector collection file to create: '{args.output}'")
+			print(f"Number of workers: {args.workers}")
+		elif args.jobs_file is not None:
+			print(f"Jobs file to be run: '{args.jobs_file}'")
+			print(f"Number of workers: {args.workers}")
+		else:
+			print(f"Daemon listening at socket: '{args.daemon}'")
+			print(f"Number of workers: {args.workers}")
+
+		if args.treebank_format is not None:
+			print(f"Input file's format: '{args.treebank_format}'")
+		if args.shard is not None:
+			print(f"Shard: {args.shard[0]}/{args.shard[1]}")
+		if args.sample_rate is not None:
+			print(f"Sample rate: {args.sample_rate} (seed {args.seed})")
+		if args.max_sentences is not None:
+			print(f"Maximum number of sentences: {args.max_sentences}")
 		print(f"Verbosity level: '{args.verbose}'")
 		logging.critical("Critical messages will be shown.")
 		logging.error("Error messages will be shown.")
 		logging.warning("Warning messages will be shown.")
 		logging.info("Info messages will be shown.")
 		logging.debug("Debug messages will be shown.")
+
+def get_parser_module(treebank_format):
+	r"""
+	Returns the module that contains the parser of the format `treebank_format`
+	(a CLI key string), or None if the format is not handled.
+	"""
 	
-	output_log.info = logging.info
-	output_log.debug = logging.debug
-	output_log.warning = logging.warning
-	output_log.error = logging.error
-	output_log.critical = logging.critical
+	if treebank_format == treebank_formats.CoNLLU_key_str:
+		from treebank_parser.conllu import parser
+	elif treebank_format == treebank_formats.head_vector_key_str:
+		from treebank_parser.head_vector import parser
+	elif treebank_format == treebank_formats.Stanford_key_str:
+		from treebank_parser.stanford import parser
+	else:
+		return None
+	return parser
 
 def run(args, lal_module):
 	# Run the treebank parser with the configuration encoded in 'args'.
@@ -127,26 +174,36 @@ def run(args, lal_module):
 	# construct a list with all the actions
 	actions = list(make_actions_list(args))
 
+	variant_args = getattr(args, "variant_args", [])
+
 	if not args.quiet:
 		print(f"Actions to be performed ({len(actions)}):", actions)
+		for a in variant_args:
+			print(f"Actions of the variant '{a.output}':", list(make_actions_list(a)))
 		print("--------------------------------------")
 
-	proceed_to_run_parser = True
-	if args.treebank_format == treebank_formats.CoNLLU_key_str:
-		from treebank_parser.conllu import parser
-	elif args.treebank_format == treebank_formats.head_vector_key_str:
-		from treebank_parser.head_vector import parser
-	elif args.treebank_format == treebank_formats.Stanford_key_str:
-		from treebank_parser.stanford import parser
-	else:
+	parser = get_parser_module(args.treebank_format)
+	if parser is None:
 		logging.error(f"Unhandled format '{args.treebank_format}'")
-		proceed_to_run_parser = False
+		return
 
-	if not proceed_to_run_parser: return
+	if args.input_treebank_file is not None and getattr(args, "scan_stats", False):
+		p = parser.parser(args.input_treebank_file, args.output, args, lal_module)
+		p.scan_statistics()
+		if p.was_cancelled():
+			logging.warning("The output file will not be written.")
+			return
+		p.dump_statistics()
+		return
 
 	if args.input_treebank_file is not None:
 		p = parser.parser(args.input_treebank_file, args.output, args, lal_module)
+		for a in variant_args:
+			p.add_variant(parser.parser(args.input_treebank_file, a.output, a, lal_module))
 		p.parse()
+		if p.was_cancelled():
+			logging.warning("The output file will not be written.")
+			return
 		p.dump_contents()
 
 	if args.input_treebank_collection is not None:
@@ -157,3 +214,25 @@ def run(args, lal_module):
 			args,
 			lal_module
 		)
+
+	if args.input_treebank_archive is not None:
+		treebank_archive_parser.parse_treebank_archive(
+			parser.parser,
+			args.input_treebank_archive,
+			args.output,
+			args,
+			lal_module,
+			pattern = args.pattern,
+			workers = args.workers
+		)
+
+	if args.input_treebank_directory is not None:
+		treebank_directory_parser.parse_treebank_directory(
+			parser.parser,
+			args.input_treebank_directory,
+			args.output,
+			args,
+			lal_module,
+			pattern = args.pattern,
+			workers = args.workers
+		)
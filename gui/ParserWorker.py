@@ -0,0 +1,83 @@
+################################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+################################################################################
+
+from PySide6.QtCore import QObject, Signal, Slot
+
+from treebank_parser import progress as tbp_progress
+from cli import run_parser
+
+from gui.utils.MyOut import MyOut
+
+
+class ParserWorker(QObject):
+	# Runs the treebank parser in a thread other than the GUI's.
+	#
+	# The progress of the parse is emitted with the signal 'progress' (number
+	# of sentences read, bytes read, total bytes of the input file). The signal
+	# 'finished' is emitted at the end with whether or not the run was cancelled.
+
+	progress = Signal(int, 'qint64', 'qint64')
+	finished = Signal(bool)
+
+	def __init__(self, args, lal_module):
+		super(ParserWorker, self).__init__()
+		self.m_args = args
+		self.m_lal_module = lal_module
+		self.m_cancel_requested = False
+
+	def request_cancel(self):
+		# This is called from the GUI thread. The parser checks the flag
+		# periodically and stops at the end of the current sentence.
+		self.m_cancel_requested = True
+
+	def is_cancel_requested(self):
+		return self.m_cancel_requested
+
+	def report_progress(self, num_sentences, bytes_read, bytes_total):
+		self.progress.emit(num_sentences, bytes_read, bytes_total)
+
+	@Slot()
+	def run(self):
+		tbp_progress.report = self.report_progress
+		tbp_progress.is_cancel_requested = self.is_cancel_requested
+
+		try:
+			run_parser.run(self.m_args, self.m_lal_module)
+		except Exception as e:
+			MyOut.critical(f"The treebank parser stopped unexpectedly: {e}")
+		finally:
+			tbp_progress.report = tbp_progress._report_nothing
+			tbp_progress.is_cancel_requested = tbp_progress._never_cancel
+
+		self.finished.emit(self.m_cancel_requested)
@@ -33,15 +33,20 @@
 ################################################################################
 
 from PySide6.QtWidgets import QPushButton, QLineEdit, QSpinBox, QTabWidget, QCheckBox
+from PySide6.QtWidgets import QProgressBar, QLabel
+from PySide6.QtCore import QThread
 
 from typing import cast
+import time
 
 from treebank_parser import treebank_formats, type_strings, output_log
-from cli import argument_parser, run_parser
+from cli import argument_parser
 
 from gui.utils.MyOut import MyOut
 from gui.utils import action_type_module
 
+from gui.ParserWorker import ParserWorker
+
 from gui.actions.ActionsTable import ActionsTable
 from gui.actions.ActionsTableItem import ActionsTableItem
 from gui.actions.ActionsTableComboBox import ActionsTableComboBox
@@ -58,7 +63,65 @@ class RunParserButton(QPushButton):
 		super(RunParserButton, self).__init__(parent)
 		self.clicked.connect(self.run_treebank)
 
+		# the thread and the worker of the current run (if any)
+		self.m_thread = None
+		self.m_worker = None
+		self.m_cancel_button = None
+
+	def set_cancel_button(self, button):
+		self.m_cancel_button = button
+		self.m_cancel_button.clicked.connect(self.cancel_run)
+
+	def cancel_run(self):
+		if self.m_worker is None: return
+		MyOut.warning("Cancelling... the parser will stop at the end of the current sentence.")
+		self.m_cancel_button.setEnabled(False)
+		self.m_worker.request_cancel()
+
+	def show_progress(self, num_sentences, bytes_read, bytes_total):
+		parent = self.parentWidget()
+		progressBar = parent.findChild(QProgressBar, "parserProgressBar")
+		progressLabel = parent.findChild(QLabel, "parserProgressLabel")
+
+		if bytes_total <= 0:
+			# the size of the input is unknown
+			progressBar.setRange(0, 0)
+			progressLabel.setText(f"{num_sentences} sentences")
+			return
+
+		fraction = min(bytes_read/bytes_total, 1.0)
+		progressBar.setRange(0, 1000)
+		progressBar.setValue(int(1000*fraction))
+
+		eta_str = "--:--"
+		elapsed = time.monotonic() - self.m_start_time
+		if fraction > 0:
+			eta = int(elapsed*(1 - fraction)/fraction)
+			eta_str = f"{eta//60:02d}:{eta%60:02d}"
+		progressLabel.setText(f"{num_sentences} sentences, {100*fraction:.1f}%, ETA {eta_str}")
+
+	def run_finished(self, cancelled):
+		if cancelled:
+			MyOut.warning("    Cancelled")
+		else:
+			MyOut.info("    Done")
+		MyOut.log_separator()
+
+		self.m_thread.quit()
+		self.m_thread.wait()
+		self.m_worker.deleteLater()
+		self.m_thread.deleteLater()
+		self.m_worker = None
+		self.m_thread = None
+
+		self.setEnabled(True)
+		self.m_cancel_button.setEnabled(False)
+
 	def run_treebank(self):
+		if self.m_worker is not None:
+			# the parser is already running
+			return
+
 		print("Run button was clicked")
 		parent = self.parentWidget()
 
@@ -80,7 +143,7 @@ class RunParserButton(QPushButton):
 			argument_list += [input_treebank]
 
 			# output heads file
-			output_treebank = parent.findChild(QLineEdit, "outputTreebankFile")
+			outputHeadsFile = parent.findChild(QLineEdit, "outputTreebankFile")
 			assert(outputHeadsFile is not None)
 
 			MyOut.info("Retrieving the output heads file...")
@@ -215,7 +278,17 @@ class RunParserButton(QPushButton):
 		
 		parser = argument_parser.create_parser()
 		args = parser.parse_args(argument_list)
-		run_parser.run(args, parent.parentWidget().LAL_module)
 
-		MyOut.info("    Done")
-		MyOut.log_separator()
+		# run the parser in another thread so that the GUI does not freeze
+		self.m_thread = QThread()
+		self.m_worker = ParserWorker(args, parent.parentWidget().LAL_module)
+		self.m_worker.moveToThread(self.m_thread)
+		self.m_thread.started.connect(self.m_worker.run)
+		self.m_worker.progress.connect(self.show_progress)
+		self.m_worker.finished.connect(self.run_finished)
+
+		self.show_progress(0, 0, 1)
+		self.setEnabled(False)
+		self.m_cancel_button.setEnabled(True)
+		self.m_start_time = time.monotonic()
+		self.m_thread.start()
@@ -53,6 +53,20 @@ def add_arguments_main_parser(parser):
 		help = "Use the debug compilation of LAL ('import lal'). The script will run more slowly, but errors will be more\
 		        likely to be caught. By default, the optimized compilation of LAL is imported ('import laloptimized as lal')."
 	)
+	parser.add_argument(
+		'--log-max-lines',
+		default = 10000,
+		type = int,
+		required = False,
+		help = "Maximum number of log messages kept in the log window. Older messages are removed. Default: 10000."
+	)
+	parser.add_argument(
+		'--log-file',
+		default = None,
+		type = str,
+		required = False,
+		help = "Write all log messages to this file as well. The file is appended to."
+	)
 
 # ------------------------------------------------------------------------------
 
@@ -42,6 +42,7 @@ if __name__ == "__main__":
 	del pathlib
 
 from PySide6.QtWidgets import QAbstractItemView, QApplication, QMainWindow, QCheckBox
+from PySide6.QtWidgets import QPushButton
 from PySide6.QtWidgets import QWidget, QTableWidget, QTextEdit
 from PySide6.QtWidgets import QLabel, QVBoxLayout
 from PySide6 import QtCore, QtGui
@@ -54,6 +55,7 @@ from gui.utils import help_menu_strings
 from gui.utils.MyOut import MyOut
 
 from gui.FileChooserButton import FileChooserButton
+from gui.RunParserButton import RunParserButton
 
 from gui.actions.TreebankFormatComboBox import TreebankFormatComboBox
 from gui.actions.TreebankFormatComboBoxItem import TreebankFormatComboBoxItem
@@ -112,7 +114,8 @@ class GuiTreebankParser(QMainWindow):
 		msgLogger = self.findChild(QTextEdit, "msgLogger")
 		assert(msgLogger is not None)
 
-		MyOut.set_msg_log(msgLogger)
+		MyOut.set_msg_log(msgLogger, max_lines = args.log_max_lines)
+		MyOut.set_log_file(args.log_file)
 		print("Setting up interface...")
 
 		# add all available treebank formats
@@ -161,6 +164,14 @@ class GuiTreebankParser(QMainWindow):
 		actionRemoveButton.set_type("remove_action")
 		actionRemoveButton.set_treebankFormatSelector(treebankFormatSelector)
 
+		# the run button enables and listens to the cancel button
+		print("Setup 'runTreebankParser'")
+		runTreebankParser = self.findChild(RunParserButton, "runTreebankParser")
+		assert(runTreebankParser is not None)
+		cancelTreebankParser = self.findChild(QPushButton, "cancelTreebankParser")
+		assert(cancelTreebankParser is not None)
+		runTreebankParser.set_cancel_button(cancelTreebankParser)
+
 		# chosen actions table should have single selection only
 		print("Setup 'chosenActionTable'")
 		chosenActionTable = self.findChild(QTableWidget, "chosenActionTable")
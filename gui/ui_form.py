@@ -18,9 +18,10 @@ from PySide6.QtGui import (QAction, QBrush, QColor, QConicalGradient,
     QTransform)
 from PySide6.QtWidgets import (QApplication, QCheckBox, QHBoxLayout, QHeaderView,
     QLabel, QLineEdit, QListWidget, QListWidgetItem,
-    QMainWindow, QMenuBar, QPushButton, QSizePolicy,
-    QSpacerItem, QSpinBox, QStatusBar, QTabWidget,
-    QTableWidgetItem, QTextEdit, QVBoxLayout, QWidget)
+    QMainWindow, QMenuBar, QProgressBar, QPushButton,
+    QSizePolicy, QSpacerItem, QSpinBox, QStatusBar,
+    QTabWidget, QTableWidgetItem, QTextEdit, QVBoxLayout,
+    QWidget)
 
 from gui.FileChooserButton import FileChooserButton
 from gui.HelpMenu import HelpMenu
@@ -270,6 +271,12 @@ class Ui_gui_treebank_parser(object):
 
         self.horizontalLayout_3.addWidget(self.runTreebankParser)
 
+        self.cancelTreebankParser = QPushButton(self.centralwidget)
+        self.cancelTreebankParser.setObjectName(u"cancelTreebankParser")
+        self.cancelTreebankParser.setEnabled(False)
+
+        self.horizontalLayout_3.addWidget(self.cancelTreebankParser)
+
         self.lalReleaseCheckBox = QCheckBox(self.centralwidget)
         self.lalReleaseCheckBox.setObjectName(u"lalReleaseCheckBox")
         self.lalReleaseCheckBox.setEnabled(False)
@@ -300,6 +307,24 @@ class Ui_gui_treebank_parser(object):
 
         self.verticalLayout_2.addLayout(self.horizontalLayout_3)
 
+        self.horizontalLayout_8 = QHBoxLayout()
+        self.horizontalLayout_8.setObjectName(u"horizontalLayout_8")
+        self.parserProgressBar = QProgressBar(self.centralwidget)
+        self.parserProgressBar.setObjectName(u"parserProgressBar")
+        self.parserProgressBar.setMaximum(1000)
+        self.parserProgressBar.setValue(0)
+        self.parserProgressBar.setTextVisible(False)
+
+        self.horizontalLayout_8.addWidget(self.parserProgressBar)
+
+        self.parserProgressLabel = QLabel(self.centralwidget)
+        self.parserProgressLabel.setObjectName(u"parserProgressLabel")
+
+        self.horizontalLayout_8.addWidget(self.parserProgressLabel)
+
+
+        self.verticalLayout_2.addLayout(self.horizontalLayout_8)
+
         self.msgLogger = QTextEdit(self.centralwidget)
         self.msgLogger.setObjectName(u"msgLogger")
         self.msgLogger.setSizeIncrement(QSize(0, 0))
@@ -394,6 +419,7 @@ class Ui_gui_treebank_parser(object):
         ___qtablewidgetitem2 = self.chosenActionTable.horizontalHeaderItem(2)
         ___qtablewidgetitem2.setText(QCoreApplication.translate("gui_treebank_parser", u"Value Type", None));
         self.runTreebankParser.setText(QCoreApplication.translate("gui_treebank_parser", u"Run", None))
+        self.cancelTreebankParser.setText(QCoreApplication.translate("gui_treebank_parser", u"Cancel", None))
         self.lalReleaseCheckBox.setText(QCoreApplication.translate("gui_treebank_parser", u"Use laloptimized", None))
         self.lalDebugCheckBox.setText(QCoreApplication.translate("gui_treebank_parser", u"Use lal", None))
 #if QT_CONFIG(tooltip)
@@ -404,6 +430,7 @@ class Ui_gui_treebank_parser(object):
 "* 3: messages from 2 plus 'debug' messages.", None))
 #endif // QT_CONFIG(tooltip)
         self.label_7.setText(QCoreApplication.translate("gui_treebank_parser", u"        Logging messages level", None))
+        self.parserProgressLabel.setText("")
         self.pushButton.setText(QCoreApplication.translate("gui_treebank_parser", u"Clear log messages", None))
         self.only_menu.setTitle(QCoreApplication.translate("gui_treebank_parser", u"Help", None))
     # retranslateUi
@@ -32,15 +32,43 @@
 #
 ################################################################################
 
+import time
+import threading
+from collections import deque
 from datetime import datetime
 
+from PySide6.QtCore import QTimer
+from PySide6.QtGui import QTextCursor
+
 
 class MyOut:
+	# Log messages are not appended to the message logger one by one. They are
+	# gathered in a buffer (they may be produced by the thread that runs the
+	# treebank parser) and a timer in the GUI thread appends them all at once
+	# every 'flush_interval' milliseconds. Only the last 'max_lines' messages
+	# are kept, both in the buffer and in the message logger. Optionally, all
+	# messages are also written to a log file.
+
 	def set_tab(str):
 		MyOut.tab = str
 
-	def set_msg_log(widget):
+	def set_msg_log(widget, max_lines = 10000, flush_interval = 100):
 		MyOut.message_logger = widget
+		MyOut.message_logger.document().setMaximumBlockCount(max_lines)
+		MyOut.pending = deque(maxlen = max_lines)
+
+		MyOut.timer = QTimer()
+		MyOut.timer.setInterval(flush_interval)
+		MyOut.timer.timeout.connect(MyOut.flush)
+		MyOut.timer.start()
+
+	def set_log_file(filename):
+		with MyOut.lock:
+			if MyOut.log_file is not None:
+				MyOut.log_file.close()
+			MyOut.log_file = None
+			if filename is not None:
+				MyOut.log_file = open(filename, 'a', encoding = "utf-8")
 
 	def add_tab():
 		MyOut.tab += "    "
@@ -48,44 +76,87 @@ class MyOut:
 	def remove_tab():
 		MyOut.tab = MyOut.tab[:-4]
 
+	def log(str):
+		with MyOut.lock:
+			if len(MyOut.pending) == MyOut.pending.maxlen:
+				MyOut.num_dropped += 1
+			MyOut.pending.append(str)
+			if MyOut.log_file is not None:
+				MyOut.log_file.write(str + "\n")
+
+	def flush():
+		# called by the timer in the GUI thread
+		with MyOut.lock:
+			if len(MyOut.pending) == 0: return
+			messages = list(MyOut.pending)
+			MyOut.pending.clear()
+			num_dropped = MyOut.num_dropped
+			MyOut.num_dropped = 0
+			if MyOut.log_file is not None:
+				MyOut.log_file.flush()
+
+		if num_dropped > 0:
+			messages.insert(0, f"... {num_dropped} messages not shown ...")
+
+		# append all messages as plain text at the end of the logger
+		document = MyOut.message_logger.document()
+		cursor = QTextCursor(document)
+		cursor.movePosition(QTextCursor.End)
+		if not document.isEmpty():
+			cursor.insertBlock()
+		cursor.insertText("\n".join(messages))
+
+		scrollBar = MyOut.message_logger.verticalScrollBar()
+		scrollBar.setValue(scrollBar.maximum())
+
 	def log_separator():
-		MyOut.message_logger.append("---------------------------")
+		MyOut.log("---------------------------")
 
 	def get_current_time():
-		now = datetime.now()
-		return now.strftime("%Y-%m-%d %H:%M:%S")
+		# the time is formatted only once per second
+		now = int(time.time())
+		if now != MyOut.time_second:
+			MyOut.time_second = now
+			MyOut.time_str = datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S")
+		return MyOut.time_str
 
 	def info(str):
 		# use current time for the message
 		current_time = MyOut.get_current_time()
 		# log message
-		MyOut.message_logger.append(f"[INFO] {current_time}{MyOut.tab} : {str}")
+		MyOut.log(f"[INFO] {current_time}{MyOut.tab} : {str}")
 
 	def error(str):
 		# use current time for the message
 		current_time = MyOut.get_current_time()
 		# log message
-		MyOut.message_logger.append(f"[ERROR] {current_time}{MyOut.tab} : {str}")
+		MyOut.log(f"[ERROR] {current_time}{MyOut.tab} : {str}")
 
 	def critical(str):
 		# use current time for the message
 		current_time = MyOut.get_current_time()
 		# log message
-		MyOut.message_logger.append(f"[CRITICAL] {current_time}{MyOut.tab} : {str}")
+		MyOut.log(f"[CRITICAL] {current_time}{MyOut.tab} : {str}")
 	
 	def warning(str):
 		# use current time for the message
 		current_time = MyOut.get_current_time()
 		# log message
-		MyOut.message_logger.append(f"[WARNING] {current_time}{MyOut.tab} : {str}")
+		MyOut.log(f"[WARNING] {current_time}{MyOut.tab} : {str}")
 	
 	def debug(str):
 		# use current time for the message
 		current_time = MyOut.get_current_time()
 		# log message
-		MyOut.message_logger.append(f"[DEBUG] {current_time}{MyOut.tab} : {str}")
+		MyOut.log(f"[DEBUG] {current_time}{MyOut.tab} : {str}")
 
 	def nothing(str):
 		pass
 
 MyOut.tab = ""
+MyOut.lock = threading.Lock()
+MyOut.pending = deque()
+MyOut.num_dropped = 0
+MyOut.log_file = None
+MyOut.time_second = None
+MyOut.time_str = ""
@@ -52,7 +52,9 @@ value of the corresponding data type. If an action does not need a value, the\n\
 third column will be empty\n\
 \n\
 Once all the actions have been chosen, you can click 'Run' to actually transform\n\
-the input treebank file into a head vector file.\n\
+the input treebank file into a head vector file. The progress bar below the 'Run'\n\
+button shows how much of the input has been parsed and an estimate of the time\n\
+left. Click 'Cancel' to stop parsing; no output file is written in that case.\n\
 \n\
 Optionally, the GUI can be run with either the release or the debug distribution\n\
 of LAL. The build of LAL that will be run can be seen in the checkboxes next to\n\
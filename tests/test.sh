@@ -26,6 +26,7 @@ function usage {
 	echo ""
 	echo "            - ca : Catalan"
 	echo "            - en : English"
+	echo "            - er : sentences with errors"
 	echo "            - es : Spanish"
 	echo "            - fr : French"
 	echo "            - zh : Chinese"
@@ -100,6 +101,38 @@ function run_test {
 	fi
 }
 
+function run_quarantine_test {
+	
+	# ID name of the test
+	local ID=$1
+	
+	# name of the input file
+	local input_file=$2
+	
+	# name of the local quarantine file to compare the result against (the
+	# details of the errors are not compared)
+	local quarantine_file=$3
+	
+	shift 3
+	
+	local result_file=.out.$ID
+	
+	echo -en "\e[1;1;35mRunning quarantine test\e[0m $ID"
+	
+	python3 $MAIN_FILE -i $input_file -o $result_file --lal --quiet --quarantine "$@" 2> /dev/null
+	
+	local DIFF=$(sed 's/, "details": .*}$/}/' $result_file.quarantine.jsonl | diff - $quarantine_file)
+	
+	if [ ! -z "$DIFF" ]; then
+		echo -e "    \e[1;4;31mDifferent outputs\e[0m "
+		echo "    See result in $result_file.quarantine.jsonl"
+		echo "$(date +"%Y/%m/%d.%T")     Error: when executing test $ID -- Quarantine file differs from ground truth" >> $LOG_FILE
+	else
+		echo -e "    \e[1;1;32mOk\e[0m"
+		rm -f $result_file $result_file.quarantine.jsonl
+	fi
+}
+
 function run_tests {
 	local FORMAT=$1
 	local LANG=$2
@@ -131,6 +164,13 @@ function run_tests {
 				run_test "en-01-05" "CoNLL-U/inputs/en-01.conllu" "CoNLL-U/outputs/en-01-05.hv"	"CoNLL-U" $RPM $RFW
 			fi
 		
+		elif [ "$LANG" == "er" ]; then
+			if [ "$ID" == "01" ]; then
+				# invalid sentences are reported even if they are too short
+				run_test "er-01-01" "CoNLL-U/inputs/er-01.conllu" "CoNLL-U/outputs/er-01-01.hv"	"CoNLL-U" --DiscardSentencesShorter 3
+				run_quarantine_test "er-01-01" "CoNLL-U/inputs/er-01.conllu" "CoNLL-U/outputs/er-01-01.quarantine.jsonl" "CoNLL-U" --DiscardSentencesShorter 3
+			fi
+		
 		elif [ "$LANG" == "es" ]; then
 			if [ "$ID" == "01" ]; then
 				run_test "es-01-01" "CoNLL-U/inputs/es-01.conllu" "CoNLL-U/outputs/es-01-01.hv"	"CoNLL-U"
@@ -247,7 +287,7 @@ fi
 if [ $all == 1 ]; then
 	echo "$(date +"%Y/%m/%d.%T") Run all tests" >> $LOG_FILE
 	for f in "CoNLL-U" "Stanford"; do
-		for l in "ca" "en" "es" "fr" "tr" "zh"; do
+		for l in "ca" "en" "er" "es" "fr" "tr" "zh"; do
 			for i in "01" "02"; do
 				run_tests $f $l $i
 			done
@@ -263,7 +303,7 @@ else
 	if [ "$format" != "0" ] && [ "$lang" == "0" ]; then
 		echo "$(date +"%Y/%m/%d.%T") Run specific tests for format: $format" >> $LOG_FILE
 
-		for l in "ca" "en" "es" "fr" "tr" "zh"; do
+		for l in "ca" "en" "er" "es" "fr" "tr" "zh"; do
 			for i in "01" "02"; do
 				run_tests $format $l $i
 			done
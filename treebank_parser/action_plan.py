@@ -0,0 +1,188 @@
+######################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+######################################################################
+
+r"""
+The actions requested by the user, compiled into a plan.
+
+This module contains a single class `action_plan`.
+"""
+
+import sys
+
+from treebank_parser import symbol_table as tbp_symbols
+
+# the estimated cost of processing a sentence (see `action_plan.estimate_cost`)
+# in units of the cost of reading, building and checking a single token: a
+# fixed cost per sentence, the (quadratic) cost of removing tokens, and the
+# cost of the postprocess per token
+SentenceCost = 8
+RemovalCost = 1/64
+PostprocessCost = 1
+
+class action_plan:
+	r"""
+	This class turns the actions passed as arguments (see main CLI) into a few
+	specialised members, so that the parsers do not have to evaluate a list
+	of functions for every token and every sentence:
+	
+	- `remove_categories`: the categories of tokens to be removed (see module
+	`treebank_parser.symbol_table`). It is 0 if no token is to be removed.
+	
+	- `keep_length(n)`: returns whether or not a sentence of `n` words (after
+	removing tokens) is kept. All the sentence discard actions are fused into
+	this single comparison.
+	
+	- `postprocess(rt)`: the postprocess applied to the rooted tree of a sentence
+	that is kept. It is None if there is no postprocess.
+	
+	- `estimate_cost(n)`: the estimated cost of processing a sentence of `n`
+	tokens, used to split treebanks into chunks of similar cost.
+	
+	Arguments that do not exist for a treebank format are treated as if the
+	action had not been requested.
+	"""
+	
+	def _make_remove_categories(self, args):
+		self.remove_categories = 0
+		
+		# Remove punctuation marks
+		if getattr(args, "RemovePunctuationMarks", False):
+			self.remove_categories |= tbp_symbols.PunctuationMark
+		
+		# Remove function words
+		if getattr(args, "RemoveFunctionWords", False):
+			self.remove_categories |= tbp_symbols.FunctionWord
+	
+	def _make_keep_length(self, args):
+		# A sentence of n words is kept if, and only if,
+		#     lower < n < upper
+		# Empty sentences are always discarded.
+		
+		self.m_lower = 0
+		self.m_upper = sys.maxsize
+		
+		# Discard short sentences
+		shorter = getattr(args, "DiscardSentencesShorter", -1)
+		if shorter != -1:
+			self.m_lower = max(0, shorter)
+		# Discard long sentences
+		longer = getattr(args, "DiscardSentencesLonger", -1)
+		if longer != -1:
+			self.m_upper = longer
+		
+		lower = self.m_lower
+		upper = self.m_upper
+		self.keep_length = lambda n: lower < n < upper
+	
+	def _make_postprocess(self, args, lal_module):
+		self.postprocess = None
+		
+		# Chunk sentences according to a single algorithm
+		chunk = getattr(args, "ChunkSyntacticDependencyTree", None)
+		if chunk != None:
+			algorithms = lal_module.linarr.algorithms_chunking
+			if chunk == "Anderson":
+				algorithm = algorithms.Anderson
+			elif chunk == "Macutek":
+				algorithm = algorithms.Macutek
+			
+			self.postprocess = lambda rt: lal_module.linarr.chunk_syntactic_dependency_tree(rt, algorithm)
+	
+	def __init__(self, args, lal_module):
+		r"""
+		Compiles the actions in `args` (as parsed by the cli parser). The module
+		`lal_module` is either the debug or the release compilation of LAL.
+		"""
+		self._make_remove_categories(args)
+		self._make_keep_length(args)
+		self._make_postprocess(args, lal_module)
+	
+	def removes_tokens(self):
+		r"""
+		Returns whether or not any token is to be removed from the sentences.
+		"""
+		return self.remove_categories != 0
+	
+	def get_length_bounds(self):
+		r"""
+		Returns the pair `(lower, upper)` such that a sentence of `n` words is
+		kept if, and only if, `lower < n < upper`.
+		"""
+		return self.m_lower, self.m_upper
+	
+	def estimate_cost(self, n):
+		r"""
+		Returns the estimated cost of processing a sentence of `n` tokens. Every
+		token removed updates the mapping of the remaining vertices to tokens,
+		so the cost of removing tokens grows with the square of `n`.
+		"""
+		cost = SentenceCost + n
+		if self.remove_categories != 0:
+			cost += RemovalCost*n*n
+		if self.postprocess is not None:
+			cost += PostprocessCost*n
+		return cost
+
+if __name__ == "__main__":
+	# TESTS
+	import argparse
+	
+	def make_plan(**kwargs):
+		return action_plan(argparse.Namespace(**kwargs), None)
+	
+	plan = make_plan()
+	assert( not plan.removes_tokens() )
+	assert( plan.postprocess is None )
+	assert( plan.estimate_cost(10) == SentenceCost + 10 )
+	assert( not plan.keep_length(0) )
+	assert( plan.keep_length(1) )
+	assert( plan.keep_length(1000) )
+	
+	plan = make_plan(RemovePunctuationMarks = True, DiscardSentencesShorter = 3, DiscardSentencesLonger = -1)
+	assert( plan.remove_categories == tbp_symbols.PunctuationMark )
+	assert( not plan.keep_length(3) )
+	assert( plan.keep_length(4) )
+	assert( plan.get_length_bounds() == (3, sys.maxsize) )
+	assert( plan.estimate_cost(64) == SentenceCost + 64 + 64 )
+	
+	plan = make_plan(RemoveFunctionWords = True, DiscardSentencesShorter = -1, DiscardSentencesLonger = 5)
+	assert( plan.remove_categories == tbp_symbols.FunctionWord )
+	assert( not plan.keep_length(0) )
+	assert( plan.keep_length(4) )
+	assert( not plan.keep_length(5) )
+	
+	plan = make_plan(RemovePunctuationMarks = True, RemoveFunctionWords = True, DiscardSentencesShorter = 0, DiscardSentencesLonger = 2)
+	assert( plan.removes_tokens() )
+	assert( plan.keep_length(1) )
+	assert( not plan.keep_length(2) )
@@ -0,0 +1,310 @@
+######################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+######################################################################
+
+r"""
+Reading and writing files in threads, so that the parse of a treebank overlaps
+with the input and output operations.
+
+This module contains two classes: `read_ahead_reader`, which reads the input
+file in large chunks in a thread and hands out its lines, and
+`write_behind_writer`, which hands the head vectors to a thread that writes
+them into an `output_writer`. In both cases the chunks are passed through a
+queue of bounded size so that, when one side is faster than the other, the
+memory used stays bounded.
+"""
+
+import os
+import queue
+import locale
+import threading
+
+# size (in bytes) of the chunks read from the input file
+DefaultChunkSize = 1024*1024
+# maximum number of chunks waiting in a queue
+DefaultQueueSize = 16
+
+class read_ahead_reader:
+	r"""
+	Reads the lines of the file `filename`, starting at byte `offset`. A thread
+	reads chunks of `chunk_size` bytes ahead of the lines being handed out and
+	keeps at most `queue_size` of them in memory.
+	
+	Like `checkpoint.tracking_reader`, the lines are decoded with `encoding`,
+	line endings "\r\n" are converted to "\n", and the byte offset of the next
+	line to be read is kept in `offset`. If `binary` is True, the lines are not
+	decoded and are handed out as `bytes`.
+	"""
+	
+	def __init__(self, filename, encoding = None, offset = 0, chunk_size = DefaultChunkSize, queue_size = DefaultQueueSize, binary = False):
+		if encoding is None:
+			encoding = locale.getpreferredencoding(False)
+		self.m_encoding = encoding
+		self.m_binary = binary
+		self.m_chunk_size = chunk_size
+		self.offset = offset
+		
+		# opened here so that errors are raised in the caller's thread
+		self.m_file = open(filename, 'rb')
+		self.m_file.seek(offset)
+		
+		self.m_queue = queue.Queue(maxsize = max(1, queue_size))
+		self.m_stop = threading.Event()
+		self.m_thread = threading.Thread(target = self._read_chunks, daemon = True)
+		self.m_thread.start()
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+		return False
+	
+	def _put(self, item):
+		r"""
+		Puts `item` in the queue, waiting for room unless the reader is closed.
+		Returns whether the item was put.
+		"""
+		while not self.m_stop.is_set():
+			try:
+				self.m_queue.put(item, timeout = 0.1)
+				return True
+			except queue.Full:
+				pass
+		return False
+	
+	def _read_chunks(self):
+		r"""
+		Body of the reading thread. The end of the file is signalled with an
+		empty chunk, and errors are passed on to be raised by the consumer.
+		"""
+		try:
+			while True:
+				chunk = self.m_file.read(self.m_chunk_size)
+				if not self._put(chunk) or len(chunk) == 0:
+					return
+		except Exception as e:
+			self._put(e)
+	
+	def _chunks(self):
+		while True:
+			chunk = self.m_queue.get()
+			if isinstance(chunk, Exception):
+				raise chunk
+			if len(chunk) == 0:
+				return
+			yield chunk
+	
+	def __iter__(self):
+		encoding = self.m_encoding
+		binary = self.m_binary
+		tail = b""
+		for chunk in self._chunks():
+			raws = (tail + chunk).split(b"\n")
+			tail = raws.pop()
+			for raw in raws:
+				self.offset += len(raw) + 1
+				if raw.endswith(b"\r"):
+					raw = raw[:-1]
+				yield raw + b"\n" if binary else raw.decode(encoding) + "\n"
+		
+		if len(tail) > 0:
+			self.offset += len(tail)
+			yield tail if binary else tail.decode(encoding)
+	
+	def close(self):
+		r"""
+		Stops the reading thread and closes the file.
+		"""
+		self.m_stop.set()
+		self.m_thread.join()
+		self.m_file.close()
+
+class write_behind_writer:
+	r"""
+	Passes the lines written to a thread that writes them into `writer` (an
+	`output_writer.output_writer`). The lines are passed in batches of about
+	`batch_size` characters, and at most `queue_size` batches wait in memory.
+	
+	This class has the same interface as `output_writer.output_writer`. Errors
+	raised by the thread are raised by the next call to this object.
+	"""
+	
+	def __init__(self, writer, batch_size, queue_size = DefaultQueueSize):
+		self.m_writer = writer
+		self.m_batch_size = max(1, batch_size)
+		self.m_batch = []
+		self.m_batched = 0
+		self.m_error = None
+		
+		self.m_queue = queue.Queue(maxsize = max(1, queue_size))
+		self.m_thread = threading.Thread(target = self._write_batches, daemon = True)
+		self.m_thread.start()
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exc_type, exc_value, traceback):
+		if exc_type is None:
+			self.commit()
+		else:
+			self.abort()
+		return False
+	
+	def get_filename(self):
+		return self.m_writer.get_filename()
+	
+	def get_temporary_file(self):
+		return self.m_writer.get_temporary_file()
+	
+	def _write_batches(self):
+		r"""
+		Body of the writing thread. A batch None stops the thread, and a batch
+		of bytes is written as it is (see `write_encoded`). After an error the
+		remaining batches are discarded.
+		"""
+		while True:
+			batch = self.m_queue.get()
+			try:
+				if batch is None:
+					return
+				if self.m_error is None:
+					if isinstance(batch, bytes):
+						self.m_writer.write_encoded(batch)
+					else:
+						self.m_writer.write_lines(batch)
+			except Exception as e:
+				self.m_error = e
+			finally:
+				self.m_queue.task_done()
+	
+	def _check_error(self):
+		if self.m_error is not None:
+			raise self.m_error
+	
+	def _send_batch(self):
+		self._check_error()
+		if len(self.m_batch) > 0:
+			self.m_queue.put(self.m_batch)
+			self.m_batch = []
+			self.m_batched = 0
+	
+	def write_line(self, line):
+		self.m_batch.append(line)
+		self.m_batched += len(line) + 1
+		if self.m_batched >= self.m_batch_size:
+			self._send_batch()
+	
+	def write_lines(self, lines):
+		for line in lines:
+			self.write_line(line)
+	
+	def write_encoded(self, data):
+		self._send_batch()
+		self.m_queue.put(bytes(data))
+	
+	def _stop(self):
+		self.m_queue.put(None)
+		self.m_thread.join()
+	
+	def sync(self):
+		r"""
+		Waits until the thread has written all the lines, and forces them to
+		the disk. Returns the size of the temporary file.
+		"""
+		self._send_batch()
+		self.m_queue.join()
+		self._check_error()
+		return self.m_writer.sync()
+	
+	def commit(self):
+		self._send_batch()
+		self._stop()
+		self._check_error()
+		self.m_writer.commit()
+	
+	def abort(self):
+		self.m_batch = []
+		self._stop()
+		self.m_writer.abort()
+
+if __name__ == "__main__":
+	# TESTS
+	import tempfile
+	import treebank_parser.output_writer as tbp_output_writer
+	
+	with tempfile.TemporaryDirectory() as directory:
+		filename = os.path.join(directory, "input.txt")
+		with open(filename, 'wb') as f:
+			f.write("1\tà\r\n\n2\tb\n3".encode("utf-8"))
+		
+		# chunks smaller than the lines
+		offsets = []
+		with read_ahead_reader(filename, "utf-8", chunk_size = 2, queue_size = 1) as reader:
+			lines = []
+			for line in reader:
+				lines.append(line)
+				offsets.append(reader.offset)
+		assert( lines == ["1\tà\n", "\n", "2\tb\n", "3"] )
+		assert( offsets == [6, 7, 11, 12] )
+		
+		with read_ahead_reader(filename, "utf-8", offsets[1]) as reader:
+			assert( list(reader) == ["2\tb\n", "3"] )
+		
+		# stop reading early
+		with read_ahead_reader(filename, "utf-8", chunk_size = 1, queue_size = 1) as reader:
+			for line in reader:
+				break
+		
+		output = os.path.join(directory, "output.heads")
+		with write_behind_writer(tbp_output_writer.output_writer(output, buffer_size = 4), 4, queue_size = 1) as w:
+			w.write_lines(str(i) for i in range(0, 100))
+			assert( w.sync() == len(''.join(f"{i}\n" for i in range(0, 100))) )
+			w.write_line("end")
+		with open(output, 'r') as f:
+			assert( f.read() == ''.join(f"{i}\n" for i in range(0, 100)) + "end\n" )
+		
+		# lines already encoded are written in order with the others
+		with write_behind_writer(tbp_output_writer.output_writer(output), 1024) as w:
+			w.write_line("0 1")
+			block = bytearray(b"2 0\n0\n")
+			w.write_encoded(block)
+			block.clear()
+			w.write_line("1 0")
+		with open(output, 'r') as f:
+			assert( f.read() == "0 1\n2 0\n0\n1 0\n" )
+		
+		w = write_behind_writer(tbp_output_writer.output_writer(output), 4)
+		w.write_line("lost")
+		w.abort()
+		assert( sorted(os.listdir(directory)) == ["input.txt", "output.heads"] )
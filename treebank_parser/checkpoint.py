@@ -0,0 +1,153 @@
+######################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+######################################################################
+
+r"""
+Checkpoints of the parse of a treebank file, so that a parse that was interrupted
+can be resumed.
+
+This module contains two classes: `tracking_reader`, which reads the lines of a
+file while keeping the exact byte offset of the next line, and `checkpoint`,
+which saves and loads the state of a parse.
+
+A checkpoint is a JSON file next to the output file, written atomically. It
+records the byte offset in the input file of the first sentence not yet stored,
+the length of the (partial) output file once all the head vectors stored so far
+have been flushed, and the counters of the parser at that point.
+"""
+
+import os
+import json
+import locale
+
+class tracking_reader:
+	r"""
+	Reads the lines of a file in binary mode and decodes them, keeping the
+	exact byte offset of the next line to be read in `offset`.
+	
+	Line endings "\r\n" are converted to "\n", as in text mode. If `binary`
+	is True, the lines are not decoded and are handed out as `bytes`.
+	"""
+	
+	def __init__(self, filename, encoding = None, offset = 0, binary = False):
+		if encoding is None:
+			encoding = locale.getpreferredencoding(False)
+		self.m_encoding = encoding
+		self.m_binary = binary
+		self.m_file = open(filename, 'rb')
+		self.m_file.seek(offset)
+		self.offset = offset
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.m_file.close()
+		return False
+	
+	def __iter__(self):
+		encoding = self.m_encoding
+		binary = self.m_binary
+		for raw in self.m_file:
+			self.offset += len(raw)
+			if raw.endswith(b"\r\n"):
+				raw = raw[:-2] + b"\n"
+			yield raw if binary else raw.decode(encoding)
+
+class checkpoint:
+	r"""
+	The checkpoint of the parse whose output file is `output_file`.
+	"""
+	
+	def __init__(self, output_file):
+		self.m_filename = output_file + ".checkpoint"
+	
+	def get_filename(self):
+		return self.m_filename
+	
+	def exists(self):
+		return os.path.exists(self.m_filename)
+	
+	def load(self):
+		r"""
+		Returns the state stored in the checkpoint as a dictionary.
+		"""
+		with open(self.m_filename, 'r') as f:
+			return json.load(f)
+	
+	def save(self, state):
+		r"""
+		Stores the dictionary `state` in the checkpoint. The checkpoint file is
+		replaced atomically: a crash leaves either the old or the new checkpoint.
+		"""
+		tmp = self.m_filename + ".tmp"
+		with open(tmp, 'w') as f:
+			json.dump(state, f)
+			f.flush()
+			os.fsync(f.fileno())
+		os.replace(tmp, self.m_filename)
+	
+	def remove(self):
+		try:
+			os.remove(self.m_filename)
+		except FileNotFoundError:
+			pass
+
+if __name__ == "__main__":
+	# TESTS
+	import tempfile
+	
+	with tempfile.TemporaryDirectory() as directory:
+		filename = os.path.join(directory, "input.txt")
+		with open(filename, 'wb') as f:
+			f.write("1\tà\r\n\n2\tb\n".encode("utf-8"))
+		
+		offsets = []
+		with tracking_reader(filename, "utf-8") as reader:
+			lines = []
+			for line in reader:
+				lines.append(line)
+				offsets.append(reader.offset)
+		assert( lines == ["1\tà\n", "\n", "2\tb\n"] )
+		assert( offsets == [6, 7, 11] )
+		
+		with tracking_reader(filename, "utf-8", offsets[1]) as reader:
+			assert( list(reader) == ["2\tb\n"] )
+		
+		c = checkpoint(os.path.join(directory, "output.heads"))
+		assert( not c.exists() )
+		c.save({"input_offset": 7, "output_position": 0})
+		assert( c.exists() )
+		assert( c.load() == {"input_offset": 7, "output_position": 0} )
+		c.remove()
+		assert( not c.exists() )
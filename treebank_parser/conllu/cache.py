@@ -0,0 +1,237 @@
+######################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+######################################################################
+
+r"""
+Cache of pre-tokenised CoNLL-U treebanks.
+
+The first time a treebank file is parsed with the cache enabled, the columns of
+all its sentences (see `conllu.columnar.sentence_batch`) are saved into a cache
+file. Later parses of the same file, possibly with other actions, map the cache
+file into memory with `mmap` and go straight to the processing of the trees,
+without reading and tokenising the treebank again.
+
+A cache file starts with a JSON header, which contains the key of the treebank
+file (its size, modification time and hash), the symbol tables, the IDs of the
+sentences and the contents of the invalid lines, followed by the raw contents
+of the integer columns. The cache is valid if the size and modification time
+of the treebank file are those in the key or, if they are not, if the hash of
+the contents of the file is.
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+
+from treebank_parser.conllu import columnar
+import treebank_parser.output_log as tbp_logging
+
+Magic = b"TBPCACHE"
+Version = 1
+
+# integer columns of a `sentence_batch` stored in the cache file
+_columns = [
+	"m_ID", "m_HEAD", "m_UPOS", "m_DEPREL", "m_line_number",
+	"m_offsets", "m_sentence_number", "m_starting_line"
+]
+
+def get_cache_filename(input_file, cache_directory = None):
+	r"""
+	Returns the name of the cache file of the treebank file `input_file`: the
+	file `<input_file>.tbpcache` if `cache_directory` is None, or a file in
+	`cache_directory` named after the hash of the absolute path of the input.
+	"""
+	if cache_directory is None:
+		return input_file + ".tbpcache"
+	name = hashlib.blake2b(os.path.abspath(input_file).encode("utf-8"), digest_size = 16).hexdigest()
+	return os.path.join(cache_directory, name + ".tbpcache")
+
+def _file_hash(filename):
+	h = hashlib.blake2b(digest_size = 32)
+	with open(filename, 'rb') as f:
+		for chunk in iter(lambda: f.read(1024*1024), b""):
+			h.update(chunk)
+	return h.hexdigest()
+
+class treebank_cache:
+	r"""
+	The cache file `cache_file` of the treebank file `input_file`.
+	"""
+	
+	def __init__(self, input_file, cache_file):
+		self.m_input_file = input_file
+		self.m_cache_file = cache_file
+	
+	def get_filename(self):
+		return self.m_cache_file
+	
+	def _read_header(self, f):
+		r"""
+		Returns the header of the cache file opened in `f`, and the position
+		where the columns start, or None if the file is not a cache file of
+		this version.
+		"""
+		if f.read(len(Magic)) != Magic: return None
+		(header_size,) = struct.unpack("<Q", f.read(8))
+		header = json.loads(f.read(header_size).decode("utf-8"))
+		if header.get("version") != Version: return None
+		if header.get("byteorder") != sys.byteorder: return None
+		return header, len(Magic) + 8 + header_size
+	
+	def _is_valid(self, header):
+		stat = os.stat(self.m_input_file)
+		if stat.st_size != header["size"]: return False
+		if stat.st_mtime_ns == header["mtime_ns"]: return True
+		return _file_hash(self.m_input_file) == header["hash"]
+	
+	def load(self, categorize_UPOS = None, categorize_DEPREL = None):
+		r"""
+		Returns a `sentence_batch` with all the sentences of the treebank, whose
+		integer columns are views of the cache file mapped into memory, or None
+		if there is no valid cache file.
+		"""
+		try:
+			with open(self.m_cache_file, 'rb') as f:
+				read = self._read_header(f)
+				if read is None or not self._is_valid(read[0]): return None
+				header, start = read
+				contents = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+		except FileNotFoundError:
+			return None
+		except (OSError, ValueError, KeyError) as e:
+			tbp_logging.warning(f"Could not read the cache file {self.m_cache_file}: {e}")
+			return None
+		
+		batch = columnar.sentence_batch(categorize_UPOS, categorize_DEPREL)
+		view = memoryview(contents)
+		for name in _columns:
+			typecode, itemsize, offset, length = header["columns"][name]
+			if struct.calcsize(typecode) != itemsize: return None
+			begin = start + offset
+			setattr(batch, name, view[begin : begin + itemsize*length].cast(typecode))
+		
+		# the symbols are interned in the order of their codes
+		for symbol in header["UPOS_symbols"]:
+			batch.m_UPOS_symbols.intern(symbol)
+		for symbol in header["DEPREL_symbols"]:
+			batch.m_DEPREL_symbols.intern(symbol)
+		batch.m_sentence_id = header["sentence_id"]
+		batch.m_invalid_lines = {int(i): line for i, line in header["invalid_lines"].items()}
+		return batch
+	
+	def save(self, batch):
+		r"""
+		Saves the `sentence_batch` `batch`, which contains all the sentences of
+		the treebank, into the cache file. The file is replaced atomically.
+		"""
+		stat = os.stat(self.m_input_file)
+		
+		columns = {}
+		offset = 0
+		for name in _columns:
+			column = getattr(batch, name)
+			columns[name] = [column.typecode, column.itemsize, offset, len(column)]
+			offset += column.itemsize*len(column)
+		
+		header = json.dumps({
+			"version": Version,
+			"byteorder": sys.byteorder,
+			"size": stat.st_size,
+			"mtime_ns": stat.st_mtime_ns,
+			"hash": _file_hash(self.m_input_file),
+			"columns": columns,
+			"UPOS_symbols": batch.m_UPOS_symbols.m_symbols,
+			"DEPREL_symbols": batch.m_DEPREL_symbols.m_symbols,
+			"sentence_id": [batch.get_sentence_id(s) for s in range(0, batch.num_sentences())],
+			"invalid_lines": batch.m_invalid_lines
+		}).encode("utf-8")
+		
+		tmp = f"{self.m_cache_file}.tmp.{os.getpid()}"
+		try:
+			directory = os.path.dirname(self.m_cache_file)
+			if directory != "":
+				os.makedirs(directory, exist_ok = True)
+			with open(tmp, 'wb') as f:
+				f.write(Magic)
+				f.write(struct.pack("<Q", len(header)))
+				f.write(header)
+				for name in _columns:
+					getattr(batch, name).tofile(f)
+			os.replace(tmp, self.m_cache_file)
+		except OSError as e:
+			tbp_logging.warning(f"Could not write the cache file {self.m_cache_file}: {e}")
+			try:
+				os.remove(tmp)
+			except OSError:
+				pass
+			return
+		tbp_logging.info(f"Saved the tokenised treebank into the cache file {self.m_cache_file}")
+
+if __name__ == "__main__":
+	# TESTS
+	import tempfile
+	
+	with tempfile.TemporaryDirectory() as directory:
+		input_file = os.path.join(directory, "input.conllu")
+		with open(input_file, 'w') as f:
+			f.write("1\tSí\tsí\tINTJ\t_\t_\t0\troot\t_\t_\n2\t!\t!\tPUNCT\t_\t_\tx\tpunct\t_\t_\n\n")
+		
+		batch = columnar.sentence_batch()
+		batch.add_token("1\tSí\tsí\tINTJ\t_\t_\t0\troot\t_\t_\n", 1)
+		batch.add_token("2\t!\t!\tPUNCT\t_\t_\tx\tpunct\t_\t_\n", 2)
+		batch.end_sentence(1, 1, "s1")
+		
+		cache = treebank_cache(input_file, get_cache_filename(input_file))
+		assert( cache.load() is None )
+		cache.save(batch)
+		
+		loaded = cache.load(lambda upos: 1 if upos == "PUNCT" else 0)
+		assert( loaded.num_sentences() == 1 )
+		assert( loaded.sentence_range(0) == (0, 2) )
+		assert( loaded.m_HEAD[0:2].tolist() == [0, columnar.INVALID] )
+		assert( loaded.get_invalid_line(1) == "2\t!\t!\tPUNCT\t_\t_\tx\tpunct\t_\t_" )
+		assert( loaded.m_sentence_id == ["s1"] )
+		assert( loaded.UPOS_categories() == bytes([0, 1]) )
+		
+		# same contents, another modification time: still valid
+		os.utime(input_file, ns = (0, 0))
+		assert( cache.load() is not None )
+		# other contents: not valid
+		with open(input_file, 'a') as f:
+			f.write("\n")
+		assert( cache.load() is None )
+		
+		assert( os.path.dirname(get_cache_filename(input_file, "cache")) == "cache" )
@@ -0,0 +1,425 @@
+######################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+######################################################################
+
+r"""
+Columnar (struct-of-arrays) representation of CoNLL-U sentences.
+
+This module contains a single class `sentence_batch`, which stores a batch of
+sentences as a few arrays of integers, one for each of the fields ID, HEAD, UPOS
+and DEPREL, plus the offsets of the sentences within them. UPOS tags and DEPREL
+labels are interned with a `symbol_table`.
+
+The categories of the tokens (punctuation mark, function word, ...) are
+computed once per distinct symbol, and then mapped over a whole column,
+yielding one byte of categories per token of the batch.
+"""
+
+from array import array
+
+from treebank_parser.symbol_table import symbol_table
+import treebank_parser.output_log as tbp_logging
+
+# value stored in the ID and HEAD columns when the field is not an integer
+INVALID = -1
+
+def extract_sentence_id(line):
+	r"""
+	Returns the ID in the comment line `line` ("# sent_id = ID", read in binary
+	mode), or None if the line does not have the character '='.
+	"""
+	fields = line.split(b'=')
+	if len(fields) == 1: return None
+	return fields[1].decode("utf-8", errors = "replace").strip()
+
+class sentence_batch:
+	r"""
+	A batch of sentences of a CoNLL-U file in columnar form.
+	
+	Only the tokens that are neither multiword tokens (1-2, 8-10, ...) nor empty
+	tokens (1.1, 5.1, ...) are stored. Token `i` of the batch has its fields in
+	position `i` of every column; the tokens of sentence `s` are the positions
+	in the range `[m_offsets[s], m_offsets[s + 1])`.
+	
+	The symbol tables are kept when the batch is cleared, so that the codes of
+	UPOS tags and DEPREL labels are the same for all the batches of a file.
+	"""
+	
+	def __init__(self, categorize_UPOS = None, categorize_DEPREL = None):
+		r"""
+		Initialises an empty batch. The functions `categorize_UPOS` and
+		`categorize_DEPREL` return the categories of a UPOS tag and of a DEPREL
+		label (see `treebank_parser.symbol_table`).
+		"""
+		self.m_UPOS_symbols = symbol_table(categorize_UPOS)
+		self.m_DEPREL_symbols = symbol_table(categorize_DEPREL)
+		# codes of the UPOS tags and DEPREL labels as read in binary mode
+		self.m_UPOS_bytes = {}
+		self.m_DEPREL_bytes = {}
+		
+		# token columns
+		self.m_ID = array('l')
+		self.m_HEAD = array('l')
+		self.m_UPOS = array('H')
+		self.m_DEPREL = array('H')
+		self.m_line_number = array('L')
+		# contents of the lines whose ID or HEAD are not integers, indexed by
+		# the position of the token in the batch. Only used to report errors.
+		self.m_invalid_lines = {}
+		# number of multiword tokens and of empty tokens skipped
+		self.m_num_multiword_tokens = 0
+		self.m_num_empty_tokens = 0
+		
+		# sentence columns
+		self.m_offsets = array('L', [0])
+		self.m_sentence_number = array('L')
+		self.m_starting_line = array('L')
+		# the IDs of the sentences are extracted only when they are requested
+		# (see `get_sentence_id`): until then, the comment line with the ID
+		# is stored as read. Sentences without ID have None.
+		self.m_sentence_id = []
+	
+	def clear(self):
+		r"""
+		Removes all sentences from the batch. Keeps the symbol tables.
+		"""
+		del self.m_ID[:]
+		del self.m_HEAD[:]
+		del self.m_UPOS[:]
+		del self.m_DEPREL[:]
+		del self.m_line_number[:]
+		self.m_invalid_lines.clear()
+		self.m_num_multiword_tokens = 0
+		self.m_num_empty_tokens = 0
+		
+		del self.m_offsets[1:]
+		del self.m_sentence_number[:]
+		del self.m_starting_line[:]
+		self.m_sentence_id.clear()
+	
+	def empty_sharing_symbols(self):
+		r"""
+		Returns a new empty batch that shares the symbol tables of this batch.
+		"""
+		batch = sentence_batch()
+		batch.m_UPOS_symbols = self.m_UPOS_symbols
+		batch.m_DEPREL_symbols = self.m_DEPREL_symbols
+		batch.m_UPOS_bytes = self.m_UPOS_bytes
+		batch.m_DEPREL_bytes = self.m_DEPREL_bytes
+		return batch
+	
+	def extend(self, other):
+		r"""
+		Appends all the sentences of the batch `other` to this batch. The codes
+		of the symbols are copied as they are, so both batches must share their
+		symbol tables (see `empty_sharing_symbols`).
+		"""
+		n = len(self.m_ID)
+		self.m_ID.extend(other.m_ID)
+		self.m_HEAD.extend(other.m_HEAD)
+		self.m_UPOS.extend(other.m_UPOS)
+		self.m_DEPREL.extend(other.m_DEPREL)
+		self.m_line_number.extend(other.m_line_number)
+		for i, line in other.m_invalid_lines.items():
+			self.m_invalid_lines[n + i] = line
+		self.m_num_multiword_tokens += other.m_num_multiword_tokens
+		self.m_num_empty_tokens += other.m_num_empty_tokens
+		
+		self.m_offsets.extend(n + offset for offset in other.m_offsets[1:])
+		self.m_sentence_number.extend(other.m_sentence_number)
+		self.m_starting_line.extend(other.m_starting_line)
+		self.m_sentence_id.extend(other.m_sentence_id)
+	
+	def add_token(self, line, line_number):
+		r"""
+		Parses a token line of the current sentence and appends its fields to
+		the columns. Multiword tokens and empty tokens are skipped.
+		"""
+		if line[-1] == "\n": line = line[:-1]
+		fields = line.split('\t')
+		
+		# ensure that this CoNLL-U
+		if len(fields) != 10:
+			tbp_logging.critical( "Amount of fields in line")
+			tbp_logging.critical(f"    '{line}'")
+			tbp_logging.critical( "is not 10 as specified in the CoNLL-U format.")
+			tbp_logging.critical( "See: https://universaldependencies.org/format.html")
+			assert(len(fields) == 10)
+		
+		ID = fields[0]
+		if ID.find("-") != -1:
+			# multiword token
+			self.m_num_multiword_tokens += 1
+			return
+		if ID.find(".") != -1:
+			# empty token
+			self.m_num_empty_tokens += 1
+			return
+		
+		i = len(self.m_ID)
+		try:
+			self.m_ID.append(int(ID))
+		except ValueError:
+			self.m_ID.append(INVALID)
+			self.m_invalid_lines[i] = line
+		
+		try:
+			self.m_HEAD.append(int(fields[6]))
+		except ValueError as e:
+			self.m_HEAD.append(INVALID)
+			self.m_invalid_lines[i] = line
+			tbp_logging.debug(f"At token {line_number}")
+			tbp_logging.debug(f"    Head: '{fields[6]}'")
+			tbp_logging.debug(f"    Within line: '{line}'")
+			tbp_logging.debug(f"    Exception: '{e}'")
+		
+		self.m_UPOS.append(self.m_UPOS_symbols.intern(fields[3]))
+		self.m_DEPREL.append(self.m_DEPREL_symbols.intern(fields[7]))
+		self.m_line_number.append(line_number)
+	
+	def add_token_bytes(self, line, line_number):
+		r"""
+		Same as `add_token`, for a line read in binary mode and encoded in
+		UTF-8. Only the columns ID, HEAD, UPOS and DEPREL are decoded, and the
+		UPOS tags and DEPREL labels only the first time they are found. The
+		whole line is decoded only when it has to be reported.
+		"""
+		if line[-1:] == b"\n": line = line[:-1]
+		if line[-1:] == b"\r": line = line[:-1]
+		fields = line.split(b'\t')
+		
+		if len(fields) != 10:
+			# report the error as `add_token` does
+			self.add_token(line.decode("utf-8", errors = "replace"), line_number)
+			return
+		
+		ID = fields[0]
+		if b"-" in ID:
+			# multiword token
+			self.m_num_multiword_tokens += 1
+			return
+		if b"." in ID:
+			# empty token
+			self.m_num_empty_tokens += 1
+			return
+		
+		i = len(self.m_ID)
+		try:
+			self.m_ID.append(int(ID))
+		except ValueError:
+			self.m_ID.append(INVALID)
+			self.m_invalid_lines[i] = line.decode("utf-8", errors = "replace")
+		
+		try:
+			self.m_HEAD.append(int(fields[6]))
+		except ValueError as e:
+			self.m_HEAD.append(INVALID)
+			self.m_invalid_lines[i] = line.decode("utf-8", errors = "replace")
+			tbp_logging.debug(f"At token {line_number}")
+			tbp_logging.debug(f"    Head: '{fields[6].decode('utf-8', errors = 'replace')}'")
+			tbp_logging.debug(f"    Within line: '{self.m_invalid_lines[i]}'")
+			tbp_logging.debug(f"    Exception: '{e}'")
+		
+		UPOS = fields[3]
+		code = self.m_UPOS_bytes.get(UPOS)
+		if code is None:
+			code = self.m_UPOS_symbols.intern(UPOS.decode("utf-8", errors = "replace"))
+			self.m_UPOS_bytes[UPOS] = code
+		self.m_UPOS.append(code)
+		
+		DEPREL = fields[7]
+		code = self.m_DEPREL_bytes.get(DEPREL)
+		if code is None:
+			code = self.m_DEPREL_symbols.intern(DEPREL.decode("utf-8", errors = "replace"))
+			self.m_DEPREL_bytes[DEPREL] = code
+		self.m_DEPREL.append(code)
+		
+		self.m_line_number.append(line_number)
+	
+	def end_sentence(self, sentence_number, starting_line, sentence_id):
+		r"""
+		Closes the current sentence: all tokens added since the previous call
+		to this function make up a new sentence of the batch. The ID of the
+		sentence is given as a string or as its comment line (`bytes`).
+		"""
+		self.m_offsets.append(len(self.m_ID))
+		self.m_sentence_number.append(sentence_number)
+		self.m_starting_line.append(starting_line)
+		self.m_sentence_id.append(sentence_id)
+	
+	def num_sentences(self):
+		r"""
+		Returns the number of sentences in the batch.
+		"""
+		return len(self.m_sentence_id)
+	
+	def num_tokens(self):
+		r"""
+		Returns the number of tokens in the batch.
+		"""
+		return len(self.m_ID)
+	
+	def sentence_range(self, s):
+		r"""
+		Returns the positions `(begin, end)` of the first token of sentence `s`
+		and one past its last token.
+		"""
+		return self.m_offsets[s], self.m_offsets[s + 1]
+	
+	def get_sentence_id(self, s):
+		r"""
+		Returns the ID of sentence `s`, or None if it does not have one.
+		"""
+		sentence_id = self.m_sentence_id[s]
+		if isinstance(sentence_id, bytes):
+			sentence_id = extract_sentence_id(sentence_id)
+			self.m_sentence_id[s] = sentence_id
+		return sentence_id
+	
+	def get_invalid_line(self, i):
+		r"""
+		Returns the line of token `i` if its ID or HEAD are not integers.
+		"""
+		return self.m_invalid_lines.get(i, "")
+	
+	def UPOS_categories(self):
+		r"""
+		Returns the categories of the UPOS tag of every token in the batch as
+		a `bytes` object.
+		"""
+		table = self.m_UPOS_symbols.get_categories_table()
+		return bytes(map(table.__getitem__, self.m_UPOS))
+	
+	def DEPREL_categories(self):
+		r"""
+		Returns the categories of the DEPREL label of every token in the batch
+		as a `bytes` object.
+		"""
+		table = self.m_DEPREL_symbols.get_categories_table()
+		return bytes(map(table.__getitem__, self.m_DEPREL))
+
+if __name__ == "__main__":
+	# TESTS
+	from treebank_parser import symbol_table as tbp_symbols
+	
+	batch = sentence_batch(
+		lambda upos: (tbp_symbols.PunctuationMark if upos == "PUNCT" else 0) |
+					 (tbp_symbols.FunctionWord if upos in ["ADP", "DET"] else 0),
+		lambda deprel: tbp_symbols.PunctuationMark if deprel == "punct" else 0
+	)
+	
+	sentence1 = [
+		"1-2	Del	_	_	_	_	_	_	_	_",
+		"1	De	de	ADP	_	_	3	case	_	_",
+		"2	el	el	DET	_	_	3	det	_	_",
+		"3	gat	gat	NOUN	_	_	0	root	_	_",
+		"3.1	ve	venir	VERB	_	_	_	_	3:orphan	_",
+		"4	.	.	PUNCT	_	_	3	punct	_	_",
+	]
+	sentence2 = [
+		"1	Sí	sí	INTJ	_	_	0	root	_	_",
+		"2	!	!	PUNCT	_	_	x	punct	_	_",
+	]
+	
+	for i, line in enumerate(sentence1):
+		batch.add_token(line + "\n", i + 1)
+	batch.end_sentence(1, 1, "s1")
+	for i, line in enumerate(sentence2):
+		batch.add_token(line, i + 8)
+	batch.end_sentence(2, 8, "s2")
+	
+	assert( batch.num_sentences() == 2 )
+	assert( batch.num_tokens() == 6 )
+	assert( batch.sentence_range(0) == (0, 4) )
+	assert( batch.sentence_range(1) == (4, 6) )
+	assert( batch.m_ID.tolist() == [1, 2, 3, 4, 1, 2] )
+	assert( batch.m_HEAD.tolist() == [3, 3, 0, 3, 0, INVALID] )
+	assert( batch.m_line_number.tolist() == [2, 3, 4, 6, 8, 9] )
+	assert( batch.get_invalid_line(5) == sentence2[1] )
+	assert( batch.get_invalid_line(0) == "" )
+	assert( batch.m_UPOS_symbols.get_symbol(batch.m_UPOS[4]) == "INTJ" )
+	assert( batch.m_UPOS[3] == batch.m_UPOS[5] )
+	assert( batch.m_num_multiword_tokens == 1 )
+	assert( batch.m_num_empty_tokens == 1 )
+	
+	P = tbp_symbols.PunctuationMark
+	F = tbp_symbols.FunctionWord
+	assert( list(batch.UPOS_categories()) == [F, F, 0, P, 0, P] )
+	assert( list(batch.DEPREL_categories()) == [0, 0, 0, P, 0, P] )
+	
+	remove = batch.UPOS_categories().translate(tbp_symbols.make_mask_table(P | F))
+	assert( list(remove) == [1, 1, 0, 1, 0, 1] )
+	
+	whole = batch.empty_sharing_symbols()
+	whole.extend(batch)
+	whole.extend(batch)
+	assert( whole.num_sentences() == 4 )
+	assert( whole.sentence_range(3) == (10, 12) )
+	assert( whole.get_invalid_line(11) == sentence2[1] )
+	assert( whole.m_sentence_id == ["s1", "s2", "s1", "s2"] )
+	assert( whole.UPOS_categories() == batch.UPOS_categories()*2 )
+	assert( whole.m_num_multiword_tokens == 2 )
+	
+	batch.clear()
+	assert( batch.num_sentences() == 0 )
+	assert( batch.num_tokens() == 0 )
+	assert( batch.m_num_empty_tokens == 0 )
+	assert( batch.m_UPOS_symbols.size() == 5 )
+	
+	# lines read in binary mode give the same columns as lines read in text mode
+	binary = batch.empty_sharing_symbols()
+	for i, line in enumerate(sentence1):
+		binary.add_token_bytes(line.encode("utf-8") + b"\r\n", i + 1)
+	binary.end_sentence(1, 1, "s1")
+	for i, line in enumerate(sentence2):
+		binary.add_token_bytes(line.encode("utf-8"), i + 8)
+	binary.end_sentence(2, 8, "s2")
+	
+	assert( binary.m_ID == whole.m_ID[:6] )
+	assert( binary.m_HEAD == whole.m_HEAD[:6] )
+	assert( binary.m_UPOS == whole.m_UPOS[:6] )
+	assert( binary.m_DEPREL == whole.m_DEPREL[:6] )
+	assert( binary.m_line_number == whole.m_line_number[:6] )
+	assert( binary.get_invalid_line(5) == sentence2[1] )
+	assert( binary.m_num_multiword_tokens == 1 )
+	assert( binary.m_num_empty_tokens == 1 )
+	
+	assert( extract_sentence_id(b"# sent_id = s3\r\n") == "s3" )
+	assert( extract_sentence_id(b"# sent_id\n") is None )
+	binary.end_sentence(3, 11, b"# sent_id = s3\n")
+	binary.end_sentence(4, 12, None)
+	assert( binary.get_sentence_id(2) == "s3" )
+	assert( binary.m_sentence_id[2] == "s3" )
+	assert( binary.get_sentence_id(0) == "s1" )
+	assert( binary.get_sentence_id(3) is None )
+	assert( batch.m_UPOS_symbols.size() == 5 )
@@ -40,6 +40,24 @@ The `line_parser` class parses the contents of a line in a CoNLLU-formatted file
 
 import treebank_parser.output_log as tbp_logging
 
+# UPOS tags of function words. This criterion is copied from function
+# 'isFunctionWord' from the file
+#	https://github.com/lluisalemanypuig/optimality-syntactic-dependency-distances/blob/master/processing_of_treebanks_and_tests/LabelledDependencyStructure.java
+function_word_UPOS = frozenset(["ADP","AUX","CCONJ","DET","NUM","PART","PRON","SCONJ"])
+
+def is_punctuation_mark_UPOS(UPOS):
+	r"""
+	Returns whether or not a token with UPOS tag `UPOS` is a punctuation mark.
+	"""
+	return UPOS == "PUNCT"
+
+def is_function_word_UPOS(UPOS):
+	r"""
+	Returns whether or not a token with UPOS tag `UPOS` is a function word,
+	that is, whether `UPOS` is in `function_word_UPOS`.
+	"""
+	return UPOS in function_word_UPOS
+
 class line_parser:
 	r"""
 	This class implements an algorithm to parse word lines from the Conll-U format.
@@ -213,7 +231,7 @@ class line_parser:
 		r"""
 		Returns whether or not this token is a punctuation mark.
 		"""
-		return self.get_UPOS() == "PUNCT"
+		return is_punctuation_mark_UPOS(self.get_UPOS())
 	
 	def is_multiword_token(self):
 		r"""
@@ -243,7 +261,7 @@ class line_parser:
 		This criterion is copied from function 'isFunctionWord' from the file
 			https://github.com/lluisalemanypuig/optimality-syntactic-dependency-distances/blob/master/processing_of_treebanks_and_tests/LabelledDependencyStructure.java
 		"""
-		return self.get_UPOS() in ["ADP","AUX","CCONJ","DET","NUM","PART","PRON","SCONJ"]
+		return is_function_word_UPOS(self.get_UPOS())
 	
 	def __repr__(self):
 		return f"({self.get_line_number()}) ID: '{self.get_ID()}' FORM: '{self.get_FORM()}' LEMMA: '{self.get_LEMMA()}' UPOS: '{self.get_UPOS()}' XPOS: '{self.get_XPOS()}' FEATS: '{self.get_FEATS()}' HEAD: '{self.get_HEAD()}' DEPREL: '{self.get_DEPREL()}' DEPS: '{self.get_DEPS()}' MISC: '{self.get_MISC()}'"
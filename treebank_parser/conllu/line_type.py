@@ -35,7 +35,8 @@
 r"""
 This is a helper module to make code more readable when classifying lines.
 
-This module only has one method that returns the type of line among three different types:
+This module has a method that returns the type of line among three different
+types (and a variant of it for lines read in binary mode):
 - blank line: `Blank` and `Blank_str`
 - comment line: `Comment` and `Comment_str`
 - token lines: `Token` and `Token_str`
@@ -105,6 +106,36 @@ def classify(line: str):
 
 	return Token
 
+# bytes that a blank line can start with
+_BlankBytes = frozenset(b" \t\r\n")
+
+def classify_bytes(line: bytes):
+	"""
+	Classifies the line passed as parameter, read in binary mode. The line is
+	not decoded; line endings "\r\n" are accepted.
+	
+	Parameters
+	==========
+	- line : the line to be classified. Must be a bytes (`bytes`) object.
+	
+	Returns
+	=======
+	Returns the classification of the line as in function `classify`.
+	"""
+	
+	# corner case
+	if line == b"": return Blank
+	
+	# detect comment lines and most token lines by their first byte
+	first = line[0]
+	if first == 35: return Comment # '#'
+	if first not in _BlankBytes: return Token
+	
+	# detect complex blank lines (spaces + tabs combined)
+	if line.rstrip(b"\r\n").strip(b" \t") == b"": return Blank
+	
+	return Token
+
 def classify_str(line: str):
 	"""
 	Converts a line type to a string.
@@ -138,6 +169,13 @@ if __name__ == "__main__":
 	assert( classify(line_sample) == Blank )
 	assert( classify_str(line_sample) == Blank_str )
 
+	assert( classify_bytes(b"# sent_id = 1\n") == Comment )
+	assert( classify_bytes(b"") == Blank )
+	assert( classify_bytes(b"\n") == Blank )
+	assert( classify_bytes(b" \t \r\n") == Blank )
+	assert( classify_bytes(b"1\tThe\t_\n") == Token )
+	assert( classify_bytes(b" 1\tThe\t_\r\n") == Token )
+
 	line_sample = "    \n"
 	assert( classify(line_sample) == Blank )
 	assert( classify_str(line_sample) == Blank_str )
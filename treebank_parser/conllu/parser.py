@@ -38,58 +38,108 @@ Parser of CoNLLU-formatted files.
 This module contains a single class `parser`.
 """
 
+import io
+import os
 import time
 
 from treebank_parser.generic_parser import generic_parser
+from treebank_parser.conllu import columnar
+from treebank_parser.conllu import cache as tbp_cache
 from treebank_parser.conllu import line_parser
 from treebank_parser.conllu import line_type
+from treebank_parser.conllu import action_type
+from treebank_parser import symbol_table as tbp_symbols
+from treebank_parser import quarantine as tbp_quarantine
 import treebank_parser.output_log as tbp_logging
 
+# default number of sentences read before the actions are applied to all of
+# them (see argument '--sentence-batch-size')
+DefaultBatchSize = 1000
+
+# ID of the sentences without a 'sent_id' comment
+unknown_sentence_id = "Unknown ID"
+
+# beginnings of the comment lines with the ID of a sentence
+SentenceIdPrefixes = (b"# sent_id", b"#sent_id")
+
+class _location_message:
+	r"""
+	The location of the sentence being processed by a parser as a message to
+	be logged. It is only built (and the ID of the sentence only extracted) if
+	the message is printed.
+	"""
+	def __init__(self, parser):
+		self.m_parser = parser
+	
+	def __str__(self):
+		return self.m_parser._location()
+
 class parser(generic_parser):
 	r"""
 	This class implements a parsing algorithm for CoNLLU-formatted files. It uses
-	the modules `conllu.line_parser` and `conllu.line_type` to easily parse the
+	the modules `conllu.columnar` and `conllu.line_type` to easily parse the
 	file.
 	
-	This class basically implements the algorithms to convert each syntactic
-	dependency tree into an object of type `lal.graphs.rooted_tree` and convert
-	each tree into a head vector.
+	The sentences are read in batches of 'm_batch_size' sentences, stored in
+	columnar form (see `conllu.columnar.sentence_batch`). The tokens to be
+	removed are computed for the whole batch at once from the categories of
+	their UPOS tags, and then every sentence of the batch is converted into an
+	object of type `lal.graphs.rooted_tree` and then into a head vector.
 	
 	This class also applies some preprocessing specified by the user via arguments
 	(see main CLI).
 	"""
 	def _location(self):
-		return f"At sentence {self.m_sentence_number} of ID '{self.m_sentence_id}' (starting at line {self.m_sentence_starting_line})"
+		return f"At sentence {self.m_sentence_number} of ID '{self._get_sentence_id()}' (starting at line {self.m_sentence_starting_line})"
 
-	def _build_full_tree(self):
+	def _sentence_location(self):
+		sentence_id = self._get_sentence_id()
+		if sentence_id == unknown_sentence_id: sentence_id = None
+		return (self.m_sentence_number, sentence_id, self.m_sentence_starting_line)
+
+	def _make_head_vector(self, begin, end):
 		r"""
-		This function is used to convert the contents of the member 'm_current_tree'
-		into an object of type `lal.graphs.rooted_tree`. This function uses all
-		tokens in self.m_current_tree_tokens, which are all the tokens in the
-		sentence, excluding multiword tokens (1-2, 8-10, ...) and empty tokens
-		(1.1, 5.1, ...)
+		This function is used to make the head vector of the sentence made up of
+		the tokens in the range `[begin, end)` of the current batch, and to check
+		that it is correct. The batch contains all tokens in the sentence,
+		excluding multiword tokens (1-2, 8-10, ...) and empty tokens (1.1, 5.1, ...)
+		
+		Returns None if the head vector is not correct, after reporting the
+		errors.
 		"""
 		
-		# construct the head vector from the lines while ensuring
-		# that all heads are numerical
-		head_vector = []
-		for token in self.m_sentence_tokens:
-			if token.get_iHEAD() is not None:
-				head_vector.append(token.get_iHEAD())
-
-			else:
+		# construct the head vector from the HEAD column while ensuring
+		# that all heads (and IDs) are numerical
+		batch = self.m_batch
+		head_vector = batch.m_HEAD[begin:end].tolist()
+		for i in range(begin, end):
+			if batch.m_HEAD[i] == columnar.INVALID or batch.m_ID[i] == columnar.INVALID:
+				error = tbp_quarantine.InvalidHeadID
+				if batch.m_ID[i] == columnar.INVALID:
+					error = tbp_quarantine.InvalidTokenID
+				if self._quarantine_sentence(error, [f"Line {batch.m_line_number[i]}: '{batch.get_invalid_line(i)}'"]):
+					return None
+				
 				tbp_logging.error(self._location())
-				tbp_logging.error(f"    At token {token.get_line_number()}")
-				tbp_logging.error(f"    Within line: '{token.get_line()}'")
-				tbp_logging.error(f"    Head: '{token.get_HEAD()}'")
+				tbp_logging.error(f"    At token {batch.m_line_number[i]}")
+				tbp_logging.error(f"    Within line: '{batch.get_invalid_line(i)}'")
+				if batch.m_HEAD[i] == columnar.INVALID:
+					fields = batch.get_invalid_line(i).split('\t')
+					tbp_logging.error(f"    Head: '{fields[6] if len(fields) > 6 else ''}'")
 				tbp_logging.error(f"    {self.m_donotknow_msg}")
-				tbp_logging.error(f"    Head ID is not an integer value")
+				if batch.m_HEAD[i] == columnar.INVALID:
+					tbp_logging.error(f"    Head ID is not an integer value")
+				else:
+					tbp_logging.error(f"    Token ID is not an integer value")
 				return None
 
 		# ensure there aren't errors in the head vector (do this with LAL)
 		tbp_logging.debug("    Checking mistakes in head vector...")
 		err_list = self.LAL_module.io.check_correctness_head_vector(head_vector)
 		if len(err_list) > 0:
+			if self._quarantine_sentence(tbp_quarantine.InvalidHeadVector, [str(err) for err in err_list]):
+				return None
+			
 			tbp_logging.error(self._location())
 			tbp_logging.error(f"There were errors within head vector '{head_vector}'")
 			for err in err_list:
@@ -97,6 +147,14 @@ class parser(generic_parser):
 			tbp_logging.error(self.m_donotknow_msg)
 			return None
 		
+		return head_vector
+
+	def _build_full_tree(self, head_vector):
+		r"""
+		This function is used to convert the head vector of the current sentence
+		(see `_make_head_vector`) into an object of type `lal.graphs.rooted_tree`.
+		"""
+		
 		# make the lal.graphs.rooted_tree() object
 		tbp_logging.debug(f"Make a rooted tree from the head vector {head_vector=}")
 		rt = self.LAL_module.graphs.from_head_vector_to_rooted_tree(head_vector)
@@ -106,32 +164,31 @@ class parser(generic_parser):
 		tbp_logging.debug(f"Is the graph a rooted tree? {rt.is_rooted_tree()}")
 
 		return rt
-	
-	def _should_remove_token(self, token):
-		return any(map(lambda f: f(token), self.m_token_discard_functions))
 
-	def _remove_words_tree(self, rt):
+	def _remove_words_tree(self, rt, begin, end):
 		r"""
 		This function applies the actions passed as parameters (removal of
-		punctuation marks, function words, ...).
+		punctuation marks, function words, ...) to the sentence made up of the
+		tokens in the range `[begin, end)` of the current batch.
 		"""
 		
 		n = rt.get_num_nodes()
 		
-		if len(self.m_token_discard_functions) == 0:
+		remove = self.m_remove_mask
+		if remove is None or remove.find(1, begin, end) == -1:
 			# nothing to do
 			return rt
 		
 		total_deleted = 0
 		tree_vertices__to__tokens = dict( [ (x,x) for x in range(0,n) ] )
 
-		for token in reversed(self.m_sentence_tokens):
+		for i in reversed(range(begin, end)):
 
 			# if word does not meet any criteria for removal
-			if not self._should_remove_token(token): continue
+			if not remove[i]: continue
 
 			# calculate the (actual) id of the word to be removed
-			token_id = int(token.get_ID()) - 1
+			token_id = self.m_batch.m_ID[i] - 1
 
 			# update mapping of actual vertices of the tree to tokens in the sentence
 			total_deleted += 1
@@ -139,7 +196,7 @@ class parser(generic_parser):
 				tree_vertices__to__tokens[u] = tree_vertices__to__tokens[u + 1]
 
 			tbp_logging.debug(f"Tree has {rt.get_num_nodes()} nodes. Word to be removed: {token_id=}")
-			tbp_logging.debug(f"Remove {token_id}. Original ID: {token.get_ID()} -- '{token.get_FORM()}'")
+			tbp_logging.debug(f"Remove {token_id}. Original ID: {self.m_batch.m_ID[i]} (line {self.m_batch.m_line_number[i]})")
 			tbp_logging.debug(f"Tree has root? {rt.has_root()}.")
 			
 			going_to_remove_root = False
@@ -164,8 +221,7 @@ class parser(generic_parser):
 				new_root = None
 				for u in rt.get_out_neighbors(token_id):
 					tbp_logging.debug(f"Child {u}")
-					token_u = self.m_sentence_tokens[tree_vertices__to__tokens[u]]
-					if not self._should_remove_token(token_u):
+					if not remove[begin + tree_vertices__to__tokens[u]]:
 						new_root = u
 						tbp_logging.debug(f"New root is {new_root=}")
 						break
@@ -185,7 +241,7 @@ class parser(generic_parser):
 			else:
 				# reattach the children of this token to this token's parent when
 				# the token is a punctuation mark
-				join_children = self.m_sentence_tokens[token_id].is_punctuation_mark()
+				join_children = (self.m_token_categories[begin + token_id] & tbp_symbols.PunctuationMark) != 0
 
 				tbp_logging.debug(f"Remove token while joining its parent to its children? {join_children}")
 				rt.remove_node(token_id, join_children)
@@ -200,69 +256,138 @@ class parser(generic_parser):
 
 		return rt
 
-	def _make_token_discard_functions(self, args):
+	def _get_sentence_id(self):
+		r"""
+		Returns the ID of the sentence being processed. It is extracted from
+		the batch the first time it is requested.
+		"""
+		if self.m_sentence_id is None:
+			sentence_id = self.m_batch.get_sentence_id(self.m_sentence_index)
+			self.m_sentence_id = unknown_sentence_id if sentence_id is None else sentence_id
+		return self.m_sentence_id
+
+	def _reset_state(self):
+		self.m_sentence_id_line = None
+
+	def _share_sentence(self, p):
+		p.m_batch = self.m_batch
+
+	def _finish_reading_sentence(self, s):
+		r"""
+		Converts the `s`-th sentence of the current batch into a head vector,
+		for this parser and for its variants.
+		"""
+		batch = self.m_batch
+		begin, end = batch.sentence_range(s)
 		
-		# Remove punctuation marks
-		if args.RemovePunctuationMarks:
-			self.m_token_discard_functions.append(
-				lambda token: token.is_punctuation_mark()
-			)
+		all_parsers = self._all_parsers()
+		for p in all_parsers:
+			p.m_sentence_number = batch.m_sentence_number[s]
+			p.m_sentence_index = s
+			p.m_sentence_id = None
+			p.m_sentence_starting_line = batch.m_starting_line[s]
 		
-		# Remove function words
-		if args.RemoveFunctionWords:
-			self.m_remove_function_words = True
-			self.m_token_discard_functions.append(
-				lambda token: token.is_function_word()
-			)
+		tbp_logging.debug(_location_message(self))
 		
-	def _make_sentence_discard_functions(self, args):
+		# the errors in the head vector are reported even if the sentence is
+		# then discarded because of its length
+		self.m_sentence_parsers = all_parsers
+		head_vector = self._make_head_vector(begin, end)
+		self.m_sentence_parsers = [self]
+		if head_vector is None: return
 		
-		# Discard short sentences
-		if args.DiscardSentencesShorter != -1:
-			self.m_sentence_discard_functions.append(
-				lambda rt: rt.get_num_nodes() <= args.DiscardSentencesShorter
-			)
-		# Discard long sentences
-		if args.DiscardSentencesLonger != -1:
-			self.m_sentence_discard_functions.append(
-				lambda rt: rt.get_num_nodes() >= args.DiscardSentencesLonger
-			)
-
-	def _make_sentence_postprocess_functions(self, args):
+		# the parsers that do not discard the sentence before building its tree
+		parsers = []
+		for p in all_parsers:
+			num_removed = 0
+			if p.m_remove_mask is not None:
+				num_removed = p.m_remove_mask.count(1, begin, end)
+			if not p._discard_before_tree(end - begin, num_removed):
+				parsers.append(p)
 		
-		# Chunk sentences according to a single algorithm
-		if args.ChunkSyntacticDependencyTree != None:
-			Anderson = self.LAL_module.linarr.algorithms_chunking.Anderson
-			Macutek = self.LAL_module.linarr.algorithms_chunking.Macutek
-			
-			if args.ChunkSyntacticDependencyTree == "Anderson":
-				self.m_sentence_postprocess_functions.append(
-					lambda rt: self.LAL_module.linarr.chunk_syntactic_dependency_tree(rt, Anderson)
-				)
-			elif args.ChunkSyntacticDependencyTree == "Macutek":
-				self.m_sentence_postprocess_functions.append(
-					lambda rt: self.LAL_module.linarr.chunk_syntactic_dependency_tree(rt, Macutek)
-				)
-
-	def _reset_state(self):
-		self.m_sentence_id = "Unknown ID"
-		self.m_sentence_tokens.clear()
-
-	def _finish_reading_sentence(self):
-		tbp_logging.debug(self._location())
+		if len(parsers) == 0: return
 		tbp_logging.debug("Building the tree...")
 		
-		rt = self._build_full_tree()
-		if rt is None: return
+		self.m_sentence_parsers = parsers
+		rt = self._build_full_tree(head_vector)
 		if not rt.is_rooted_tree():
-			tbp_logging.error("The tree is not a rooted tree. Ignored.")
-			return
+			if not self._quarantine_sentence(tbp_quarantine.NotRootedTree):
+				tbp_logging.error("The tree is not a rooted tree. Ignored.")
+			rt = None
+		self.m_sentence_parsers = [self]
+		if rt is None: return
+
+		for p, t in self._fan_out_tree(parsers, rt):
+			tbp_logging.debug("Remove words if needed...")
+			t = p._remove_words_tree(t, begin, end)
+			
+			tbp_logging.debug("Store the head vector...")
+			p._store_tree(t)
 
-		tbp_logging.debug("Remove words if needed...")
-		rt = self._remove_words_tree(rt)
+	def _compute_remove_masks(self, batch):
+		r"""
+		Computes the categories of the tokens of `batch` and the mask of the
+		tokens to be removed by this parser and by each of its variants.
+		"""
+		categories = None
+		for p in self._all_parsers():
+			p.m_remove_mask = None
+			if p.m_action_plan.removes_tokens():
+				if categories is None:
+					categories = batch.UPOS_categories()
+				p.m_token_categories = categories
+				p.m_remove_mask = categories.translate(p.m_remove_table)
+
+	def _statistics_columns(self):
+		P = tbp_symbols.PunctuationMark
+		F = tbp_symbols.FunctionWord
+		return [
+			("all", 0),
+			(action_type.RemovePunctuationMarks_key_str, P),
+			(action_type.RemoveFunctionWords_key_str, F),
+			(f"{action_type.RemovePunctuationMarks_key_str}+{action_type.RemoveFunctionWords_key_str}", P | F)
+		]
+
+	def _scan_batch(self, batch):
+		r"""
+		Adds the sentences of `batch` to the statistics 'm_statistics' without
+		building their trees.
+		"""
+		categories = batch.UPOS_categories()
+		for s in range(0, batch.num_sentences()):
+			begin, end = batch.sentence_range(s)
+			self.m_statistics.add_sentence(categories[begin:end])
+		self.m_statistics.add_skipped_tokens(
+			batch.m_num_multiword_tokens,
+			batch.m_num_empty_tokens,
+			batch.m_HEAD.count(columnar.INVALID)
+		)
+
+	def _process_batch(self):
+		r"""
+		Applies the actions to all the sentences in the current batch, stores
+		their head vectors, and empties the batch. When only scanning the input
+		file (see `scan_statistics`), the sentences are added to the statistics
+		instead.
+		"""
+		batch = self.m_batch
+		if batch.num_sentences() == 0: return
+		
+		tbp_logging.debug(f"Processing a batch of {batch.num_sentences()} sentences")
 		
-		tbp_logging.debug("Store the head vector...")
-		self._store_tree(rt)
+		if self.m_statistics is not None:
+			self._scan_batch(batch)
+		else:
+			self._compute_remove_masks(batch)
+			for s in range(0, batch.num_sentences()):
+				self._finish_reading_sentence(s)
+		
+		if self.m_recording is not None:
+			self.m_recording.extend(batch)
+		batch.clear()
+		# the ID of the last sentence of the batch must not be taken as the
+		# ID of the next sentence read
+		self._reset_state()
 
 	def __init__(self, input_file, output_file, args, lal_module):
 		r"""
@@ -271,36 +396,130 @@ class parser(generic_parser):
 
 		super().__init__(input_file, output_file, args, lal_module)
 		
-		# only the non-multiword tokens and the non-empty tokens
-		self.m_sentence_tokens = []
-		# current sentence ID to easily locate the sentence in the file
-		self.m_sentence_id = ""
+		# the sentences read and not yet processed, in columnar form, and the
+		# number of sentences gathered before they are processed. When reading
+		# from the standard input or writing to the standard output, the head
+		# vectors are made as soon as '--batch-size' sentences have been read,
+		# so that they are streamed out sentence by sentence.
+		self.m_batch = columnar.sentence_batch(categorize_UPOS)
+		self.m_batch_size = max(1, getattr(args, "sentence_batch_size", DefaultBatchSize))
+		if input_file == "-" or self.m_stream_output:
+			self.m_batch_size = self.m_stream_batch_size
+		self.m_token_categories = None
+		self.m_remove_table = tbp_symbols.make_mask_table(self.m_action_plan.remove_categories)
+		self.m_remove_mask = None
+		# current sentence ID to easily locate the sentence in the file, and
+		# its position in the batch
+		self.m_sentence_id = unknown_sentence_id
+		self.m_sentence_index = 0
+		# comment line with the ID of the sentence being read
+		self.m_sentence_id_line = None
 		self.m_sentence_number = 0
 		self.m_sentence_starting_line = 0
+		
+		# cache of the tokenised treebank (see module `conllu.cache`), and the
+		# batch where all the sentences read are gathered to be saved into it
+		self.m_cache = None
+		self.m_recording = None
+		cache_directory = getattr(args, "cache_dir", None)
+		if ((getattr(args, "tokens_cache", False) or cache_directory is not None) and
+			isinstance(input_file, str) and input_file != "-" and self.m_checkpoint is None):
+			
+			self.m_cache = tbp_cache.treebank_cache(
+				input_file,
+				tbp_cache.get_cache_filename(input_file, cache_directory)
+			)
+	
+	def _parse_cached(self, batch):
+		r"""
+		Transforms the sentences of `batch`, all the sentences of the treebank
+		loaded from the cache, into trees and stores them as head vectors.
+		"""
+		tbp_logging.info(f"Input file {self.m_input_file} has been loaded from the cache file {self.m_cache.get_filename()}.")
+		begin_time = time.perf_counter()
+		
+		self._start_outputs()
+		for p in self.m_variants:
+			p._start_outputs()
+		
+		for p in self._all_parsers():
+			p.m_batch = batch
+		self._compute_remove_masks(batch)
+		
+		# the progress is reported as the fraction of the sentences of the
+		# cache processed so far, scaled to the size of the input file
+		self.m_input_size = os.path.getsize(self.m_input_file)
+		num_sentences = batch.num_sentences()
+		
+		for s in range(0, batch.num_sentences()):
+			sentence_id = None
+			if self.m_selection.uses_sentence_ids():
+				sentence_id = batch.get_sentence_id(s)
+				if sentence_id == unknown_sentence_id: sentence_id = None
+			if self.m_selection.is_selected(batch.m_sentence_number[s], sentence_id):
+				self._finish_reading_sentence(s)
+			begin, end = batch.sentence_range(s)
+			if self._sentence_read(None, end - begin, (s + 1)*self.m_input_size//num_sentences): break
+			if self.m_selection.is_exhausted(): break
+		
+		self._finish_progress()
+		end_time = time.perf_counter()
+		
+		tbp_logging.info(f"Finished parsing the whole input file {self.m_input_file}.")
+		tbp_logging.info(f"    In {end_time - begin_time:.3f} s.")
 	
 	def parse(self):
 		r"""
 		Open the input file and read its contents. Transform the contents into
 		trees and store them as head vectors in 'm_head_vector_collection'.
+		
+		If the cache is enabled, the treebank is loaded from the cache when
+		possible. Otherwise, all its sentences are saved into the cache once
+		the file is parsed (unless only some of them are selected). The cache is
+		not used when only scanning the input file: it does not keep the
+		multiword tokens and the empty tokens.
 		"""
 		
-		with open(self.m_input_file, 'r', encoding = "utf-8") as f:
+		if self.m_cache is not None and self.m_statistics is None:
+			batch = self.m_cache.load(categorize_UPOS)
+			if batch is not None:
+				self._parse_cached(batch)
+				return
+			if self.m_selection.selects_all():
+				self.m_recording = self.m_batch.empty_sharing_symbols()
+		
+		# the file is read in binary mode: only the columns needed are decoded
+		with self._open_input_file(binary = True) as f:
 			tbp_logging.info(f"Input file {self.m_input_file} has been opened correctly.")
+			
+			lines = f
+			if isinstance(f, io.TextIOBase):
+				lines = (line.encode("utf-8") for line in f)
 
 			reading_sentence = False
+			# is the sentence being read selected? (see `sentence_selection`)
+			selected = True
 			linenumber = 1
+			sentence_number = 0
+			sentence_starting_line = 0
+			num_tokens = 0
+			
+			# when resuming a parse, continue where the checkpoint was made
+			state = self._get_resume_state()
+			if state is not None:
+				linenumber = state["linenumber"]
+				sentence_number = state["sentence_number"]
 			
 			begin_time = time.perf_counter()
 
-			for line in f:
-				type_of_line = line_type.classify(line)
+			for line in lines:
+				type_of_line = line_type.classify_bytes(line)
 				
 				if type_of_line == line_type.Comment:
-					# nothing to do...
-					if line.find("sent_id") != -1:
-						tbp_logging.debug(f"Going to split line '{line[:-1]}'")
-						if line.find('=') != -1:
-							self.m_sentence_id = line.split('=')[1].strip()
+					# only the comment with the ID of the sentence is kept, as
+					# read: the ID is extracted when it is needed
+					if line.startswith(SentenceIdPrefixes):
+						self.m_sentence_id_line = line
 				
 				elif type_of_line == line_type.Blank:
 					# a blank line found while reading a sentence signals the end
@@ -308,9 +527,16 @@ class parser(generic_parser):
 
 					if reading_sentence:
 						tbp_logging.debug(f"Finished reading sentence")
-						self._finish_reading_sentence()
+						if selected:
+							self.m_batch.end_sentence(sentence_number, sentence_starting_line, self.m_sentence_id_line)
 						self._reset_state()
 						reading_sentence = False
+						if self.m_batch.num_sentences() >= self.m_batch_size:
+							self._process_batch()
+						if self._sentence_read(f, num_tokens): break
+						if self.m_batch.num_sentences() == 0:
+							self._checkpoint(f, {"linenumber": linenumber + 1, "sentence_number": sentence_number})
+						if self.m_selection.is_exhausted(): break
 				
 				elif type_of_line == line_type.Token:
 					# This line has actual information about the sentence.
@@ -318,26 +544,52 @@ class parser(generic_parser):
 					if not reading_sentence:
 						# here we start reading a new sentence
 						reading_sentence = True
-						self.m_sentence_starting_line = linenumber
-						self.m_sentence_number += 1
-						tbp_logging.debug(self._location())
-						tbp_logging.debug(f"Start reading sentence")
+						sentence_starting_line = linenumber
+						sentence_number += 1
+						num_tokens = 0
+						sentence_id = None
+						if self.m_selection.uses_sentence_ids() and self.m_sentence_id_line is not None:
+							sentence_id = columnar.extract_sentence_id(self.m_sentence_id_line)
+						selected = self.m_selection.is_selected(sentence_number, sentence_id)
+						tbp_logging.debug(f"Start reading sentence {sentence_number} at line {linenumber}")
 					
-					token = line_parser.line_parser(line, linenumber)
-					token.parse()
-					
-					if not token.is_multiword_token() and not token.is_empty_token():
-						self.m_sentence_tokens.append(token)
+					# the tokens of unselected sentences are not even parsed
+					num_tokens += 1
+					if selected:
+						self.m_batch.add_token_bytes(line, linenumber)
 				
 				linenumber += 1
 			
 			# Finished reading file. If there was some sentence being read, process it.
 			if reading_sentence:
 				tbp_logging.debug("Finished reading the last sentence")
-				self._finish_reading_sentence()
+				if selected:
+					self.m_batch.end_sentence(sentence_number, sentence_starting_line, self.m_sentence_id_line)
 				self._reset_state()
+				self._sentence_read(f, num_tokens)
+			
+			if not self.m_cancelled:
+				self._process_batch()
 			
+			self._finish_progress()
 			end_time = time.perf_counter()
 			
 			tbp_logging.info(f"Finished parsing the whole input file {self.m_input_file}.")
 			tbp_logging.info(f"    In {end_time - begin_time:.3f} s.")
+		
+		if self.m_recording is not None:
+			if not self.m_cancelled:
+				self.m_cache.save(self.m_recording)
+			self.m_recording = None
+
+def categorize_UPOS(UPOS):
+	r"""
+	Returns the categories (see `treebank_parser.symbol_table`) of a token with
+	UPOS tag `UPOS`.
+	"""
+	categories = 0
+	if line_parser.is_punctuation_mark_UPOS(UPOS):
+		categories |= tbp_symbols.PunctuationMark
+	if line_parser.is_function_word_UPOS(UPOS):
+		categories |= tbp_symbols.FunctionWord
+	return categories
@@ -32,35 +32,77 @@
 #
 ######################################################################
 
+import os
+import sys
 import time
+import contextlib
+import io
 import treebank_parser.output_log as tbp_logging
+import treebank_parser.progress as tbp_progress
+import treebank_parser.checkpoint as tbp_checkpoint
+import treebank_parser.output_writer as tbp_output_writer
+import treebank_parser.async_io as tbp_async_io
+import treebank_parser.quarantine as tbp_quarantine
+import treebank_parser.shared_results as tbp_shared_results
+from treebank_parser.action_plan import action_plan
+from treebank_parser.sentence_selection import sentence_selection, empty_selection
+from treebank_parser.sentence_statistics import sentence_statistics
+
+# extension of the sentence-ids file of an output file (see `generic_parser`)
+SentenceIdsExtension = ".ids.tsv"
 
 class generic_parser:
 
 	def _should_discard_tree(self, rt):
 		r"""
 		Returns whether or not a rooted tree `rt` should be discarded according
-		to the functions in `self.m_sentence_discard_functions`.
+		to the action plan `self.m_action_plan`.
 		
 		Parameters
 		==========
 		- `rt`: rooted tree.
 		"""
-		if rt.get_num_nodes() == 0: return True
-		return any(map(lambda f: f(rt), self.m_sentence_discard_functions))
+		return not self.m_action_plan.keep_length(rt.get_num_nodes())
+
+	def _discard_before_tree(self, num_words, num_removed = None):
+		r"""
+		Parsers call this function before building the tree of a sentence with
+		`num_words` words, of which `num_removed` are to be removed by the
+		actions. The length of the tree after removing words is known already,
+		and so is whether the sentence is to be discarded. If `num_removed` is
+		None (unknown), this is only known when no token is to be removed.
+		
+		Parsers call this function after checking the head vector of the
+		sentence, so that its errors are reported (or quarantined) even if it
+		is discarded.
+		
+		Returns True if the sentence was discarded (and stored as such), in
+		which case no tree needs to be built.
+		"""
+		if num_removed is None:
+			if self.m_action_plan.removes_tokens(): return False
+			num_removed = 0
+		
+		if self.m_action_plan.keep_length(num_words - num_removed): return False
+		
+		tbp_logging.debug(f"Sentence of {num_words} words ({num_removed} to be removed) discarded before building its tree")
+		self._store_head_vector(None)
+		return True
 
 	def _store_tree(self, rt):
 		r"""
 		This function converts whatever is left from applying the actions to the
 		sentence into a head vector, which is then (possibly) stored in the variable
-		'm_head_vector_collection'.
+		'm_head_vector_collection' (or written to the standard output, see
+		`_store_head_vector`).
 		"""
 		
 		hv = None
 		if not rt.is_rooted_tree():
 			# 'rt' is not a valid rooted tree. We do not know how to store this
 			# as a head vector.
-			tbp_logging.error(f"This graph is not a rooted tree. Ignored.")
+			if not self._quarantine_sentence(tbp_quarantine.NotRootedTree):
+				tbp_logging.error(f"This graph is not a rooted tree. Ignored.")
 		
 		elif not self._should_discard_tree(rt):
 			# The rooted tree should not be discarded. Its number of vertices
@@ -72,9 +114,9 @@ class generic_parser:
 			if not rt.check_normalized():
 				rt.normalize()
 
-			# apply sentence postprocess functions
-			for f in self.m_sentence_postprocess_functions:
-				rt = f(rt)
+			# apply sentence postprocess
+			if self.m_action_plan.postprocess is not None:
+				rt = self.m_action_plan.postprocess(rt)
 
 			# store the head vector only if 'rt' is a rooted tree
 			if rt.is_rooted_tree():
@@ -83,48 +125,422 @@ class generic_parser:
 				# Store the head vector of this rooted tree
 				hv = str(rt.get_head_vector()).replace('(', '').replace(')', '').replace(',', '')
 
-			else:
+			elif not self._quarantine_sentence(tbp_quarantine.NotRootedTreeAfterActions):
 				tbp_logging.error("The tree resulting from applying all the transformations is not a rooted tree. Ignored.")
 		
-		self.m_head_vector_collection.append(hv)
+		self._store_head_vector(hv)
+
+	def _store_head_vector(self, hv):
+		r"""
+		Stores the head vector `hv` of the current sentence, which is None if the
+		sentence was discarded.
+		
+		When the output is streamed to the standard output, the head vector is
+		not stored in 'm_head_vector_collection'; it is written once a batch of
+		'm_stream_batch_size' head vectors has been gathered. When checkpoints
+		are made, or the output is written behind the parse, the head vector is
+		written into the partial output file.
+		"""
+		self.m_num_sentences += 1
+		ids_line = None
+		if hv is not None:
+			self.m_num_head_vectors += 1
+			if self.m_ids_output_file is not None:
+				ids_line = self._make_ids_line()
+		
+		if self.m_partial_output is not None:
+			if hv is not None:
+				self.m_partial_output.write_line(hv)
+				if self.m_partial_ids_output is not None:
+					self.m_partial_ids_output.write_line(ids_line)
+			return
+		
+		if not self.m_stream_output:
+			self.m_head_vector_collection.append(hv)
+			if self.m_ids_output_file is not None:
+				self.m_ids_collection.append(ids_line)
+			return
+		
+		if hv is not None:
+			self.m_stream_batch.append(hv)
+			if len(self.m_stream_batch) >= self.m_stream_batch_size:
+				self._flush_stream_batch()
+
+	def _make_ids_line(self):
+		r"""
+		Returns the line of the sentence-ids file of the current sentence: its
+		number, its ID ('_' if unknown) and its starting line, separated by
+		tabs. The location of the sentence is that of the parser reading it
+		(see `add_variant`).
+		"""
+		sentence_number, sentence_id, starting_line = self.m_reader._sentence_location()
+		if sentence_id is None: sentence_id = "_"
+		return f"{sentence_number}\t{sentence_id}\t{starting_line}"
 
-	def _make_token_discard_functions(self, args):
-		raise NotImplementedError("You need to define a '_make_token_discard_functions' method!")
+	def _flush_stream_batch(self):
+		r"""
+		Writes the current batch of head vectors to the standard output.
+		"""
+		if len(self.m_stream_batch) > 0:
+			sys.stdout.write('\n'.join(self.m_stream_batch) + '\n')
+			self.m_stream_batch.clear()
+		sys.stdout.flush()
+
+	def _sentence_location(self):
+		r"""
+		Returns the number, the ID (None if unknown) and the starting line of
+		the current sentence. Parsers override this function.
+		"""
+		return (self.m_num_sentences_read + 1, None, None)
+
+	def _quarantine_sentence(self, error, details = None):
+		r"""
+		Parsers call this function when the current sentence is rejected
+		because of `error` (an error code of module `quarantine`). If there is
+		a quarantine file, a record of the sentence is written into it. While
+		the sentence is being read for several variants (see `add_variant`),
+		the record is written into the quarantine file of every variant in
+		'm_sentence_parsers'.
 		
-	def _make_sentence_discard_functions(self, args):
-		raise NotImplementedError("You need to define a '_make_sentence_discard_functions' method!")
+		Returns whether or not the sentence was quarantined. If it was not, the
+		parser has to log the error itself.
+		"""
+		quarantined = True
+		sentence_number, sentence_id, starting_line = self._sentence_location()
+		for p in self.m_sentence_parsers:
+			if p.m_quarantine is None:
+				quarantined = False
+			else:
+				p.m_quarantine.add(error, sentence_number, sentence_id, starting_line, details)
+		return quarantined
+
+	def _start_quarantine(self, position = None):
+		r"""
+		Opens the quarantine file. When resuming a parse, the partial
+		quarantine file is truncated at `position`.
+		"""
+		temporary_file = None
+		if self.m_checkpoint is not None:
+			temporary_file = self.m_quarantine_file + ".partial"
+		writer = self._make_output_writer(
+			filename = self.m_quarantine_file,
+			encoding = "utf-8",
+			temporary_file = temporary_file,
+			position = position
+		)
+		self.m_quarantine = tbp_quarantine.quarantine(writer)
+
+	def _finish_quarantine(self):
+		r"""
+		Closes the quarantine file (if any) and logs the number of sentences
+		rejected with every error.
+		"""
+		if self.m_quarantine is not None:
+			self.m_quarantine.commit()
+			self.m_quarantine = None
+
+	def _start_outputs(self):
+		r"""
+		Opens the files written while parsing (without checkpoints): the
+		partial output file when the output is written behind the parse, and
+		the quarantine file.
+		"""
+		if self.m_write_behind:
+			self.m_partial_output = self._make_output_writer()
+			if self.m_ids_output_file is not None:
+				self.m_partial_ids_output = self._make_output_writer(self.m_ids_output_file, encoding = "utf-8")
+		if self.m_quarantine_file is not None and self.m_quarantine is None:
+			self._start_quarantine()
+
+	def _start_checkpoints(self):
+		r"""
+		Opens the partial output file (and the partial sentence-ids file) and,
+		when resuming a parse, restores the state saved in the checkpoint.
+		Returns the byte offset of the input file where the parse has to start.
+		"""
+		partial_ids_file = None
+		if self.m_ids_output_file is not None:
+			partial_ids_file = self.m_ids_output_file + ".partial"
+		
+		state = None
+		if (self.m_resume and self.m_checkpoint.exists() and os.path.exists(self.m_partial_output_file) and
+			(partial_ids_file is None or os.path.exists(partial_ids_file))):
+			state = self.m_checkpoint.load()
+		
+		self.m_last_checkpoint_time = time.monotonic()
+		
+		if state is None:
+			self.m_partial_output = self._make_output_writer(temporary_file = self.m_partial_output_file)
+			if partial_ids_file is not None:
+				self.m_partial_ids_output = self._make_output_writer(
+					self.m_ids_output_file,
+					encoding = "utf-8",
+					temporary_file = partial_ids_file
+				)
+			if self.m_quarantine_file is not None:
+				self._start_quarantine()
+			return 0
+		
+		tbp_logging.info(f"Resuming the parse of {self.m_input_file} from sentence {state['num_sentences_read'] + 1}")
+		
+		self.m_partial_output = self._make_output_writer(
+			temporary_file = self.m_partial_output_file,
+			position = state["output_position"]
+		)
+		if partial_ids_file is not None:
+			self.m_partial_ids_output = self._make_output_writer(
+				self.m_ids_output_file,
+				encoding = "utf-8",
+				temporary_file = partial_ids_file,
+				position = state["ids_output_position"]
+			)
+		if self.m_quarantine_file is not None:
+			self._start_quarantine(state["quarantine_position"])
+			self.m_quarantine.set_counts(state["quarantine_counts"])
+		
+		self.m_num_sentences = state["num_sentences"]
+		self.m_num_head_vectors = state["num_head_vectors"]
+		self.m_num_sentences_read = state["num_sentences_read"]
+		self.m_selection.set_state(state["selection"])
+		self.m_resume_state = state["parser"]
+		return state["input_offset"]
+
+	def _get_resume_state(self):
+		r"""
+		Returns the state of the parser (the dictionary the parser passed to
+		`_checkpoint`) saved in the checkpoint the parse is resumed from, or
+		None if the parse is not resumed.
+		"""
+		return self.m_resume_state
+
+	def _checkpoint(self, f, state):
+		r"""
+		Parsers call this function at points of the input stream `f` where all
+		the sentences read have been stored. A checkpoint is saved if the last
+		one was saved at least 'm_checkpoint_interval' seconds ago. The
+		dictionary `state` contains whatever the parser needs to resume the
+		parse at this point (e.g., the current line number).
+		
+		While the costs of the sentences are estimated, the point where every
+		sentence starts is recorded instead (see `get_sentence_start`).
+		"""
+		if self.m_sentence_starts is not None:
+			if not isinstance(f, (tbp_checkpoint.tracking_reader, tbp_async_io.read_ahead_reader)): return
+			self.m_sentence_starts[self.m_num_sentences_read + 1] = {
+				"offset": f.offset,
+				"num_sentences_read": self.m_num_sentences_read,
+				"parser": state
+			}
+			return
+		if self.m_checkpoint is None: return
+		if time.monotonic() - self.m_last_checkpoint_time < self.m_checkpoint_interval: return
+		
+		# make sure that all the head vectors stored are in the disk
+		output_position = self.m_partial_output.sync()
+		ids_output_position = None
+		if self.m_partial_ids_output is not None:
+			ids_output_position = self.m_partial_ids_output.sync()
+		quarantine_position, quarantine_counts = None, None
+		if self.m_quarantine is not None:
+			quarantine_position = self.m_quarantine.sync()
+			quarantine_counts = self.m_quarantine.get_counts()
+		
+		self.m_checkpoint.save({
+			"input_offset": f.offset,
+			"output_position": output_position,
+			"ids_output_position": ids_output_position,
+			"quarantine_position": quarantine_position,
+			"quarantine_counts": quarantine_counts,
+			"num_sentences": self.m_num_sentences,
+			"num_head_vectors": self.m_num_head_vectors,
+			"num_sentences_read": self.m_num_sentences_read,
+			"selection": self.m_selection.get_state(),
+			"parser": state
+		})
+		self.m_last_checkpoint_time = time.monotonic()
+		tbp_logging.debug(f"Checkpoint saved after {self.m_num_sentences_read} sentences")
+
+	def add_variant(self, p):
+		r"""
+		Adds the parser `p` as a variant of this parser. `p` is an object of
+		the same class as this parser, made with the same input file but with
+		other actions and another output file.
+		
+		The variants do not read their input file. Instead, every sentence read
+		by this parser is tokenised and built into a tree only once, and then
+		every variant applies its own actions to (a copy of) the tree and
+		stores the head vector in its own output file. `dump_contents` dumps
+		the contents of the variants too.
+		"""
+		self._share_sentence(p)
+		p.m_reader = self
+		self.m_variants.append(p)
+
+	def _share_sentence(self, p):
+		r"""
+		Makes the variant `p` see the data of the sentence being read by this
+		parser. Parsers override this function.
+		"""
+		pass
+
+	def _all_parsers(self):
+		r"""
+		Returns a list with this parser and all its variants.
+		"""
+		return [self] + self.m_variants
+
+	def _fan_out_tree(self, parsers, rt):
+		r"""
+		Yields pairs made of a parser in `parsers` and the tree to which it has
+		to apply its actions: the last parser gets the tree `rt` itself and the
+		others get a copy of it.
+		"""
+		for i in range(0, len(parsers) - 1):
+			yield parsers[i], self.LAL_module.graphs.from_head_vector_to_rooted_tree(list(rt.get_head_vector()))
+		if len(parsers) > 0:
+			yield parsers[-1], rt
+
+	def _make_output_writer(self, filename = None, **kwargs):
+		r"""
+		Returns an `output_writer` of the file `filename` (by default, the
+		output file) configured with the buffer size and the fsync policy passed
+		in the arguments. With asynchronous I/O, the writer is wrapped in a
+		`write_behind_writer`.
+		"""
+		writer = tbp_output_writer.output_writer(
+			filename if filename is not None else self.m_output_file,
+			buffer_size = self.m_output_buffer_size,
+			fsync = self.m_fsync,
+			**kwargs
+		)
+		if self.m_async_io:
+			writer = tbp_async_io.write_behind_writer(writer, self.m_output_buffer_size, self.m_io_queue_size)
+		return writer
 
-	def _make_sentence_postprocess_functions(self, args):
-		raise NotImplementedError("You need to define a '_make_sentence_postprocess_functions' method!")
+	def _make_action_plan(self, args):
+		r"""
+		Compiles the actions in `args` into an `action_plan` object.
+		"""
+		return action_plan(args, self.LAL_module)
 
 	def __init__(self, input_file, output_file, args, lal_module):
 
 		# all the head vectors to dump into the output file
 		self.m_head_vector_collection = []
 
-		# input and output files
+		# input and output files. The input file is either a file name or a
+		# text stream. A file name "-" stands for the standard input (output).
 		self.m_input_file = input_file
 		self.m_output_file = output_file
 		
+		# number of sentences parsed and number of head vectors among them
+		self.m_num_sentences = 0
+		self.m_num_head_vectors = 0
+		
+		# for progress reports: sentences read so far and size of the input
+		# file (0 if unknown)
+		self.m_num_sentences_read = 0
+		self.m_input_size = 0
+		# when not None, the number of tokens of every sentence read is
+		# appended to this list, and the point of the input file where every
+		# sentence starts is stored in this dictionary (see
+		# `estimate_sentence_costs`)
+		self.m_sentence_sizes = None
+		self.m_sentence_starts = None
+		self.m_recorded_starts = {}
+		# the point of the input file where the parse starts (see
+		# `get_sentence_start`), passed in the argument 'input_start', which
+		# is not a CLI option
+		self.m_input_start = getattr(args, "input_start", None)
+		# was the parse cancelled?
+		self.m_cancelled = False
+		
+		# stream head vectors to the standard output as they are made
+		self.m_stream_output = output_file == "-"
+		self.m_stream_batch = []
+		self.m_stream_batch_size = getattr(args, "batch_size", 1)
+		
+		# configuration of the writer of the output file (see module
+		# `output_writer`)
+		self.m_output_buffer_size = getattr(args, "output_buffer_size", tbp_output_writer.DefaultBufferSize)
+		self.m_fsync = getattr(args, "fsync", tbp_output_writer.FsyncClose)
+		
+		# asynchronous I/O (see module `async_io`): the input file is read
+		# ahead of the parse and, unless all the head vectors have to be kept
+		# in memory (-c), the output is written behind it.
+		self.m_async_io = getattr(args, "async_io", False)
+		self.m_io_queue_size = getattr(args, "io_queue_size", tbp_async_io.DefaultQueueSize)
+		self.m_write_behind = (self.m_async_io and
+			isinstance(output_file, str) and output_file != "-" and
+			not getattr(args, "consistency_in_sentences", False))
+		
+		# checkpoints (see module `checkpoint`): the head vectors are written
+		# into a partial output file as they are made, and the state of the
+		# parse is saved every 'm_checkpoint_interval' seconds.
+		self.m_checkpoint_interval = getattr(args, "checkpoint_interval", None)
+		self.m_resume = getattr(args, "resume", False)
+		self.m_checkpoint = None
+		self.m_partial_output = None
+		self.m_resume_state = None
+		if (self.m_checkpoint_interval is not None and
+			isinstance(input_file, str) and input_file != "-" and
+			isinstance(output_file, str) and output_file != "-"):
+			
+			self.m_checkpoint = tbp_checkpoint.checkpoint(output_file)
+			self.m_partial_output_file = output_file + ".partial"
+		
+		# the rejected sentences are written into the file
+		# '<output>.quarantine.jsonl' (see module `quarantine`) instead of
+		# being logged one by one.
+		self.m_quarantine = None
+		self.m_quarantine_file = None
+		if getattr(args, "quarantine", False) and isinstance(output_file, str) and output_file != "-":
+			self.m_quarantine_file = output_file + ".quarantine.jsonl"
+		
+		# the number, ID and starting line of the sentence of every head vector
+		# are written into the file '<output>.ids.tsv', line by line, in the
+		# same order as the head vectors are written into the output file.
+		self.m_ids_output_file = None
+		self.m_ids_collection = []
+		self.m_partial_ids_output = None
+		if getattr(args, "sentence_ids", False) and isinstance(output_file, str) and output_file != "-":
+			self.m_ids_output_file = output_file + SentenceIdsExtension
+		
+		# statistics of the sentences read, gathered instead of their head
+		# vectors (see `scan_statistics`)
+		self.m_statistics = None
+		
 		# utilities for logging
 		self.m_donotknow_msg = "Do not know how to process this. This tree will be ignored."
 		
 		# keep LAL module
 		self.LAL_module = lal_module
 		
-		# make all discard and postprocess functions
-		self.m_token_discard_functions = []
-		self._make_token_discard_functions(args)
-		self.m_sentence_discard_functions = []
-		self._make_sentence_discard_functions(args)
-		self.m_sentence_postprocess_functions = []
-		self._make_sentence_postprocess_functions(args)
+		# compile all actions: token removal, sentence discard and postprocess
+		self.m_action_plan = self._make_action_plan(args)
+		
+		# the sentences to be parsed (shard, sample, ...)
+		self.m_selection = sentence_selection(args)
+		
+		# variants of this parser (see `add_variant`), and the parsers (this
+		# one and/or its variants) for which the current sentence is built
+		self.m_variants = []
+		self.m_sentence_parsers = [self]
+		# the parser reading the sentences: this one, or the parser of which
+		# this one is a variant
+		self.m_reader = self
 
 	def get_num_sentences(self):
 		r"""
 		Returns the number of sentences parsed.
 		"""
-		return len(self.m_head_vector_collection)
+		return self.m_num_sentences
+	
+	def get_num_head_vectors(self):
+		r"""
+		Returns the number of sentences parsed that were not discarded.
+		"""
+		return self.m_num_head_vectors
 	
 	def is_sentence_ok(self, i):
 		r"""
@@ -132,26 +548,258 @@ class generic_parser:
 		"""
 		return self.m_head_vector_collection[i] is not None
 
+	def _open_input_file(self, encoding = "utf-8", binary = False):
+		r"""
+		Returns a context manager with the input file opened for reading. The
+		input file is either the name of a file, or an already opened text
+		stream (e.g., an `io.StringIO` object), which is not closed on exit.
+		
+		If `binary` is True, files are read in binary mode and their lines are
+		`bytes` objects. Already opened text streams are returned as they are.
+		"""
+		if isinstance(self.m_input_file, str) and self.m_input_file != "-":
+			self.m_input_size = os.path.getsize(self.m_input_file)
+		
+		offset = 0
+		if self.m_checkpoint is not None:
+			offset = self._start_checkpoints()
+		else:
+			self._start_outputs()
+		for p in self.m_variants:
+			p._start_outputs()
+		
+		if offset == 0 and self.m_input_start is not None and self.m_sentence_starts is None:
+			# start reading at the sentence given in the arguments
+			offset = self.m_input_start["offset"]
+			self.m_num_sentences_read = self.m_input_start["num_sentences_read"]
+			self.m_resume_state = self.m_input_start["parser"]
+		
+		if self.m_async_io and isinstance(self.m_input_file, str) and self.m_input_file != "-":
+			return tbp_async_io.read_ahead_reader(self.m_input_file, encoding, offset, queue_size = self.m_io_queue_size, binary = binary)
+		if (self.m_checkpoint is not None or offset > 0 or
+			(self.m_sentence_starts is not None and isinstance(self.m_input_file, str) and self.m_input_file != "-")):
+			return tbp_checkpoint.tracking_reader(self.m_input_file, encoding, offset, binary = binary)
+		
+		if self.m_input_file == "-":
+			if binary:
+				return contextlib.nullcontext(sys.stdin.buffer)
+			if encoding is not None:
+				sys.stdin.reconfigure(encoding = encoding)
+			return contextlib.nullcontext(sys.stdin)
+		if isinstance(self.m_input_file, str):
+			if binary:
+				return open(self.m_input_file, 'rb')
+			return open(self.m_input_file, 'r', encoding = encoding)
+		return contextlib.nullcontext(self.m_input_file)
+
+	def _bytes_read(self, f):
+		r"""
+		Returns the number of bytes read so far from the input stream `f`, or 0
+		if it cannot be known.
+		"""
+		if isinstance(f, (tbp_checkpoint.tracking_reader, tbp_async_io.read_ahead_reader)):
+			return f.offset
+		try:
+			if isinstance(f, io.BufferedIOBase):
+				return f.tell()
+			return f.buffer.tell()
+		except (AttributeError, OSError, ValueError):
+			return 0
+
+	def _sentence_read(self, f, num_tokens = 0, bytes_read = None):
+		r"""
+		Parsers call this function every time they finish processing a sentence
+		of `num_tokens` tokens read from the input stream `f`. Reports the
+		progress of the parse every `progress.report_every` sentences. Parsers
+		that do not read the sentences from a stream (e.g., from a cache) pass
+		an estimate of the number of bytes of the input file read so far in
+		`bytes_read` instead.
+		
+		Returns whether or not the parse should stop because it was cancelled.
+		"""
+		self.m_num_sentences_read += 1
+		if self.m_sentence_sizes is not None:
+			self.m_sentence_sizes.append(num_tokens)
+		if self.m_num_sentences_read % tbp_progress.report_every != 0:
+			return False
+		
+		if bytes_read is None:
+			bytes_read = self._bytes_read(f)
+		tbp_progress.report(self.m_num_sentences_read, bytes_read, self.m_input_size)
+		if tbp_progress.is_cancel_requested():
+			tbp_logging.warning(f"Parsing of {self.m_input_file} was cancelled.")
+			self.m_cancelled = True
+		return self.m_cancelled
+
+	def _finish_progress(self):
+		r"""
+		Parsers call this function when they finish reading the input file.
+		"""
+		if not self.m_cancelled:
+			tbp_progress.report(self.m_num_sentences_read, self.m_input_size, self.m_input_size)
+
+	def was_cancelled(self):
+		r"""
+		Returns whether or not the parse was cancelled.
+		"""
+		return self.m_cancelled
+
 	def parse(self):
 		raise NotImplementedError("You need to define a 'parse' method!")
 
+	def count_sentences(self):
+		r"""
+		Reads the whole input file without parsing any sentence, and returns
+		the number of sentences in it. Nothing is stored.
+		"""
+		selection, write_behind = self.m_selection, self.m_write_behind
+		self.m_selection, self.m_write_behind = empty_selection(), False
+		try:
+			self.parse()
+			num_sentences = self.m_num_sentences_read
+		finally:
+			self.m_selection, self.m_write_behind = selection, write_behind
+			self.m_num_sentences_read = 0
+		return num_sentences
+	
+	def estimate_sentence_costs(self):
+		r"""
+		Reads the whole input file without parsing any sentence, and returns
+		the list of the estimated costs of processing every sentence in it with
+		the actions of this parser (see `action_plan.estimate_cost`). The
+		points of the input file where the sentences start are recorded too
+		(see `get_sentence_start`).
+		"""
+		self.m_sentence_sizes = []
+		self.m_sentence_starts = {}
+		try:
+			self.count_sentences()
+			sizes = self.m_sentence_sizes
+		finally:
+			self.m_sentence_sizes = None
+			self.m_sentence_starts, self.m_recorded_starts = None, self.m_sentence_starts
+		return [self.m_action_plan.estimate_cost(n) for n in sizes]
+	
+	def get_sentence_start(self, sentence_number):
+		r"""
+		Returns the point of the input file where the sentence `sentence_number`
+		starts, as recorded by `estimate_sentence_costs`, or None if it is not
+		known (then the input file has to be read from the beginning). The
+		point is a dictionary that can be stored in JSON format; a parser made
+		with it in the argument 'input_start' starts reading at that sentence,
+		as if the previous ones had been read.
+		"""
+		if sentence_number <= 1: return None
+		return self.m_recorded_starts.get(sentence_number)
+
+	def _statistics_columns(self):
+		r"""
+		Returns the columns of the statistics gathered by `scan_statistics` (see
+		`sentence_statistics`). Parsers override this function.
+		"""
+		return [("all", 0)]
+
+	def scan_statistics(self):
+		r"""
+		Reads the input file at tokenisation speed, without building any tree,
+		and gathers the statistics of its sentences (see module
+		`sentence_statistics`) instead of their head vectors. The actions are
+		not applied, and nothing is written while reading. Returns the
+		statistics, which `dump_statistics` writes into the output file.
+		"""
+		write_behind, quarantine_file, ids_output_file = self.m_write_behind, self.m_quarantine_file, self.m_ids_output_file
+		self.m_write_behind, self.m_quarantine_file, self.m_ids_output_file = False, None, None
+		self.m_statistics = sentence_statistics(self._statistics_columns())
+		try:
+			self.parse()
+		except BaseException:
+			# so that the parser is not left scanning
+			self.m_statistics = None
+			raise
+		finally:
+			self.m_write_behind, self.m_quarantine_file, self.m_ids_output_file = write_behind, quarantine_file, ids_output_file
+		return self.m_statistics
+
+	def dump_statistics(self):
+		r"""
+		Writes the statistics gathered by `scan_statistics` into the output file,
+		or to the standard output.
+		"""
+		lines = self.m_statistics.get_lines()
+		if self.m_stream_output:
+			sys.stdout.write(''.join(line + '\n' for line in lines))
+			sys.stdout.flush()
+			return
+		
+		with self._make_output_writer(encoding = "utf-8") as w:
+			w.write_lines(lines)
+		tbp_logging.info(f"Finished writing the statistics of {self.m_statistics.get_num_sentences()} sentences into {self.m_output_file}.")
+
 	def dump_contents(self):
 		r"""
-		Dump all the head vectors to the output file.
+		Dump all the head vectors to the output file, and those of the variants
+		(see `add_variant`) to their output files.
 		"""
 		
-		with open(self.m_output_file, 'w') as f:
+		for p in self.m_variants:
+			p.dump_contents()
+		
+		if self.m_stream_output:
+			# the head vectors have already been written
+			self._flush_stream_batch()
+			return
+		
+		if self.m_partial_output is not None:
+			# the head vectors have already been written into the partial file
+			if self.m_partial_ids_output is not None:
+				self.m_partial_ids_output.commit()
+			self.m_partial_output.commit()
+			self._finish_quarantine()
+			if self.m_checkpoint is not None:
+				self.m_checkpoint.remove()
+			tbp_logging.info(f"Finished writing the head vectors into {self.m_output_file}.")
+			return
+		
+		self._finish_quarantine()
+		self._dump_sentence_ids(filter(lambda s: s is not None, self.m_ids_collection))
+		with self._make_output_writer() as w:
 			tbp_logging.info(f"Output file {self.m_output_file} has been opened correctly.")
 			tbp_logging.info(f"    Dumping data...")
 			
 			begin = time.perf_counter()
-			for hv in filter(lambda s: s is not None, self.m_head_vector_collection):
-				f.write(hv + '\n')
+			w.write_lines(filter(lambda s: s is not None, self.m_head_vector_collection))
 			end = time.perf_counter()
 			
 			tbp_logging.info(f"Finished writing the head vectors into {self.m_output_file}.")
 			tbp_logging.info(f"    In {end - begin:.3f} s.")
 
+	def _dump_sentence_ids(self, lines):
+		r"""
+		Writes the lines `lines` into the sentence-ids file, if there is one.
+		It is written before the output file, so that a complete output file
+		always has its sentence-ids file.
+		"""
+		if self.m_ids_output_file is None: return
+		with self._make_output_writer(self.m_ids_output_file, encoding = "utf-8") as w:
+			w.write_lines(lines)
+
+	def share_sentence_ids(self):
+		r"""
+		Like `share_head_vectors`, for the lines of the sentence-ids file.
+		Returns None if there is no sentence-ids file.
+		"""
+		if self.m_ids_output_file is None: return None
+		return tbp_shared_results.share_head_vectors(self.m_ids_collection, encoding = "utf-8")
+
+	def share_head_vectors(self):
+		r"""
+		Finishes the parse without writing the output file: the head vectors
+		are stored in shared memory so that another process can write them (see
+		module `shared_results`). Returns the descriptor of the shared memory.
+		"""
+		self._finish_quarantine()
+		return tbp_shared_results.share_head_vectors(self.m_head_vector_collection)
+
 	def dump_contents_conditionally(self, condition):
 		r"""
 		Dump all the head vectors to the output file conditioned to the values in
@@ -161,15 +809,14 @@ class generic_parser:
 		pre: condition[i] must be false if self.m_head_vector_collection[i] is None
 		"""
 		
-		with open(self.m_output_file, 'w') as f:
+		self._finish_quarantine()
+		self._dump_sentence_ids(line for line, ok in zip(self.m_ids_collection, condition) if ok)
+		with self._make_output_writer() as w:
 			tbp_logging.info(f"Output file {self.m_output_file} has been opened correctly.")
 			tbp_logging.info(f"    Dumping data...")
 			
 			begin = time.perf_counter()
-			for i in range(0, len(self.m_head_vector_collection)):
-				if condition[i]:
-					hv = self.m_head_vector_collection[i]
-					f.write(hv + '\n')
+			w.write_lines(hv for hv, ok in zip(self.m_head_vector_collection, condition) if ok)
 			end = time.perf_counter()
 			
 			tbp_logging.info(f"Finished writing the head vectors into {self.m_output_file}.")
@@ -41,6 +41,7 @@ This module contains a single class `parser`.
 import time
 
 from treebank_parser.generic_parser import generic_parser
+from treebank_parser import quarantine as tbp_quarantine
 import treebank_parser.output_log as tbp_logging
 
 class parser(generic_parser):
@@ -57,15 +58,22 @@ class parser(generic_parser):
 	(see main CLI).
 	"""
 	
+	def _sentence_location(self):
+		# every line is a sentence
+		return (self.m_linenumber, None, self.m_linenumber)
+
 	def _make_head_vector(self, line, linenumber):
 		# retrieve the head vector from the lines while ensuring
-		# that all heads are numerical
+		# that all heads are numerical and that the head vector is correct
 		head_vector = []
 		for head in line.split(' '):
 			try:
 				head_int = int(head)
 			
 			except Exception as e:
+				if self._quarantine_sentence(tbp_quarantine.InvalidHeadID, [f"Head: '{head.strip()}'"]):
+					return None
+				
 				tbp_logging.error(f"At line {linenumber}")
 				tbp_logging.error(f"    Head: '{head}'")
 				tbp_logging.error(f"    Line: '{line}'")
@@ -74,31 +82,27 @@ class parser(generic_parser):
 			
 			head_vector.append(head_int)
 		
-		return head_vector
-
-	def _build_tree(self, head_vector):
-		r"""
-		This function is used to convert the contents of the member 'current_tree'
-		into an object of type lal.graphs.rooted_tree.
-		
-		This function then applies the actions passed as parameters (removal of punctuation
-		marks, function words, ...).
-		
-		Finally, the function converts whatever is left from applying the actions into
-		a head vector, which is then stored in the variable 'head_vector_collection'.
-		"""
-		
 		# make sure there aren't errors in the head vector (do this with LAL)
 		tbp_logging.info("Checking mistakes in head vector...")
 		err_list = self.LAL_module.io.check_correctness_head_vector(head_vector)
 		if len(err_list) > 0:
+			if self._quarantine_sentence(tbp_quarantine.InvalidHeadVector, [str(err) for err in err_list]):
+				return None
 			
 			tbp_logging.error(f"There were errors within head vector '{head_vector}'")
 			for err in err_list:
 				tbp_logging.error(f"    {err}")
 				
 			tbp_logging.error(self.m_donotknow_msg)
-			return
+			return None
+		
+		return head_vector
+
+	def _build_tree(self, head_vector):
+		r"""
+		This function is used to convert the head vector 'head_vector' (see
+		`_make_head_vector`) into an object of type lal.graphs.rooted_tree.
+		"""
 		
 		# make the lal.graphs.rooted_tree() object
 		tbp_logging.debug(f"make a rooted tree from the head vector {head_vector=}")
@@ -110,41 +114,42 @@ class parser(generic_parser):
 
 		return rt
 
-	def _make_token_discard_functions(self, args):
-		pass
+	def _scan_sentence(self, line):
+		r"""
+		Adds the sentence in line `line` to the statistics 'm_statistics'
+		without building its tree.
+		"""
+		heads = line.split(' ')
+		num_invalid_heads = 0
+		for head in heads:
+			try:
+				int(head)
+			except ValueError:
+				num_invalid_heads += 1
+		self.m_statistics.add_sentence(bytes(len(heads)))
+		self.m_statistics.add_skipped_tokens(num_invalid_heads = num_invalid_heads)
 
-	def _make_sentence_remove_functions(self, args):
-		# make lambdas for all actions that discard sentences
-		self.m_sentence_discard_functions = []
-		
-		# Discard short sentences
-		if args.DiscardSentencesShorter != -1:
-			self.m_sentence_discard_functions.append(
-				lambda rt: rt.get_num_nodes() <= args.DiscardSentencesShorter
-			)
-		# Discard long sentences
-		if args.DiscardSentencesLonger != -1:
-			self.m_sentence_discard_functions.append(
-				lambda rt: rt.get_num_nodes() >= args.DiscardSentencesLonger
-			)
-		
-	def _make_sentence_postprocess_functions(self, args):
-		# make lambdas for postprocessing sentences
-		self.m_sentence_postprocess_functions = []
+	def _parse_sentence(self, line, linenumber):
+		r"""
+		Converts the sentence in line `line` into a head vector, for this
+		parser and for its variants.
+		"""
+		parsers = self._all_parsers()
+		for p in parsers:
+			p.m_linenumber = linenumber
 		
-		# Discard short sentences
-		if args.ChunkSyntacticDependencyTree != None:
-			Anderson = self.LAL_module.linarr.algorithms_chunking.Anderson
-			Macutek = self.LAL_module.linarr.algorithms_chunking.Macutek
-			
-			if args.ChunkSyntacticDependencyTree == "Anderson":
-				self.m_sentence_postprocess_functions.append(
-					lambda rt: self.LAL_module.linarr.chunk_syntactic_dependency_tree(rt, Anderson)
-				)
-			if args.ChunkSyntacticDependencyTree == "Macutek":
-				self.m_sentence_postprocess_functions.append(
-					lambda rt: self.LAL_module.linarr.chunk_syntactic_dependency_tree(rt, Macutek)
-				)
+		self.m_sentence_parsers = parsers
+		head_vector = self._make_head_vector(line, linenumber)
+		if head_vector is not None:
+			parsers = [p for p in parsers if not p._discard_before_tree(len(head_vector))]
+			self.m_sentence_parsers = parsers
+			rt = None
+			if len(parsers) > 0:
+				rt = self._build_tree(head_vector)
+			if rt is not None:
+				for p, t in self._fan_out_tree(parsers, rt):
+					p._store_tree(t)
+		self.m_sentence_parsers = [self]
 
 	def __init__(self, input_file, output_file, args, lal_module):
 		r"""
@@ -152,6 +157,9 @@ class parser(generic_parser):
 		"""
 		
 		super().__init__(input_file, output_file, args, lal_module)
+		
+		# line of the current sentence
+		self.m_linenumber = 0
 	
 	def parse(self):
 		r"""
@@ -161,19 +169,30 @@ class parser(generic_parser):
 		"""
 		
 		linenumber = 1
-		with open(self.m_input_file, 'r') as f:
+		with self._open_input_file(encoding = None) as f:
 			tbp_logging.info(f"Input file {self.m_input_file} has been opened correctly.")
 			
+			# when resuming a parse, continue where the checkpoint was made
+			state = self._get_resume_state()
+			if state is not None:
+				linenumber = state["linenumber"]
+			
 			begin = time.perf_counter()
 			for line in f:
 				
-				head_vector = self._make_head_vector(line, linenumber)
-				if head_vector is not None:
-					rt = self._build_tree(head_vector)
-					self._store_tree(rt)
+				# every line is a sentence
+				if self.m_selection.is_selected(linenumber):
+					if self.m_statistics is not None:
+						self._scan_sentence(line)
+					else:
+						self._parse_sentence(line, linenumber)
 				
 				linenumber += 1
+				if self._sentence_read(f, line.count(' ') + 1): break
+				self._checkpoint(f, {"linenumber": linenumber})
+				if self.m_selection.is_exhausted(): break
 			
+			self._finish_progress()
 			end = time.perf_counter()
 			
 			tbp_logging.info(f"Finished parsing the whole input file {self.m_input_file}.")
@@ -0,0 +1,235 @@
+######################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+######################################################################
+
+r"""
+Writer of output files.
+
+The head vectors are gathered in memory and written in large blocks into a
+temporary file next to the output file, which is renamed to the output file
+only once it has been completely written. Thus, a program that crashes or is
+killed while writing never leaves behind an output file that looks complete
+but is truncated.
+
+The fsync policy decides when the contents of the file are forced to the
+disk. This matters on network filesystems, where fsync is expensive:
+- `FsyncNever`: never (the operating system decides),
+- `FsyncClose`: once, before the temporary file is renamed,
+- `FsyncAlways`: every time a block is written.
+"""
+
+import os
+import locale
+
+FsyncNever = "never"
+FsyncClose = "close"
+FsyncAlways = "always"
+
+# size (in bytes) of the blocks written into the file
+DefaultBufferSize = 1024*1024
+
+class output_writer:
+	r"""
+	Writes lines into the file `filename` atomically.
+	
+	The lines are written into the file `temporary_file` (by default, a hidden
+	file in the same directory as `filename`), which replaces `filename` when
+	`commit` is called. If `position` is not None, the temporary file already
+	exists (e.g., it is the partial output of a parse that is being resumed)
+	and is truncated at `position` instead of being created anew.
+	
+	The writer is a context manager: the file is committed when the `with`
+	block finishes normally and discarded when an exception is raised.
+	"""
+	
+	def __init__(self, filename, buffer_size = DefaultBufferSize, fsync = FsyncClose, encoding = None, temporary_file = None, position = None):
+		if encoding is None:
+			encoding = locale.getpreferredencoding(False)
+		if temporary_file is None:
+			directory, name = os.path.split(filename)
+			temporary_file = os.path.join(directory, f".{name}.tmp.{os.getpid()}")
+		
+		self.m_filename = filename
+		self.m_temporary_file = temporary_file
+		self.m_encoding = encoding
+		self.m_buffer_size = max(1, buffer_size)
+		self.m_fsync = fsync
+		
+		# lines not yet written and their total length (in characters)
+		self.m_lines = []
+		self.m_buffered = 0
+		
+		if position is None:
+			self.m_file = open(temporary_file, 'wb', buffering = 0)
+		else:
+			self.m_file = open(temporary_file, 'r+b', buffering = 0)
+			self.m_file.truncate(position)
+			self.m_file.seek(0, os.SEEK_END)
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exc_type, exc_value, traceback):
+		if exc_type is None:
+			self.commit()
+		else:
+			self.abort()
+		return False
+	
+	def get_filename(self):
+		return self.m_filename
+	
+	def get_temporary_file(self):
+		return self.m_temporary_file
+	
+	def write_line(self, line):
+		r"""
+		Writes the string `line` followed by a line break.
+		"""
+		self.m_lines.append(line)
+		self.m_buffered += len(line) + 1
+		if self.m_buffered >= self.m_buffer_size:
+			self._write_buffer()
+	
+	def write_lines(self, lines):
+		r"""
+		Writes every string in the iterable `lines`, each followed by a line
+		break.
+		"""
+		for line in lines:
+			self.m_lines.append(line)
+			self.m_buffered += len(line) + 1
+			if self.m_buffered >= self.m_buffer_size:
+				self._write_buffer()
+	
+	def write_encoded(self, data):
+		r"""
+		Writes the bytes `data`: lines already encoded (in an encoding
+		compatible with that of the writer), each followed by a line break.
+		"""
+		self._write_buffer()
+		self.m_file.write(data)
+		if self.m_fsync == FsyncAlways:
+			os.fsync(self.m_file.fileno())
+	
+	def _write_buffer(self):
+		r"""
+		Writes all the lines gathered so far into the file as a single block.
+		"""
+		if len(self.m_lines) > 0:
+			self.m_lines.append('')
+			self.m_file.write('\n'.join(self.m_lines).encode(self.m_encoding))
+			self.m_lines.clear()
+			self.m_buffered = 0
+			if self.m_fsync == FsyncAlways:
+				os.fsync(self.m_file.fileno())
+	
+	def sync(self):
+		r"""
+		Writes all the lines gathered so far and forces them to the disk,
+		regardless of the fsync policy. Returns the size of the temporary file.
+		"""
+		self._write_buffer()
+		os.fsync(self.m_file.fileno())
+		return self.m_file.tell()
+	
+	def commit(self):
+		r"""
+		Writes all the lines gathered so far, closes the file and renames it to
+		the output file.
+		"""
+		self._write_buffer()
+		if self.m_fsync != FsyncNever:
+			os.fsync(self.m_file.fileno())
+		self.m_file.close()
+		os.replace(self.m_temporary_file, self.m_filename)
+	
+	def abort(self):
+		r"""
+		Closes the file and removes it. The output file is left untouched.
+		"""
+		self.m_lines.clear()
+		self.m_file.close()
+		try:
+			os.remove(self.m_temporary_file)
+		except FileNotFoundError:
+			pass
+
+if __name__ == "__main__":
+	# TESTS
+	import tempfile
+	
+	with tempfile.TemporaryDirectory() as directory:
+		filename = os.path.join(directory, "output.heads")
+		
+		with output_writer(filename, buffer_size = 8, encoding = "utf-8") as w:
+			w.write_line("0 1 1")
+			assert( not os.path.exists(filename) )
+			w.write_lines(["2 0", "0"])
+		assert( os.listdir(directory) == ["output.heads"] )
+		with open(filename, 'r') as f:
+			assert( f.read() == "0 1 1\n2 0\n0\n" )
+		
+		encoded = os.path.join(directory, "encoded.heads")
+		with output_writer(encoded, encoding = "utf-8") as w:
+			w.write_line("0 1 1")
+			w.write_encoded(b"2 0\n0\n")
+			w.write_line("1 0")
+		with open(encoded, 'r') as f:
+			assert( f.read() == "0 1 1\n2 0\n0\n1 0\n" )
+		os.remove(encoded)
+		
+		# a failure leaves the previous output untouched
+		try:
+			with output_writer(filename, fsync = FsyncAlways) as w:
+				w.write_line("1 0")
+				raise RuntimeError()
+		except RuntimeError:
+			pass
+		assert( os.listdir(directory) == ["output.heads"] )
+		with open(filename, 'r') as f:
+			assert( f.read() == "0 1 1\n2 0\n0\n" )
+		
+		# resume writing a partial file
+		partial = filename + ".partial"
+		w = output_writer(filename, temporary_file = partial)
+		w.write_line("0 1")
+		position = w.sync()
+		w.write_line("lost")
+		w.abort()
+		with open(partial, 'w') as f:
+			f.write("0 1\nlost\n")
+		with output_writer(filename, temporary_file = partial, position = position) as w:
+			w.write_line("2 0")
+		with open(filename, 'r') as f:
+			assert( f.read() == "0 1\n2 0\n" )
@@ -0,0 +1,63 @@
+######################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+######################################################################
+
+r"""
+This file defines basic functions for
+- reporting the progress of a parse, and
+- asking whether the parse should be cancelled.
+
+These functions are stored in variables which are then used by the treebank
+parser library. These can be overridden by users of the treebank parser library
+(e.g., by a graphical user interface that shows a progress bar).
+
+The progress is reported every `report_every` sentences with a call to
+`report(num_sentences, bytes_read, bytes_total)`, where `num_sentences` is the
+number of sentences read so far, `bytes_read` is (an approximation of) the
+number of bytes read from the input file and `bytes_total` is the size of the
+input file. Either value of bytes is 0 when it is not known (e.g., when reading
+from the standard input).
+
+Right after reporting the progress, the parser calls `is_cancel_requested()`.
+If it returns True, the parser stops reading the input file.
+"""
+
+def _report_nothing(num_sentences, bytes_read, bytes_total):
+	pass
+
+def _never_cancel():
+	return False
+
+report = _report_nothing
+is_cancel_requested = _never_cancel
+report_every = 100
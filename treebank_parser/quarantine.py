@@ -0,0 +1,142 @@
+######################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+######################################################################
+
+r"""
+Quarantine of the sentences rejected by the parsers.
+
+Instead of logging every rejected sentence, the parsers can write one record
+per rejected sentence into a quarantine file, in JSON Lines format. Every record
+contains the number of the sentence in the file, its ID (or null), the line
+where it starts and the code of the error, e.g.
+
+	{"sentence": 12, "sent_id": "s12", "line": 340, "error": "invalid-head-vector", "details": ["..."]}
+
+Only the number of sentences rejected with every error code is logged.
+
+The error codes are the following:
+- `InvalidTokenID`: the ID of a token is not an integer,
+- `InvalidHeadID`: the head of a token is not an integer,
+- `InvalidHeadVector`: the heads do not make a valid head vector,
+- `NotATree`: the dependencies of the sentence do not make a tree,
+- `NotRootedTree`: the sentence is not a rooted tree,
+- `NotRootedTreeAfterActions`: the sentence is not a rooted tree after
+applying the actions.
+"""
+
+import json
+
+import treebank_parser.output_log as tbp_logging
+
+InvalidTokenID = "invalid-token-id"
+InvalidHeadID = "invalid-head-id"
+InvalidHeadVector = "invalid-head-vector"
+NotATree = "not-a-tree"
+NotRootedTree = "not-rooted-tree"
+NotRootedTreeAfterActions = "not-rooted-tree-after-actions"
+
+class quarantine:
+	r"""
+	Writes the records of the rejected sentences with `writer` (an
+	`output_writer.output_writer` or an object with the same interface) and
+	counts the sentences rejected with every error code.
+	"""
+	
+	def __init__(self, writer):
+		self.m_writer = writer
+		self.m_counts = {}
+	
+	def add(self, error, sentence_number, sentence_id, starting_line, details = None):
+		r"""
+		Writes the record of a sentence rejected because of `error`. The
+		`details` are a list of strings (e.g., the errors found in the head
+		vector), or None.
+		"""
+		record = {
+			"sentence": sentence_number,
+			"sent_id": sentence_id,
+			"line": starting_line,
+			"error": error
+		}
+		if details:
+			record["details"] = details
+		self.m_writer.write_line(json.dumps(record, ensure_ascii = False))
+		self.m_counts[error] = self.m_counts.get(error, 0) + 1
+	
+	def get_counts(self):
+		r"""
+		Returns a dictionary with the number of sentences rejected with every
+		error code.
+		"""
+		return self.m_counts
+	
+	def set_counts(self, counts):
+		self.m_counts = dict(counts)
+	
+	def sync(self):
+		return self.m_writer.sync()
+	
+	def commit(self):
+		r"""
+		Finishes writing the quarantine file and logs the number of sentences
+		rejected with every error code.
+		"""
+		self.m_writer.commit()
+		for error, count in sorted(self.m_counts.items()):
+			tbp_logging.error(f"{count} sentences rejected with error '{error}'. See {self.m_writer.get_filename()}")
+	
+	def abort(self):
+		self.m_writer.abort()
+
+if __name__ == "__main__":
+	# TESTS
+	import os
+	import tempfile
+	import treebank_parser.output_writer as tbp_output_writer
+	
+	tbp_logging.error = lambda msg: None
+	
+	with tempfile.TemporaryDirectory() as directory:
+		filename = os.path.join(directory, "output.heads.quarantine.jsonl")
+		q = quarantine(tbp_output_writer.output_writer(filename, encoding = "utf-8"))
+		q.add(NotRootedTree, 3, None, 10)
+		q.add(InvalidHeadVector, 5, "s5", 20, ["error 1"])
+		q.add(NotRootedTree, 7, "s7", 30)
+		assert( q.get_counts() == {NotRootedTree: 2, InvalidHeadVector: 1} )
+		q.commit()
+		
+		with open(filename, 'r', encoding = "utf-8") as f:
+			records = [json.loads(line) for line in f]
+		assert( records[0] == {"sentence": 3, "sent_id": None, "line": 10, "error": NotRootedTree} )
+		assert( records[1]["details"] == ["error 1"] )
+		assert( len(records) == 3 )
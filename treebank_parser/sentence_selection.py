@@ -0,0 +1,218 @@
+######################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+######################################################################
+
+r"""
+Selection of a subset of the sentences of a treebank: a shard, a random sample,
+a range of sentences and/or the first few sentences.
+
+This module contains two classes: `sentence_selection` and `empty_selection`.
+"""
+
+import hashlib
+
+class sentence_selection:
+	r"""
+	Decides whether or not a sentence is selected from its number in the file
+	(starting at 1) or, if requested, from its ID. The decision is made before
+	the sentence is parsed so that parsers can skip unselected sentences.
+	
+	The selection is deterministic: the same arguments select the same sentences
+	in every run.
+	"""
+	
+	def __init__(self, args):
+		r"""
+		Initialises the selection with the arguments (as parsed by the cli parser)
+		`shard`, `sample_rate`, `seed`, `max_sentences` and `select_by`, and with
+		the argument `sentence_range`, a pair `(first, last)` of sentence numbers
+		(both included) that is not a CLI option. Missing arguments select all
+		sentences.
+		"""
+		# shard index and number of shards
+		self.m_shard = getattr(args, "shard", None)
+		# probability of selecting a sentence and seed of the sample
+		self.m_sample_rate = getattr(args, "sample_rate", None)
+		self.m_seed = str(getattr(args, "seed", 0))
+		# maximum number of sentences to be selected
+		self.m_max_sentences = getattr(args, "max_sentences", None)
+		# decide from the sentence ID instead of the sentence number
+		self.m_select_by_id = getattr(args, "select_by", "number") == "id"
+		# first and last sentence numbers to be selected
+		self.m_range = getattr(args, "sentence_range", None)
+		
+		# number of sentences selected so far
+		self.m_num_selected = 0
+		# number of the last sentence seen
+		self.m_last_number = 0
+		
+		self.m_selects_all = (
+			self.m_shard is None and
+			self.m_sample_rate is None and
+			self.m_max_sentences is None and
+			self.m_range is None
+		)
+	
+	def _hash(self, key):
+		r"""
+		Returns a 64-bit hash of the string `key` that does not change between
+		runs (unlike Python's `hash`).
+		"""
+		digest = hashlib.blake2b(key.encode("utf-8"), digest_size = 8).digest()
+		return int.from_bytes(digest, "little")
+	
+	def selects_all(self):
+		r"""
+		Returns whether or not every sentence is selected.
+		"""
+		return self.m_selects_all
+	
+	def uses_sentence_ids(self):
+		r"""
+		Returns whether or not the IDs of the sentences are used to select
+		them. Otherwise, `is_selected` can be called without them.
+		"""
+		return self.m_select_by_id and not self.m_selects_all
+	
+	def is_selected(self, sentence_number, sentence_id = None):
+		r"""
+		Returns whether or not the sentence with number `sentence_number` and
+		ID `sentence_id` is selected. Sentences without an ID are selected by
+		their number. Every call counts towards the maximum number of sentences,
+		so this function must be called once per sentence, in order.
+		"""
+		if self.m_selects_all: return True
+		if self.is_exhausted(): return False
+		
+		self.m_last_number = sentence_number
+		if self.m_range is not None:
+			first, last = self.m_range
+			if not (first <= sentence_number <= last): return False
+		
+		if self.m_select_by_id and sentence_id is not None:
+			key = "id:" + sentence_id
+		else:
+			key = "number:" + str(sentence_number)
+		
+		if self.m_shard is not None:
+			index, num_shards = self.m_shard
+			if self.m_select_by_id and sentence_id is not None:
+				shard = self._hash(key) % num_shards
+			else:
+				shard = (sentence_number - 1) % num_shards
+			if shard != index: return False
+		
+		if self.m_sample_rate is not None:
+			h = self._hash(self.m_seed + ":" + key)
+			if h >= self.m_sample_rate * 2**64: return False
+		
+		self.m_num_selected += 1
+		return True
+	
+	def get_state(self):
+		r"""
+		Returns the state of the selection, to be saved in a checkpoint.
+		"""
+		return [self.m_num_selected, self.m_last_number]
+	
+	def set_state(self, state):
+		r"""
+		Restores a state returned by `get_state`.
+		"""
+		self.m_num_selected, self.m_last_number = state
+	
+	def is_exhausted(self):
+		r"""
+		Returns whether or not the maximum number of sentences has already been
+		selected, or the last sentence of the range has already been seen. In
+		that case, no more sentences will be selected.
+		"""
+		if self.m_range is not None and self.m_last_number >= self.m_range[1]:
+			return True
+		return self.m_max_sentences is not None and self.m_num_selected >= self.m_max_sentences
+
+class empty_selection:
+	r"""
+	A selection that selects no sentence, but never stops the parser from
+	reading the whole file. Useful to count the sentences of a file.
+	"""
+	
+	def selects_all(self):
+		return False
+	
+	def uses_sentence_ids(self):
+		return False
+	
+	def is_selected(self, sentence_number, sentence_id = None):
+		return False
+	
+	def is_exhausted(self):
+		return False
+
+if __name__ == "__main__":
+	# TESTS
+	import argparse
+	
+	def selected(n, **kwargs):
+		selection = sentence_selection(argparse.Namespace(**kwargs))
+		return [i for i in range(1, n + 1) if selection.is_selected(i)]
+	
+	assert( selected(5) == [1, 2, 3, 4, 5] )
+	assert( selected(10, shard = (0, 3)) == [1, 4, 7, 10] )
+	assert( selected(10, shard = (2, 3)) == [3, 6, 9] )
+	assert( selected(10, max_sentences = 4) == [1, 2, 3, 4] )
+	assert( selected(10, shard = (1, 3), max_sentences = 2) == [2, 5] )
+	assert( selected(10, sentence_range = (4, 6)) == [4, 5, 6] )
+	assert( selected(10, sentence_range = (9, 20)) == [9, 10] )
+	selection = sentence_selection(argparse.Namespace(sentence_range = (2, 3)))
+	assert( [selection.is_selected(i) for i in range(1, 4)] == [False, True, True] )
+	assert( selection.is_exhausted() )
+	
+	# the shards are a partition of the sentences
+	all_shards = sorted(sum([selected(100, shard = (i, 4), select_by = "id") for i in range(0, 4)], []))
+	assert( all_shards == list(range(1, 101)) )
+	
+	# the sample is reproducible and has about the expected size
+	sample = selected(10000, sample_rate = 0.1, seed = 7)
+	assert( sample == selected(10000, sample_rate = 0.1, seed = 7) )
+	assert( sample != selected(10000, sample_rate = 0.1, seed = 8) )
+	assert( 800 < len(sample) < 1200 )
+	assert( selected(100, sample_rate = 1.0, seed = 1) == list(range(1, 101)) )
+	
+	# selection by ID
+	selection = sentence_selection(argparse.Namespace(sample_rate = 0.5, seed = 3, select_by = "id"))
+	ids = [f"train-s{i}" for i in range(0, 1000)]
+	first = [selection.is_selected(i + 1, ids[i]) for i in range(0, 1000)]
+	selection = sentence_selection(argparse.Namespace(sample_rate = 0.5, seed = 3, select_by = "id"))
+	shifted = [selection.is_selected(i + 2, ids[i]) for i in range(0, 1000)]
+	assert( first == shifted )
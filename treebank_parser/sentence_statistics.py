@@ -0,0 +1,173 @@
+######################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+######################################################################
+
+r"""
+Statistics of a treebank gathered without building any tree.
+
+The parsers fill a `sentence_statistics` object when they only scan their
+input file (see `generic_parser.scan_statistics`): for every sentence, its
+length before and after removing hypothetically the tokens of some categories
+(punctuation marks, function words, ...), and the number of tokens that are
+not stored as words of a sentence (multiword tokens, empty tokens, tokens
+whose head is not an integer). These are the figures needed to choose the
+values of the actions that discard sentences by their length.
+
+The statistics are written in a tab-separated file: first the counts, in
+lines that start with '#', and then a histogram with a row for every length
+and a column for every set of tokens removed, e.g.
+
+	# sentences	3
+	# multiword tokens	1
+	# empty tokens	0
+	# non-integer heads	0
+	length	all	RemovePunctuationMarks
+	0	0	0
+	1	0	1
+	2	1	2
+	3	2	0
+"""
+
+from treebank_parser import symbol_table as tbp_symbols
+
+class sentence_statistics:
+	r"""
+	Histograms of the length of the sentences of a treebank, and counts of the
+	tokens that are not words of a sentence.
+	
+	Every histogram corresponds to a column, a pair (name, categories): the
+	length of a sentence in the histogram is the number of its tokens that do
+	not fall in any of the categories (see module `treebank_parser.symbol_table`).
+	"""
+	
+	def __init__(self, columns):
+		r"""
+		Initialises empty statistics with the columns `columns`, a list of
+		pairs (name, categories).
+		"""
+		self.m_names = [name for name, _ in columns]
+		# table of the tokens removed for every column; None if none is removed
+		self.m_remove_tables = [
+			tbp_symbols.make_mask_table(categories) if categories != 0 else None
+			for _, categories in columns
+		]
+		# histogram of every column: number of sentences of every length
+		self.m_histograms = [[] for _ in columns]
+		
+		self.m_num_sentences = 0
+		self.m_num_multiword_tokens = 0
+		self.m_num_empty_tokens = 0
+		self.m_num_invalid_heads = 0
+	
+	def add_sentence(self, categories):
+		r"""
+		Adds a sentence whose words have the categories `categories`, a `bytes`
+		object (or a `bytearray`) with one byte per word.
+		"""
+		self.m_num_sentences += 1
+		n = len(categories)
+		for table, histogram in zip(self.m_remove_tables, self.m_histograms):
+			length = n
+			if table is not None:
+				length -= categories.translate(table).count(1)
+			if length >= len(histogram):
+				histogram.extend([0]*(length + 1 - len(histogram)))
+			histogram[length] += 1
+	
+	def add_skipped_tokens(self, num_multiword = 0, num_empty = 0, num_invalid_heads = 0):
+		r"""
+		Counts `num_multiword` multiword tokens, `num_empty` empty tokens and
+		`num_invalid_heads` tokens whose head is not an integer.
+		"""
+		self.m_num_multiword_tokens += num_multiword
+		self.m_num_empty_tokens += num_empty
+		self.m_num_invalid_heads += num_invalid_heads
+	
+	def get_num_sentences(self):
+		return self.m_num_sentences
+	
+	def get_histogram(self, name):
+		r"""
+		Returns the histogram of the column `name`: a list whose `n`-th value
+		is the number of sentences of length `n`.
+		"""
+		return self.m_histograms[self.m_names.index(name)]
+	
+	def get_lines(self):
+		r"""
+		Yields the lines of the file of statistics (see the description of the
+		module).
+		"""
+		yield f"# sentences\t{self.m_num_sentences}"
+		yield f"# multiword tokens\t{self.m_num_multiword_tokens}"
+		yield f"# empty tokens\t{self.m_num_empty_tokens}"
+		yield f"# non-integer heads\t{self.m_num_invalid_heads}"
+		yield '\t'.join(["length"] + self.m_names)
+		
+		max_length = max(len(histogram) for histogram in self.m_histograms) - 1
+		for length in range(0, max_length + 1):
+			row = [histogram[length] if length < len(histogram) else 0 for histogram in self.m_histograms]
+			yield '\t'.join(map(str, [length] + row))
+
+if __name__ == "__main__":
+	# TESTS
+	P = tbp_symbols.PunctuationMark
+	F = tbp_symbols.FunctionWord
+	
+	stats = sentence_statistics([("all", 0), ("P", P), ("P+F", P | F)])
+	stats.add_sentence(bytes([F, F, 0, P]))
+	stats.add_sentence(bytearray([0, P]))
+	stats.add_sentence(b"")
+	stats.add_skipped_tokens(num_multiword = 1, num_empty = 1)
+	stats.add_skipped_tokens(num_invalid_heads = 2)
+	
+	assert( stats.get_num_sentences() == 3 )
+	assert( stats.get_histogram("all") == [1, 0, 1, 0, 1] )
+	assert( stats.get_histogram("P") == [1, 1, 0, 1] )
+	assert( stats.get_histogram("P+F") == [1, 2] )
+	assert( list(stats.get_lines()) == [
+		"# sentences\t3",
+		"# multiword tokens\t1",
+		"# empty tokens\t1",
+		"# non-integer heads\t2",
+		"length\tall\tP\tP+F",
+		"0\t1\t1\t1",
+		"1\t0\t1\t2",
+		"2\t1\t0\t0",
+		"3\t0\t1\t0",
+		"4\t1\t0\t0",
+	] )
+	
+	# no sentences at all
+	stats = sentence_statistics([("all", 0)])
+	assert( list(stats.get_lines())[-1] == "length\tall" )
@@ -0,0 +1,218 @@
+######################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+######################################################################
+
+r"""
+Head vectors of a treebank in shared memory.
+
+A worker process that parses a treebank for another process (e.g., when the
+consistency among the treebanks of a collection is kept in parallel) stores
+the head vectors in a block of shared memory (see `share_head_vectors`) and
+sends back only a small descriptor of the block. The other process attaches to
+the block (see class `shared_results`) and copies the bytes of the head vectors
+directly into the output file, without building a single string.
+
+The block contains, in this order:
+- the offsets (unsigned 64-bit integers) of the head vector of every sentence
+in the data, plus the offset of the end of the data,
+- one byte per sentence: 1 if the sentence was kept, 0 if it was discarded,
+- the data: the head vectors of the sentences kept, encoded in ASCII, each
+followed by a line break.
+
+Other lines written in lock-step with the head vectors (e.g., those of the
+sentence-ids file) can be shared in the same way, in another encoding.
+"""
+
+from array import array
+from multiprocessing import shared_memory, resource_tracker
+
+def share_head_vectors(head_vectors, encoding = "ascii"):
+	r"""
+	Stores the list of head vectors `head_vectors` (strings, or None for the
+	sentences discarded) in a new block of shared memory, encoded in
+	`encoding`. Returns the descriptor of the block, to be passed to
+	`shared_results`. The block lives until the `shared_results` made with the
+	descriptor is closed.
+	"""
+	n = len(head_vectors)
+	offsets = array('Q', bytes(8*(n + 1)))
+	flags = bytearray(n)
+	
+	kept = []
+	position = 0
+	for (i, head_vector) in enumerate(head_vectors):
+		if head_vector is not None:
+			flags[i] = 1
+			kept.append(head_vector)
+			if encoding == "ascii":
+				position += len(head_vector) + 1
+			else:
+				position += len(head_vector.encode(encoding)) + 1
+		offsets[i + 1] = position
+	
+	kept.append('')
+	data = '\n'.join(kept).encode(encoding)
+	
+	begin_flags = offsets.itemsize*(n + 1)
+	begin_data = begin_flags + n
+	memory = shared_memory.SharedMemory(create = True, size = max(1, begin_data + len(data)))
+	# the block belongs to the process that attaches to it and destroys it,
+	# which registers it in the resource tracker (shared by all the processes)
+	# again: otherwise, the tracker would try to destroy it twice
+	resource_tracker.unregister(memory._name, "shared_memory")
+	memory.buf[0:begin_flags] = offsets.tobytes()
+	memory.buf[begin_flags:begin_data] = flags
+	memory.buf[begin_data:begin_data + len(data)] = data
+	
+	descriptor = {"name": memory.name, "num_sentences": n, "data_size": len(data)}
+	memory.close()
+	return descriptor
+
+class shared_results:
+	r"""
+	The head vectors of a treebank stored in shared memory by another process
+	with `share_head_vectors`, given the descriptor of the block.
+	
+	The block is unlinked when `close` is called.
+	"""
+	
+	def __init__(self, descriptor):
+		self.m_memory = shared_memory.SharedMemory(name = descriptor["name"])
+		n = descriptor["num_sentences"]
+		self.m_num_sentences = n
+		
+		begin_flags = 8*(n + 1)
+		begin_data = begin_flags + n
+		self.m_offsets = self.m_memory.buf[0:begin_flags].cast('Q')
+		self.m_flags = self.m_memory.buf[begin_flags:begin_data]
+		self.m_data = self.m_memory.buf[begin_data:begin_data + descriptor["data_size"]]
+	
+	def close(self):
+		r"""
+		Detaches from the block of shared memory and destroys it.
+		"""
+		self.m_offsets.release()
+		self.m_flags.release()
+		self.m_data.release()
+		self.m_memory.close()
+		self.m_memory.unlink()
+	
+	def get_num_sentences(self):
+		r"""
+		Returns the number of sentences parsed.
+		"""
+		return self.m_num_sentences
+	
+	def get_flags(self):
+		r"""
+		Returns a `bytes` object with one byte per sentence: 1 if the sentence
+		was kept and 0 if it was discarded.
+		"""
+		return bytes(self.m_flags)
+	
+	def is_sentence_ok(self, i):
+		r"""
+		Returns true if the i-th sentence was not discarded.
+		"""
+		return self.m_flags[i] == 1
+	
+	def write_conditionally(self, writer, condition, block_size = 1024*1024):
+		r"""
+		Writes the head vectors of the sentences `i` such that `condition[i]` is
+		true into the `output_writer` `writer`, in blocks of about `block_size`
+		bytes. The head vectors of the sentences discarded are empty, so they
+		are never written.
+		"""
+		offsets = self.m_offsets
+		block = bytearray()
+		n = min(self.m_num_sentences, len(condition))
+		i = 0
+		while i < n:
+			if not condition[i]:
+				i += 1
+				continue
+			# the longest run of consecutive sentences to be written
+			j = i + 1
+			while j < n and condition[j]:
+				j += 1
+			
+			block += self.m_data[offsets[i]:offsets[j]]
+			if len(block) >= block_size:
+				writer.write_encoded(block)
+				block = bytearray()
+			i = j
+		
+		if len(block) > 0:
+			writer.write_encoded(block)
+
+if __name__ == "__main__":
+	# TESTS
+	import os
+	import tempfile
+	from treebank_parser.output_writer import output_writer
+	
+	descriptor = share_head_vectors(["0 1 1", None, "2 0", "0", None])
+	results = shared_results(descriptor)
+	assert( results.get_num_sentences() == 5 )
+	assert( results.get_flags() == bytes([1, 0, 1, 1, 0]) )
+	assert( results.is_sentence_ok(0) and not results.is_sentence_ok(1) )
+	
+	with tempfile.TemporaryDirectory() as directory:
+		filename = os.path.join(directory, "output.heads")
+		for (condition, block_size, expected) in [
+			([1, 1, 1, 1, 1], 1024, "0 1 1\n2 0\n0\n"),
+			([1, 0, 0, 1, 1], 1, "0 1 1\n0\n"),
+			([0, 0, 1, 0, 0], 1024, "2 0\n"),
+			([0, 0, 0, 0, 0], 1024, ""),
+		]:
+			with output_writer(filename, encoding = "utf-8") as w:
+				results.write_conditionally(w, bytes(condition), block_size)
+			with open(filename, 'r') as f:
+				assert( f.read() == expected )
+	results.close()
+	
+	# lines that are not ASCII
+	results = shared_results(share_head_vectors(["1\tà\t1", None, "3\t_\t7"], encoding = "utf-8"))
+	with tempfile.TemporaryDirectory() as directory:
+		filename = os.path.join(directory, "output.ids.tsv")
+		with output_writer(filename, encoding = "utf-8") as w:
+			results.write_conditionally(w, bytes([1, 1, 1]))
+		with open(filename, 'r', encoding = "utf-8") as f:
+			assert( f.read() == "1\tà\t1\n3\t_\t7\n" )
+	results.close()
+	
+	# an empty treebank
+	results = shared_results(share_head_vectors([]))
+	assert( results.get_num_sentences() == 0 )
+	assert( results.get_flags() == b"" )
+	results.close()
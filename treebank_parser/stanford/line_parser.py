@@ -40,6 +40,13 @@ The `line_parser` class parses the contents of a line in a Stanford-formatted fi
 
 import treebank_parser.output_log as tbp_logging
 
+def is_punctuation_mark_type(dependency_type):
+	r"""
+	Returns whether or not the dependent word of a dependency of type
+	`dependency_type` is a punctuation mark.
+	"""
+	return dependency_type == "punct"
+
 class line_parser:
 	
 	def _split_unit(self, unit):
@@ -155,7 +162,7 @@ class line_parser:
 		punctuation mark. A word is a punctuation mark if its word type is
 		'punct'.
 		"""
-		return self.get_dependency_type() == "punct"
+		return is_punctuation_mark_type(self.get_dependency_type())
 	
 	def __repr__(self):
 		return f"({self.get_line_number()}) type: '{self.get_dependency_type()}' parent: '{self.get_parent_word()} ({self.get_parent_id()}) dependent: '{self.get_dependent_word()} ({self.get_dependent_id()})"
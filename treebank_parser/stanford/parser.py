@@ -43,6 +43,9 @@ import time
 from treebank_parser.generic_parser import generic_parser
 from treebank_parser.stanford import line_parser
 from treebank_parser.stanford import line_type
+from treebank_parser.stanford import action_type
+from treebank_parser import symbol_table as tbp_symbols
+from treebank_parser import quarantine as tbp_quarantine
 import treebank_parser.output_log as tbp_logging
 
 class parser(generic_parser):
@@ -62,6 +65,9 @@ class parser(generic_parser):
 	def _location(self):
 		return f"At sentence {self.m_sentence_number}, starting at line {self.m_sentence_starting_line}"
 
+	def _sentence_location(self):
+		return (self.m_sentence_number, None, self.m_sentence_starting_line)
+
 	def _num_unique_ids(self):
 		r"""
 		Returns the number of unique ids found in self.m_sentence_deps.
@@ -89,9 +95,10 @@ class parser(generic_parser):
 				deps.append( (u,v) )
 		return deps
 
-	def _build_full_tree(self, edge_list):
+	def _make_head_vector(self, edge_list):
 		r"""
-		Build the tree structure out of the edge list 'edge_list'
+		Makes the head vector of the edge list 'edge_list' and checks that it is
+		correct. Returns None if it is not, after reporting the errors.
 		"""
 		
 		head_vector = [edge[0] for edge in edge_list]
@@ -100,6 +107,8 @@ class parser(generic_parser):
 		tbp_logging.debug("    Checking mistakes in head vector...")
 		err_list = self.LAL_module.io.check_correctness_head_vector(head_vector)
 		if len(err_list) > 0:
+			if self._quarantine_sentence(tbp_quarantine.InvalidHeadVector, [str(err) for err in err_list]):
+				return None
 			
 			tbp_logging.error(self._location())
 			tbp_logging.error(f"There were errors within head vector '{head_vector}':")
@@ -109,6 +118,14 @@ class parser(generic_parser):
 			tbp_logging.error(self.m_donotknow_msg)
 			return None
 		
+		return head_vector
+
+	def _build_full_tree(self, head_vector):
+		r"""
+		Build the tree structure out of the head vector 'head_vector' (see
+		`_make_head_vector`)
+		"""
+		
 		# make the lal.graphs.rooted_tree() object
 		tbp_logging.debug(f"make a rooted tree from the head vector {head_vector=}")
 		rt = self.LAL_module.graphs.from_head_vector_to_rooted_tree(head_vector)
@@ -119,8 +136,12 @@ class parser(generic_parser):
 	
 		return rt
 	
-	def _should_remove_token(self, dep):
-		return any(map(lambda f: f(dep), self.m_token_discard_functions))
+	def _should_remove_token(self, i):
+		r"""
+		Returns whether or not the dependent word of the `i`-th dependency of
+		the sentence has to be removed.
+		"""
+		return (self.m_sentence_categories[i] & self.m_action_plan.remove_categories) != 0
 
 	def _remove_words_tree(self, rt):
 		r"""
@@ -130,16 +151,17 @@ class parser(generic_parser):
 		
 		n = rt.get_num_nodes()
 		
-		if len(self.m_token_discard_functions) == 0:
+		if not self.m_action_plan.removes_tokens():
 			# nothing to do
 			return rt
 
 		total_deleted = 0
 		tree_vertices__to__tokens = dict( [ (x,x) for x in range(0,n) ] )
 
-		for dep in reversed(self.m_sentence_deps):
+		for i in reversed(range(0, len(self.m_sentence_deps))):
+			dep = self.m_sentence_deps[i]
 			
-			if not self._should_remove_token(dep):
+			if not self._should_remove_token(i):
 				# word does not meet any criterion for removal
 				continue
 			
@@ -176,8 +198,7 @@ class parser(generic_parser):
 				new_root = None
 				for u in rt.get_out_neighbors(token_id):
 					tbp_logging.debug(f"Child {u}")
-					token_u = self.m_sentence_deps[tree_vertices__to__tokens[u]]
-					if not self._should_remove_token(token_u):
+					if not self._should_remove_token(tree_vertices__to__tokens[u]):
 						new_root = u
 						tbp_logging.debug(f"New root is {new_root=}")
 						break
@@ -197,7 +218,7 @@ class parser(generic_parser):
 			else:
 				# reattach the children of this token to this token's parent when
 				# the token is a punctuation mark
-				join_children = self.m_sentence_deps[token_id].is_punctuation_mark()
+				join_children = (self.m_sentence_categories[token_id] & tbp_symbols.PunctuationMark) != 0
 
 				tbp_logging.debug(f"Remove token while joining its parent to its children? {join_children}")
 				rt.remove_node(token_id, join_children)
@@ -210,68 +231,96 @@ class parser(generic_parser):
 
 		return rt
 	
-	def _make_token_discard_functions(self, args):
-		
-		# Remove punctuation marks
-		if args.RemovePunctuationMarks:
-			self.m_token_discard_functions.append( lambda d: d.is_punctuation_mark() )
-		
-	def _make_sentence_discard_functions(self, args):
-		
-		# Discard short sentences
-		if args.DiscardSentencesShorter != -1:
-			self.m_sentence_discard_functions.append(
-				lambda rt: rt.get_num_nodes() <= args.DiscardSentencesShorter
-			)
-		# Discard long sentences
-		if args.DiscardSentencesLonger != -1:
-			self.m_sentence_discard_functions.append(
-				lambda rt: rt.get_num_nodes() >= args.DiscardSentencesLonger
-			)
-		
-	def _make_sentence_postprocess_functions(self, args):
-		
-		# Discard short sentences
-		if args.ChunkSyntacticDependencyTree != None:
-			Anderson = self.LAL_module.linarr.algorithms_chunking.Anderson
-			Macutek = self.LAL_module.linarr.algorithms_chunking.Macutek
-			
-			if args.ChunkSyntacticDependencyTree == "Anderson":
-				self.m_sentence_postprocess_functions.append(
-					lambda rt: self.LAL_module.linarr.chunk_syntactic_dependency_tree(rt, Anderson)
-				)
-			if args.ChunkSyntacticDependencyTree == "Macutek":
-				self.m_sentence_postprocess_functions.append(
-					lambda rt: self.LAL_module.linarr.chunk_syntactic_dependency_tree(rt, Macutek)
-				)
-	
 	def _reset_state(self):
 		self.m_sentence_deps.clear()
+		self.m_sentence_categories.clear()
+
+	def _share_sentence(self, p):
+		p.m_sentence_deps = self.m_sentence_deps
+		p.m_sentence_categories = self.m_sentence_categories
+
+	def _statistics_columns(self):
+		return [
+			("all", 0),
+			(action_type.RemovePunctuationMarks_key_str, tbp_symbols.PunctuationMark)
+		]
+
+	def _scan_sentence(self):
+		r"""
+		Adds the sentence just read to the statistics 'm_statistics' without
+		building its tree. Every dependency is a word of the sentence, but the
+		repeated dependencies are counted once, as in `_unique_dependencies`.
+		"""
+		categories = bytearray()
+		edges = set()
+		for (dep, c) in zip(self.m_sentence_deps, self.m_sentence_categories):
+			edge = (dep.get_parent_id(), dep.get_dependent_id())
+			if edge not in edges:
+				edges.add(edge)
+				categories.append(c)
+		self.m_statistics.add_sentence(categories)
+		self.m_statistics.add_skipped_tokens(
+			num_invalid_heads = sum(1 for dep in self.m_sentence_deps if dep.get_parent_id() is None)
+		)
 
 	def _finish_reading_sentence(self):
+		r"""
+		Converts the sentence just read into a head vector, for this parser and
+		for its variants.
+		"""
 		tbp_logging.debug(self._location())
 		tbp_logging.debug("Building the tree...")
+		
+		parsers = self._all_parsers()
+		for p in parsers:
+			p.m_sentence_number = self.m_sentence_number
+			p.m_sentence_starting_line = self.m_sentence_starting_line
 
 		n = self._num_unique_ids()
 		edges = self._unique_dependencies()
 		m = len(edges)
 		if m != n - 1:
+			self.m_sentence_parsers = parsers
+			quarantined = self._quarantine_sentence(tbp_quarantine.NotATree, [f"The graph has {n} nodes and {m} edges"])
+			self.m_sentence_parsers = [self]
+			if quarantined: return
+			
 			tbp_logging.warning(self._location())
 			tbp_logging.warning(f"The syntactic dependency structure of sentence '{self.m_sentence_number}' is not a tree.")
 			tbp_logging.debug(f"The graph has {n} nodes and {m} edges")
 			return
 		
-		rt = self._build_full_tree(edges)
-		if rt is None: return
+		# the errors in the head vector are reported even if the sentence is
+		# then discarded because of its length
+		self.m_sentence_parsers = parsers
+		head_vector = self._make_head_vector(edges)
+		self.m_sentence_parsers = [self]
+		if head_vector is None: return
+		
+		# the number of words to be removed is known only when there are no
+		# repeated dependencies
+		unique = len(self.m_sentence_deps) == m
+		parsers = [
+			p for p in parsers
+			if not p._discard_before_tree(m, self.m_sentence_categories.translate(p.m_remove_table).count(1) if unique else None)
+		]
+		if len(parsers) == 0: return
+		
+		self.m_sentence_parsers = parsers
+		rt = self._build_full_tree(head_vector)
 		if not rt.is_rooted_tree():
-			tbp_logging.warning("The tree is not a rooted tree")
-			return
-
-		tbp_logging.debug("Remove words if needed...")
-		rt = self._remove_words_tree(rt)
+			if not self._quarantine_sentence(tbp_quarantine.NotRootedTree):
+				tbp_logging.warning("The tree is not a rooted tree")
+			rt = None
+		self.m_sentence_parsers = [self]
+		if rt is None: return
 
-		tbp_logging.debug("Store the head vector...")
-		self._store_tree(rt)
+		for p, t in self._fan_out_tree(parsers, rt):
+			tbp_logging.debug("Remove words if needed...")
+			t = p._remove_words_tree(t)
+			
+			tbp_logging.debug("Store the head vector...")
+			p._store_tree(t)
 
 	def __init__(self, input_file, output_file, args, lal_module):
 		r"""
@@ -281,6 +330,11 @@ class parser(generic_parser):
 
 		# all the dependencies in the current sentence
 		self.m_sentence_deps = []
+		# categories of the dependent word of every dependency in the sentence
+		self.m_sentence_categories = bytearray()
+		# dependency types found in the file
+		self.m_dependency_types = tbp_symbols.symbol_table(categorize_dependency_type)
+		self.m_remove_table = tbp_symbols.make_mask_table(self.m_action_plan.remove_categories)
 		# number of sentence in the file
 		self.m_sentence_number = 0
 	
@@ -292,10 +346,19 @@ class parser(generic_parser):
 		"""
 		
 		reading_sentence = False
+		# is the sentence being read selected? (see `sentence_selection`)
+		selected = True
 		linenumber = 1
-		with open(self.m_input_file, 'r', encoding = "utf-8") as f:
+		num_tokens = 0
+		with self._open_input_file() as f:
 			tbp_logging.info(f"Input file {self.m_input_file} has been opened correctly.")
 			
+			# when resuming a parse, continue where the checkpoint was made
+			state = self._get_resume_state()
+			if state is not None:
+				linenumber = state["linenumber"]
+				self.m_sentence_number = state["sentence_number"]
+			
 			begin = time.perf_counter()
 			for line in f:
 				type_of_line = line_type.classify(line)
@@ -306,9 +369,16 @@ class parser(generic_parser):
 				
 					if reading_sentence:
 						tbp_logging.debug("Finished reading sentence")
-						self._finish_reading_sentence()
+						if selected:
+							if self.m_statistics is not None:
+								self._scan_sentence()
+							else:
+								self._finish_reading_sentence()
 						self._reset_state()
 						reading_sentence = False
+						if self._sentence_read(f, num_tokens): break
+						self._checkpoint(f, {"linenumber": linenumber + 1, "sentence_number": self.m_sentence_number})
+						if self.m_selection.is_exhausted(): break
 				
 				elif type_of_line == line_type.Dependency:
 					# this line has actual information about the sentence.
@@ -316,23 +386,83 @@ class parser(generic_parser):
 						self.m_sentence_starting_line = linenumber
 						reading_sentence = True
 						self.m_sentence_number += 1
+						num_tokens = 0
+						selected = self.m_selection.is_selected(self.m_sentence_number)
 						tbp_logging.debug(self._location())
 						tbp_logging.debug(f"Start reading sentence")
 					
+					# the lines of unselected sentences are not even parsed
+					num_tokens += 1
+					if not selected:
+						linenumber += 1
+						continue
+					
 					dependency = line_parser.line_parser(line, linenumber)
 					dependency.parse_line()
 
 					self.m_sentence_deps.append( dependency )
+					code = self.m_dependency_types.intern(dependency.get_dependency_type())
+					self.m_sentence_categories.append(self.m_dependency_types.get_categories(code))
 				
 				linenumber += 1
 			
 			# Finished reading file. If there was some sentence being read, process it.
 			if reading_sentence:
 				tbp_logging.debug("Finished reading the last sentence")
-				self._finish_reading_sentence()
+				if selected:
+					if self.m_statistics is not None:
+						self._scan_sentence()
+					else:
+						self._finish_reading_sentence()
 				self._reset_state()
+				self._sentence_read(f, num_tokens)
 			
+			self._finish_progress()
 			end = time.perf_counter()
 			
 			tbp_logging.info(f"Finished parsing the whole input file {self.m_input_file}.")
 			tbp_logging.info(f"    In {end - begin:.3f} s.")
+
+def categorize_dependency_type(dependency_type):
+	r"""
+	Returns the categories (see `treebank_parser.symbol_table`) of the dependent
+	word of a dependency of type `dependency_type`.
+	"""
+	if line_parser.is_punctuation_mark_type(dependency_type):
+		return tbp_symbols.PunctuationMark
+	return 0
+
+if __name__ == "__main__":
+	# TESTS
+	import io
+	import argparse
+	
+	tbp_logging.info = lambda msg: None
+	tbp_logging.debug = lambda msg: None
+	
+	def scan(contents):
+		p = parser(io.StringIO(contents), None, argparse.Namespace(), None)
+		return p.scan_statistics()
+	
+	stats = scan("nsubj(ran-2, dog-1)\nroot(ROOT-0, ran-2)\npunct(ran-2, .-3)\n\nroot(ROOT-0, yes-1)\n")
+	assert( stats.get_num_sentences() == 2 )
+	assert( stats.get_histogram("all") == [0, 1, 0, 1] )
+	assert( stats.get_histogram(action_type.RemovePunctuationMarks_key_str) == [0, 1, 1] )
+	
+	# repeated dependencies are words of the sentence only once
+	stats = scan("nsubj(ran-2, dog-1)\nnsubj(ran-2, dog-1)\nroot(ROOT-0, ran-2)\n")
+	assert( stats.get_histogram("all") == [0, 0, 1] )
+	
+	# a failed read leaves the parser as it was
+	f = io.StringIO("root(ROOT-0, yes-1)\n")
+	p = parser(f, None, argparse.Namespace(), None)
+	selection = p.m_selection
+	f.close()
+	for read in [p.scan_statistics, p.count_sentences]:
+		try:
+			read()
+			assert( False )
+		except ValueError:
+			pass
+		assert( p.m_statistics is None )
+		assert( p.m_selection is selection )
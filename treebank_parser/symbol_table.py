@@ -0,0 +1,135 @@
+######################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+######################################################################
+
+r"""
+Interning of the symbols found in a treebank (part-of-speech tags, dependency
+types, ...) into small integer codes.
+
+Every symbol is classified into categories when it is interned. Categories
+are bits, so the categories of a symbol are a single integer, and whether a
+token falls in any of a set of categories is a single AND operation.
+"""
+
+# Categories of symbols
+PunctuationMark = 1
+FunctionWord = 2
+
+class symbol_table:
+	r"""
+	Interns strings into consecutive integer codes starting at 0, and keeps
+	the categories of every symbol.
+	"""
+	
+	def __init__(self, categorize = None):
+		r"""
+		Initialises an empty table. The function `categorize` returns the
+		categories (an integer) of a symbol. If it is None, no symbol has any
+		category.
+		"""
+		if categorize is None: categorize = lambda symbol: 0
+		self.m_categorize = categorize
+		# code of every symbol
+		self.m_codes = {}
+		# symbol of every code
+		self.m_symbols = []
+		# categories of every code
+		self.m_categories = bytearray()
+	
+	def intern(self, symbol):
+		r"""
+		Returns the code of `symbol`, adding the symbol to the table if needed.
+		"""
+		code = self.m_codes.get(symbol)
+		if code is None:
+			code = len(self.m_symbols)
+			self.m_codes[symbol] = code
+			self.m_symbols.append(symbol)
+			self.m_categories.append(self.m_categorize(symbol))
+		return code
+	
+	def get_code(self, symbol):
+		r"""
+		Returns the code of `symbol`, or None if it is not in the table.
+		"""
+		return self.m_codes.get(symbol)
+	
+	def get_symbol(self, code):
+		r"""
+		Returns the symbol with code `code`.
+		"""
+		return self.m_symbols[code]
+	
+	def get_categories(self, code):
+		r"""
+		Returns the categories of the symbol with code `code`.
+		"""
+		return self.m_categories[code]
+	
+	def get_categories_table(self):
+		r"""
+		Returns the categories of all symbols as a `bytes` object indexed by
+		the symbols' codes.
+		"""
+		return bytes(self.m_categories)
+	
+	def size(self):
+		r"""
+		Returns the number of symbols in the table.
+		"""
+		return len(self.m_symbols)
+
+def make_mask_table(categories):
+	r"""
+	Returns a translation table for `bytes.translate` that maps every byte
+	(a set of categories) to 1 if it has any category in `categories`, and to
+	0 otherwise.
+	"""
+	return bytes(1 if b & categories else 0 for b in range(0, 256))
+
+if __name__ == "__main__":
+	# TESTS
+	table = symbol_table(lambda s: PunctuationMark if s == "punct" else 0)
+	assert( table.intern("nsubj") == 0 )
+	assert( table.intern("punct") == 1 )
+	assert( table.intern("nsubj") == 0 )
+	assert( table.size() == 2 )
+	assert( table.get_code("punct") == 1 )
+	assert( table.get_code("obj") is None )
+	assert( table.get_symbol(0) == "nsubj" )
+	assert( table.get_categories(0) == 0 )
+	assert( table.get_categories(1) == PunctuationMark )
+	assert( table.get_categories_table() == bytes([0, PunctuationMark]) )
+	
+	mask_table = make_mask_table(FunctionWord)
+	assert( bytes([0, PunctuationMark, FunctionWord, PunctuationMark | FunctionWord]).translate(mask_table) == bytes([0, 0, 1, 1]) )
@@ -0,0 +1,249 @@
+######################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+######################################################################
+
+r"""
+Parse the treebanks of an archive
+=================================
+
+This module parses the treebanks stored in a tar archive, possibly compressed
+with gzip, bzip2 or xz (e.g., a release of the Universal Dependencies
+treebanks), without extracting it. The archive is read only once, as a stream,
+and every member whose name matches a pattern is parsed as soon as it is read.
+The head vectors of a member are written into the file `<treebank>.hv` of the
+output directory, where `<treebank>` is the name of the member without its
+directories and its extension (see `get_treebank_identifier`).
+
+With several workers, this process reads the members and a pool of worker
+processes parses them. At most twice as many members as workers are kept in
+memory at the same time.
+"""
+
+import io
+import sys
+import fnmatch
+import tarfile
+import posixpath
+import collections
+
+import treebank_parser.output_log as tbp_logging
+import treebank_parser.progress as tbp_progress
+import treebank_parser.worker_pool as tbp_worker_pool
+
+# pattern of the names of the members parsed by default
+DefaultMemberPattern = "*.conllu"
+
+def get_treebank_identifier(member_name):
+	r"""
+	Returns the identifier of the treebank stored in the member `member_name`
+	of an archive: its name without directories and extension. For example,
+	the identifier of 'ud-treebanks-v2.13/UD_Catalan-AnCora/ca_ancora-ud-dev.conllu'
+	is 'ca_ancora-ud-dev'.
+	"""
+	return posixpath.splitext(posixpath.basename(member_name))[0]
+
+def _open_archive(archive_file):
+	r"""
+	Opens the archive `archive_file` (or the standard input if it is "-") for
+	reading as a stream. The compression is detected automatically.
+	"""
+	if archive_file == "-":
+		return tarfile.open(fileobj = sys.stdin.buffer, mode = "r|*")
+	return tarfile.open(archive_file, mode = "r|*")
+
+def _matching_members(archive, pattern):
+	r"""
+	Yields the pairs (member, treebank identifier) of the regular files of
+	`archive` whose name (without directories) matches `pattern`, in the order
+	in which they are stored. A member with the same identifier as a previous
+	one is skipped, since both would be written into the same output file.
+	"""
+	identifiers = set()
+	for member in archive:
+		if not member.isfile(): continue
+		if not fnmatch.fnmatchcase(posixpath.basename(member.name), pattern): continue
+		
+		treebank_id = get_treebank_identifier(member.name)
+		if treebank_id in identifiers:
+			tbp_logging.error(f"Member {member.name} of the archive is skipped: there is another treebank with identifier '{treebank_id}'")
+			continue
+		identifiers.add(treebank_id)
+		yield member, treebank_id
+
+class _member_reader(io.RawIOBase):
+	r"""
+	Raw binary stream of a member of an archive read as a stream. The file
+	objects returned by `tarfile.TarFile.extractfile` in stream mode cannot be
+	wrapped directly in an `io.TextIOWrapper` because they fail when asked
+	whether they are seekable.
+	"""
+	
+	def __init__(self, member_file):
+		super().__init__()
+		self.m_member_file = member_file
+	
+	def readable(self):
+		return True
+	
+	def readinto(self, b):
+		data = self.m_member_file.read(len(b))
+		b[:len(data)] = data
+		return len(data)
+
+def _open_member(archive, member):
+	r"""
+	Returns the member `member` of `archive` opened as a text stream.
+	"""
+	return io.TextIOWrapper(io.BufferedReader(_member_reader(archive.extractfile(member))), encoding = "utf-8")
+
+def _parse_member_contents(parser, contents, output_file, args):
+	r"""
+	Parses, in a worker process, the treebank whose contents (the bytes of the
+	member of the archive) are `contents`. See `worker_pool.parse_treebank`.
+	"""
+	with io.TextIOWrapper(io.BytesIO(contents), encoding = "utf-8") as f:
+		return tbp_worker_pool.parse_treebank(parser, f, output_file, args, tbp_worker_pool.get_lal_module())
+
+def parse_treebank_archive(
+	parser,
+	archive_file,
+	output_directory,
+	args,
+	lal_module,
+	pattern = DefaultMemberPattern,
+	workers = 1
+):
+	r"""
+	Parse the treebanks of an archive
+	=================================
+	
+	This function parses the treebanks stored in the members of the tar
+	archive `archive_file` whose names match `pattern`, without extracting
+	them, and stores their head vectors in the directory `output_directory`.
+	
+	Parameters
+	----------
+	
+	- parser: the parser object that will parse each individual treebank
+	- archive_file: the name of the archive, or "-" for the standard input
+	- output_directory: where to store the output files
+	- args: the arguments as parsed by the cli parser
+	- lal_module: the LAL module to use (either debug or release compilations)
+	- pattern: a shell-style pattern (see `fnmatch`) of the names of the
+	members to parse, without directories
+	- workers: the number of worker processes that parse the treebanks
+	
+	Returns the number of treebanks parsed.
+	"""
+	
+	num_treebanks = 0
+	cancelled = False
+	with _open_archive(archive_file) as archive:
+		tbp_logging.info(f"Archive {archive_file} has been opened correctly.")
+		members = _matching_members(archive, pattern)
+		
+		if workers == 1:
+			for member, treebank_id in members:
+				tbp_logging.info(f"Parsing treebank {member.name} of the archive")
+				
+				output_file = output_directory + "/" + treebank_id + ".hv"
+				with _open_member(archive, member) as f:
+					num_sentences = tbp_worker_pool.parse_treebank(parser, f, output_file, args, lal_module)
+				if num_sentences is None:
+					tbp_logging.warning("The output files of the remaining treebanks will not be written.")
+					return num_treebanks
+				
+				num_treebanks += 1
+		
+		else:
+			with tbp_worker_pool.make_pool(workers, lal_module) as pool:
+				
+				# the members sent to the pool, in order, whose parse has not
+				# been waited for
+				pending = collections.deque()
+				
+				for member, treebank_id in members:
+					if tbp_progress.is_cancel_requested():
+						cancelled = True
+						break
+					
+					tbp_logging.info(f"Dispatching treebank {member.name} of the archive")
+					
+					output_file = output_directory + "/" + treebank_id + ".hv"
+					contents = archive.extractfile(member).read()
+					pending.append(pool.apply_async(_parse_member_contents, (parser, contents, output_file, args)))
+					del contents
+					
+					while len(pending) >= 2*workers:
+						if pending.popleft().get() is None: cancelled = True
+						else: num_treebanks += 1
+				
+				while len(pending) > 0:
+					if pending.popleft().get() is None: cancelled = True
+					else: num_treebanks += 1
+				
+				if cancelled:
+					tbp_logging.warning("The output files of the remaining treebanks will not be written.")
+	
+	if num_treebanks == 0 and not cancelled:
+		tbp_logging.warning(f"No member of the archive {archive_file} matches the pattern '{pattern}'")
+	tbp_logging.info(f"Parsed {num_treebanks} treebanks of the archive {archive_file}")
+	return num_treebanks
+
+if __name__ == "__main__":
+	# TESTS
+	tbp_logging.error = lambda msg: None
+	
+	assert( get_treebank_identifier("ud/UD_Catalan-AnCora/ca_ancora-ud-dev.conllu") == "ca_ancora-ud-dev" )
+	assert( get_treebank_identifier("en.conllu") == "en" )
+	
+	# an archive with a directory, two treebanks, a text file and a treebank
+	# with a repeated identifier
+	buffer = io.BytesIO()
+	with tarfile.open(fileobj = buffer, mode = "w|gz") as archive:
+		directory = tarfile.TarInfo("ud/UD_A")
+		directory.type = tarfile.DIRTYPE
+		archive.addfile(directory)
+		for name in ["ud/UD_A/a-ud-test.conllu", "ud/UD_A/README.txt", "ud/UD_B/b-ud-test.conllu", "ud/UD_C/a-ud-test.conllu"]:
+			contents = name.encode("utf-8")
+			info = tarfile.TarInfo(name)
+			info.size = len(contents)
+			archive.addfile(info, io.BytesIO(contents))
+	
+	buffer.seek(0)
+	with tarfile.open(fileobj = buffer, mode = "r|*") as archive:
+		members = []
+		for member, treebank_id in _matching_members(archive, DefaultMemberPattern):
+			with _open_member(archive, member) as f:
+				members.append( (treebank_id, f.read()) )
+	assert( members == [("a-ud-test", "ud/UD_A/a-ud-test.conllu"), ("b-ud-test", "ud/UD_B/b-ud-test.conllu")] )
@@ -33,7 +33,19 @@
 ################################################################################
 
 
+import os
+import copy
+import math
+import time
+
 import treebank_parser.output_log as tbp_logging
+import treebank_parser.output_writer as tbp_output_writer
+import treebank_parser.async_io as tbp_async_io
+import treebank_parser.shared_results as tbp_shared_results
+import treebank_parser.worker_pool as tbp_worker_pool
+from treebank_parser.work_queue import work_queue
+from treebank_parser.checkpoint import checkpoint
+from treebank_parser.generic_parser import SentenceIdsExtension
 
 
 def parse_treebank_collection(
@@ -63,6 +75,26 @@ def parse_treebank_collection(
 	- args: the arguments as parsed by the cli parser.
 	- lal_module: the LAL module to use (either debug or release compilations)
 	"""
+	
+	if getattr(args, "work_queue", False):
+		parse_treebank_collection_queued(
+			parser,
+			treebank_collection_main_file,
+			output_directory,
+			args,
+			lal_module
+		)
+		return
+	
+	if args.consistency_in_sentences and getattr(args, "workers", 1) > 1:
+		parse_treebank_collection_consistently_in_parallel(
+			parser,
+			treebank_collection_main_file,
+			output_directory,
+			args,
+			lal_module
+		)
+		return
 
 	all_parsers = []
 	all_ids = []
@@ -81,15 +113,29 @@ def parse_treebank_collection(
 		treebank_file = tbreader.get_treebank_filename()
 		treebank_id = tbreader.get_treebank_identifier()
 
+		output_file = output_directory + "/" + treebank_id + ".hv"
+		
+		# when resuming, the treebanks whose output is complete (it exists and
+		# there is no checkpoint of it) are not parsed again
+		if (getattr(args, "resume", False) and os.path.exists(output_file) and
+			not checkpoint(output_file).exists()):
+			
+			tbp_logging.info(f"Treebank {treebank_file} was already parsed")
+			tbcolreader.next_treebank()
+			continue
+
 		tbp_logging.info(f"Parsing treebank {treebank_file}")
 
 		p = parser(
 			treebank_file,
-			output_directory + "/" + treebank_id + ".hv",
+			output_file,
 			args,
 			lal_module
 		)
 		p.parse()
+		if p.was_cancelled():
+			tbp_logging.warning("The output files of the remaining treebanks will not be written.")
+			return
 		
 		if not args.consistency_in_sentences:
 			tbp_logging.info(f"Dumping data from treebank {treebank_file}")
@@ -119,3 +165,321 @@ def parse_treebank_collection(
 			p.dump_contents_conditionally(output_sentence)
 
 		pass
+
+def _share_treebank(task):
+	r"""
+	Parses, in a worker process, the treebank file of `task`, a tuple (index,
+	parser, treebank file, output file, args). Returns the tuple (index,
+	descriptor of the head vectors in shared memory, descriptor of the lines
+	of the sentence-ids file), where the first descriptor is None if the parse
+	was cancelled and the second is None if there is no sentence-ids file.
+	See `generic_parser.share_head_vectors`.
+	"""
+	index, parser, treebank_file, output_file, args = task
+	tbp_logging.info(f"Parsing treebank {treebank_file}")
+	
+	p = parser(treebank_file, output_file, args, tbp_worker_pool.get_lal_module())
+	p.parse()
+	if p.was_cancelled():
+		return index, None, None
+	return index, p.share_head_vectors(), p.share_sentence_ids()
+
+def _make_output_writer(output_file, args, **kwargs):
+	r"""
+	Returns an `output_writer` of the file `output_file` configured with the
+	buffer size and the fsync policy in `args`, wrapped in a
+	`write_behind_writer` with asynchronous I/O, like
+	`generic_parser._make_output_writer`.
+	"""
+	buffer_size = getattr(args, "output_buffer_size", tbp_output_writer.DefaultBufferSize)
+	writer = tbp_output_writer.output_writer(
+		output_file,
+		buffer_size = buffer_size,
+		fsync = getattr(args, "fsync", tbp_output_writer.FsyncClose),
+		**kwargs
+	)
+	if getattr(args, "async_io", False):
+		writer = tbp_async_io.write_behind_writer(
+			writer,
+			buffer_size,
+			getattr(args, "io_queue_size", tbp_async_io.DefaultQueueSize)
+		)
+	return writer
+
+def parse_treebank_collection_consistently_in_parallel(
+	parser,
+	treebank_collection_main_file,
+	output_directory,
+	args,
+	lal_module
+):
+	r"""
+	Parse a treebank collection in parallel keeping consistency
+	===========================================================
+	
+	This function parses a treebank collection like `parse_treebank_collection`
+	with `args.consistency_in_sentences`, but the treebanks are parsed by a
+	pool of `args.workers` worker processes, from the largest to the smallest.
+	
+	The workers do not send the head vectors back: they store them in shared
+	memory (see module `shared_results`), and only the descriptors of the
+	blocks of shared memory are sent. Once all treebanks are parsed, the
+	sentences kept in all of them are found, and their head vectors are copied
+	from shared memory into the output files.
+	
+	The parameters are the same as those of `parse_treebank_collection`.
+	"""
+	
+	treebanks = _read_treebank_collection(treebank_collection_main_file, lal_module)
+	if treebanks is None: return
+	if len(treebanks) == 0: return
+	
+	tasks = [
+		(index, parser, treebank_file, output_directory + "/" + treebank_id + ".hv", args)
+		for (index, (treebank_file, treebank_id)) in enumerate(treebanks)
+	]
+	tasks.sort(key = lambda task: -os.path.getsize(task[2]))
+	
+	all_results = [None]*len(treebanks)
+	all_ids = [None]*len(treebanks)
+	try:
+		cancelled = False
+		with tbp_worker_pool.make_pool(min(args.workers, len(tasks)), lal_module) as pool:
+			for (index, descriptor, ids_descriptor) in pool.imap_unordered(_share_treebank, tasks):
+				if ids_descriptor is not None:
+					all_ids[index] = tbp_shared_results.shared_results(ids_descriptor)
+				if descriptor is None:
+					cancelled = True
+					break
+				all_results[index] = tbp_shared_results.shared_results(descriptor)
+		
+		if cancelled:
+			tbp_logging.warning("The output files of the treebanks will not be written.")
+			return
+		
+		total_num_sentences = [results.get_num_sentences() for results in all_results]
+		if len(set(total_num_sentences)) != 1:
+			tbp_logging.error("Number of sentences parsed is different among the treebank files")
+			for ((_, id), num_sents) in zip(treebanks, total_num_sentences):
+				print(f"Treebank {id} contains {num_sents} sentences")
+		
+		# a sentence is written if it was kept in all treebanks: since the flags
+		# are bytes 0 or 1, they are combined as the bits of big integers
+		num_sents = total_num_sentences[0]
+		output_sentence = int.from_bytes(all_results[0].get_flags(), "little")
+		for results in all_results[1:]:
+			output_sentence &= int.from_bytes(results.get_flags()[:num_sents].ljust(num_sents, b"\0"), "little")
+		output_sentence = output_sentence.to_bytes(num_sents, "little")
+		
+		buffer_size = getattr(args, "output_buffer_size", tbp_output_writer.DefaultBufferSize)
+		for ((_, _, treebank_file, output_file, _), results, ids) in zip(sorted(tasks, key = lambda task: task[0]), all_results, all_ids):
+			tbp_logging.info(f"Dumping data from treebank {treebank_file}")
+			# the sentence-ids file is written first, as in `dump_contents`
+			if ids is not None:
+				with _make_output_writer(output_file + SentenceIdsExtension, args, encoding = "utf-8") as w:
+					ids.write_conditionally(w, output_sentence, buffer_size)
+			with _make_output_writer(output_file, args) as w:
+				results.write_conditionally(w, output_sentence, buffer_size)
+	
+	finally:
+		for results in all_results + all_ids:
+			if results is not None:
+				results.close()
+
+def _read_treebank_collection(treebank_collection_main_file, lal_module):
+	r"""
+	Returns the list of pairs (treebank file, treebank id) of the treebank
+	collection, or None if the main file could not be read.
+	"""
+	tbcolreader = lal_module.io.treebank_collection_reader()
+	error = tbcolreader.init(treebank_collection_main_file)
+	
+	if error.is_error():
+		tbp_logging.critical(error.get_error_message())
+		return None
+	
+	treebanks = []
+	while not tbcolreader.end():
+		tbreader = tbcolreader.get_treebank_reader()
+		treebanks.append( (tbreader.get_treebank_filename(), tbreader.get_treebank_identifier()) )
+		tbcolreader.next_treebank()
+	return treebanks
+
+def _split_by_cost(costs, num_chunks):
+	r"""
+	Splits the sentences whose estimated costs are `costs` into at most
+	`num_chunks` ranges of consecutive sentences of similar total cost. Returns
+	the list of ranges `(first, last, cost)` of sentence numbers (starting at
+	1), where `cost` is the total cost of the range.
+	
+	Every range takes the sentences until its cost reaches the average cost of
+	the remaining ranges, so that a very costly sentence does not leave the
+	next ranges too small.
+	"""
+	ranges = []
+	remaining_cost = sum(costs)
+	remaining_chunks = num_chunks
+	first = 1
+	cost = 0
+	for (i, c) in enumerate(costs, start = 1):
+		cost += c
+		if remaining_chunks > 1 and cost >= remaining_cost/remaining_chunks:
+			ranges.append( (first, i, cost) )
+			remaining_cost -= cost
+			remaining_chunks -= 1
+			first = i + 1
+			cost = 0
+	
+	if first <= len(costs):
+		ranges.append( (first, len(costs), cost) )
+	return ranges
+
+def _make_queue_tasks(parser, treebanks, args, lal_module):
+	r"""
+	Makes the tasks of the work queue: one task per treebank or, if
+	`args.chunk_sentences` is positive, one task per range of sentences of each
+	treebank. Treebanks of `n` sentences are split into `ceil(n/chunk_sentences)`
+	ranges of similar estimated cost (see `action_plan.estimate_cost`), rather
+	than of the same number of sentences.
+	
+	The cost of every task (its estimated cost, or the size of the treebank
+	file when treebanks are not split) is stored in the key "cost", and the
+	point of the treebank file where its first sentence starts (see
+	`generic_parser.get_sentence_start`) in the key "start", so that the task
+	does not read the treebank file from the beginning.
+	"""
+	chunk_sentences = getattr(args, "chunk_sentences", 0)
+	
+	tasks = []
+	for (treebank_file, treebank_id) in treebanks:
+		if chunk_sentences == 0:
+			tasks.append({
+				"name": treebank_id,
+				"treebank_id": treebank_id,
+				"treebank_file": treebank_file,
+				"first": None,
+				"last": None,
+				"start": None,
+				"cost": os.path.getsize(treebank_file)
+			})
+			continue
+		
+		p = parser(treebank_file, None, args, lal_module)
+		costs = p.estimate_sentence_costs()
+		num_chunks = max(1, math.ceil(len(costs)/chunk_sentences))
+		ranges = _split_by_cost(costs, num_chunks)
+		if len(ranges) == 0:
+			ranges = [(1, chunk_sentences, 0)]
+		tbp_logging.info(f"Treebank {treebank_file} has {len(costs)} sentences: {len(ranges)} chunks")
+		
+		for (j, (first, last, cost)) in enumerate(ranges):
+			tasks.append({
+				"name": f"{treebank_id}.{j:06d}",
+				"treebank_id": treebank_id,
+				"treebank_file": treebank_file,
+				"first": first,
+				"last": last,
+				"start": p.get_sentence_start(first),
+				"cost": cost
+			})
+	return tasks
+
+def parse_treebank_collection_queued(
+	parser,
+	treebank_collection_main_file,
+	output_directory,
+	args,
+	lal_module
+):
+	r"""
+	Parse a treebank collection with a work queue
+	=============================================
+	
+	This function parses a treebank collection like `parse_treebank_collection`,
+	but it can be run by several processes at the same time, possibly on
+	different machines that share the output directory. The processes claim
+	the treebanks (or ranges of `args.chunk_sentences` sentences of them) from a
+	work queue in the output directory (see `treebank_parser.work_queue`), and
+	merge the partial outputs into the files `<id>.hv` when all the parts of a
+	treebank are finished. The function returns when all treebanks are merged.
+	
+	A process that crashes holds its tasks until its leases expire (see
+	`args.lease_timeout`); then, the tasks are claimed by another process.
+	
+	Every process saves the number of tasks it processed, their estimated cost
+	and the time it spent processing them. At the end, the utilisation of every
+	process known so far (the fraction of time it was busy) is logged.
+	
+	The parameters are the same as those of `parse_treebank_collection`.
+	"""
+	
+	treebanks = _read_treebank_collection(treebank_collection_main_file, lal_module)
+	if treebanks is None: return
+	
+	lease_timeout = getattr(args, "lease_timeout", 600)
+	poll_interval = min(5, lease_timeout/4)
+	
+	queue = work_queue(output_directory, lease_timeout)
+	try:
+		begin = time.perf_counter()
+		stats = {"tasks": 0, "cost": 0, "busy": 0.0, "elapsed": 0.0}
+		
+		tasks = queue.get_plan(lambda: _make_queue_tasks(parser, treebanks, args, lal_module))
+		tbp_logging.info(f"The work queue has {len(tasks)} tasks")
+		
+		while not queue.all_done():
+			task = queue.claim()
+			if task is None:
+				# the remaining tasks are held by other processes
+				queue.merge()
+				time.sleep(poll_interval)
+				continue
+			
+			tbp_logging.info(f"Parsing task {task['name']} of treebank {task['treebank_file']}")
+			
+			task_args = copy.copy(args)
+			if task["first"] is not None:
+				task_args.sentence_range = (task["first"], task["last"])
+				task_args.input_start = task.get("start")
+			
+			output_file = queue.get_temporary_output(task)
+			task_begin = time.perf_counter()
+			try:
+				p = parser(task["treebank_file"], output_file, task_args, lal_module)
+				p.parse()
+				if p.was_cancelled():
+					tbp_logging.warning("The remaining tasks will not be processed.")
+					queue.abandon(task)
+					return
+				p.dump_contents()
+			except BaseException:
+				queue.abandon(task)
+				raise
+			
+			queue.complete(task, output_file)
+			
+			stats["tasks"] += 1
+			stats["cost"] += task.get("cost", 0)
+			stats["busy"] += time.perf_counter() - task_begin
+			stats["elapsed"] = time.perf_counter() - begin
+			queue.save_stats(stats)
+		
+		queue.merge()
+		
+		stats["elapsed"] = time.perf_counter() - begin
+		queue.save_stats(stats)
+		for (owner, s) in queue.get_stats().items():
+			utilisation = 100*s["busy"]/s["elapsed"] if s["elapsed"] > 0 else 0
+			tbp_logging.info(f"Process {owner}: {s['tasks']} tasks (estimated cost {s['cost']:.0f}), busy {s['busy']:.3f} s of {s['elapsed']:.3f} s ({utilisation:.1f}%)")
+	
+	finally:
+		queue.close()
+
+if __name__ == "__main__":
+	# TESTS
+	assert( _split_by_cost([], 3) == [] )
+	assert( _split_by_cost([1, 1, 1, 1], 1) == [(1, 4, 4)] )
+	assert( _split_by_cost([1, 1, 1, 1], 2) == [(1, 2, 2), (3, 4, 2)] )
+	# a costly sentence takes a whole range
+	assert( _split_by_cost([1, 10, 1, 1, 1, 1], 3) == [(1, 2, 11), (3, 4, 2), (5, 6, 2)] )
+	assert( _split_by_cost([10, 1, 1, 1, 1, 1, 1], 3) == [(1, 1, 10), (2, 4, 3), (5, 7, 3)] )
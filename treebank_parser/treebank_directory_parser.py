@@ -0,0 +1,194 @@
+######################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+######################################################################
+
+r"""
+Parse the treebanks of a directory
+==================================
+
+This module parses all the treebank files found in a directory and its
+subdirectories whose names match a pattern, without a treebank collection main
+file. The head vectors of the file `<dir>/<name>.<ext>` (relative to the input
+directory) are written into the file `<dir>/<name>.hv` relative to the output
+directory, so that the output mirrors the structure of the input.
+
+With several workers, the files are parsed by a pool of worker processes. They
+are handed out from the largest to the smallest, so that the largest files do
+not start last and keep a single worker busy after the others have finished.
+"""
+
+import os
+import fnmatch
+
+import treebank_parser.output_log as tbp_logging
+import treebank_parser.worker_pool as tbp_worker_pool
+from treebank_parser.checkpoint import checkpoint
+
+# pattern of the names of the files parsed by default
+DefaultPattern = "*.conllu"
+
+def find_treebank_files(directory, pattern = DefaultPattern):
+	r"""
+	Returns the list of the files in `directory` and its subdirectories whose
+	names match the shell-style pattern `pattern` (see `fnmatch`), as pairs
+	(file name, file name relative to `directory`), from the largest to the
+	smallest file. Files of the same size are sorted by their relative name.
+	"""
+	files = []
+	for root, dirnames, filenames in os.walk(directory):
+		dirnames.sort()
+		for name in sorted(filenames):
+			if not fnmatch.fnmatchcase(name, pattern): continue
+			
+			filename = os.path.join(root, name)
+			files.append( (os.path.getsize(filename), filename, os.path.relpath(filename, directory)) )
+	
+	files.sort(key = lambda f: (-f[0], f[2]))
+	return [(filename, relative_name) for (_, filename, relative_name) in files]
+
+def get_output_file(output_directory, relative_name):
+	r"""
+	Returns the name of the output file of the treebank file `relative_name`
+	(relative to the input directory) in `output_directory`.
+	"""
+	return os.path.join(output_directory, os.path.splitext(relative_name)[0] + ".hv")
+
+def _parse_file(task):
+	r"""
+	Parses, in a worker process, the treebank file of `task`, a tuple (parser,
+	input file, output file, args). Returns the pair (input file, number of
+	sentences parsed), where the number of sentences is None if the parse was
+	cancelled. See `worker_pool.parse_treebank`.
+	"""
+	parser, input_file, output_file, args = task
+	tbp_logging.info(f"Parsing treebank {input_file}")
+	num_sentences = tbp_worker_pool.parse_treebank(parser, input_file, output_file, args, tbp_worker_pool.get_lal_module())
+	return input_file, num_sentences
+
+def parse_treebank_directory(
+	parser,
+	directory,
+	output_directory,
+	args,
+	lal_module,
+	pattern = DefaultPattern,
+	workers = 1
+):
+	r"""
+	Parse the treebanks of a directory
+	==================================
+	
+	This function parses the treebank files in `directory` and its
+	subdirectories whose names match `pattern`, and stores their head vectors
+	in `output_directory`, with the same structure of subdirectories (which are
+	made if needed).
+	
+	Parameters
+	----------
+	
+	- parser: the parser object that will parse each individual treebank
+	- directory: the directory where the treebank files are searched
+	- output_directory: where to store the output files
+	- args: the arguments as parsed by the cli parser
+	- lal_module: the LAL module to use (either debug or release compilations)
+	- pattern: a shell-style pattern (see `fnmatch`) of the names of the files
+	to parse, without directories
+	- workers: the number of worker processes that parse the treebanks
+	
+	Returns the number of treebanks parsed.
+	"""
+	
+	files = find_treebank_files(directory, pattern)
+	if len(files) == 0:
+		tbp_logging.warning(f"No file in {directory} matches the pattern '{pattern}'")
+		return 0
+	
+	tasks = []
+	for (input_file, relative_name) in files:
+		output_file = get_output_file(output_directory, relative_name)
+		
+		# when resuming, the treebanks whose output is complete (it exists and
+		# there is no checkpoint of it) are not parsed again
+		if (getattr(args, "resume", False) and os.path.exists(output_file) and
+			not checkpoint(output_file).exists()):
+			
+			tbp_logging.info(f"Treebank {input_file} was already parsed")
+			continue
+		
+		os.makedirs(os.path.dirname(output_file), exist_ok = True)
+		tasks.append( (parser, input_file, output_file, args) )
+	
+	tbp_logging.info(f"Found {len(files)} treebank files in {directory}: {len(tasks)} to be parsed")
+	
+	num_treebanks = 0
+	if workers == 1 or len(tasks) <= 1:
+		for (parser, input_file, output_file, args) in tasks:
+			tbp_logging.info(f"Parsing treebank {input_file}")
+			if tbp_worker_pool.parse_treebank(parser, input_file, output_file, args, lal_module) is None:
+				tbp_logging.warning("The output files of the remaining treebanks will not be written.")
+				return num_treebanks
+			num_treebanks += 1
+		return num_treebanks
+	
+	with tbp_worker_pool.make_pool(min(workers, len(tasks)), lal_module) as pool:
+		for (input_file, num_sentences) in pool.imap_unordered(_parse_file, tasks):
+			if num_sentences is None:
+				tbp_logging.warning("The output files of the remaining treebanks will not be written.")
+				break
+			tbp_logging.info(f"Finished treebank {input_file}: {num_sentences} sentences")
+			num_treebanks += 1
+	
+	return num_treebanks
+
+if __name__ == "__main__":
+	# TESTS
+	import tempfile
+	
+	with tempfile.TemporaryDirectory() as directory:
+		for (name, size) in [("a/x.conllu", 10), ("a/b/y.conllu", 30), ("z.conllu", 20), ("a/w.conllu", 20), ("a/readme.txt", 100)]:
+			os.makedirs(os.path.dirname(os.path.join(directory, name)), exist_ok = True)
+			with open(os.path.join(directory, name), 'w') as f:
+				f.write("x"*size)
+		
+		files = find_treebank_files(directory)
+		assert( [relative_name for (_, relative_name) in files] == [
+			os.path.join("a", "b", "y.conllu"),
+			os.path.join("a", "w.conllu"),
+			"z.conllu",
+			os.path.join("a", "x.conllu")
+		] )
+		assert( files[0][0] == os.path.join(directory, "a", "b", "y.conllu") )
+		
+		assert( len(find_treebank_files(directory, "*.txt")) == 1 )
+	
+	assert( get_output_file("out", os.path.join("a", "b", "y.conllu")) == os.path.join("out", "a", "b", "y.hv") )
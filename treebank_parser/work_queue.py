@@ -0,0 +1,425 @@
+######################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+######################################################################
+
+r"""
+A work queue made of plain files in a (possibly shared) directory.
+
+This module contains a single class `work_queue`, which lets several independent
+processes, possibly running on different machines that share a filesystem such
+as NFS, split among themselves the parsing of a treebank collection without any
+other means of communication.
+
+The queue directory contains the following files:
+
+- `plan.json`: the list of tasks. Every task is a treebank or a range of
+sentences of a treebank. It is made by the first process that obtains the
+lease `plan.lease`.
+
+- `<task>.lease`: the lease of a task, created with `O_EXCL` by the process that
+claims the task. Its modification time is refreshed while the task is being
+processed. A lease that has not been refreshed for `lease_timeout` seconds is
+considered expired (its owner crashed) and the task can be claimed again.
+
+- `<task>.hv`: the output of a finished task. It is written into a temporary
+file and then renamed, so that it either exists completely or not at all.
+
+- `<treebank id>.merged`: created after all the outputs of the tasks of a
+treebank have been merged into the file `<treebank id>.hv` of the output
+directory. The outputs of the tasks are then removed.
+
+- `<process>.stats.json`: the statistics of the work done by a process (see
+`save_stats`).
+
+Tasks may have an estimated cost (key "cost"): the costliest unfinished tasks
+are claimed first, so that they do not start last and keep a single process
+busy after the others have finished.
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+
+import treebank_parser.output_log as tbp_logging
+
+class work_queue:
+	r"""
+	A work queue in the directory `<output directory>/.queue`.
+	"""
+	
+	def _path(self, name):
+		return os.path.join(self.m_queue_dir, name)
+	
+	def _write_atomically(self, filename, contents):
+		r"""
+		Writes `contents` into `filename` through a temporary file that is
+		renamed at the end.
+		"""
+		tmp = f"{filename}.tmp.{self.m_owner}"
+		with open(tmp, 'w') as f:
+			f.write(contents)
+			f.flush()
+			os.fsync(f.fileno())
+		os.replace(tmp, filename)
+	
+	def _try_lease(self, lease):
+		r"""
+		Tries to obtain the lease file `lease`. Returns whether or not the lease
+		was obtained.
+		"""
+		try:
+			fd = os.open(lease, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+		except FileExistsError:
+			pass
+		else:
+			with os.fdopen(fd, 'w') as f:
+				f.write(f"{self.m_owner}\n")
+			return True
+		
+		# the lease exists: take it over if it has expired
+		try:
+			age = time.time() - os.stat(lease).st_mtime
+		except FileNotFoundError:
+			return False
+		if age < self.m_lease_timeout:
+			return False
+		
+		# only one process can rename the expired lease
+		stale = f"{lease}.stale.{self.m_owner}"
+		try:
+			os.rename(lease, stale)
+		except FileNotFoundError:
+			return False
+		
+		# another process may have renewed the lease in the meantime, in which
+		# case it is given back. Should this fail, the task is processed twice,
+		# which is harmless since outputs are written atomically.
+		if time.time() - os.stat(stale).st_mtime < self.m_lease_timeout:
+			os.rename(stale, lease)
+			return False
+		
+		tbp_logging.warning(f"Lease '{lease}' expired {age:.0f} s ago. Claiming it again.")
+		os.remove(stale)
+		return self._try_lease(lease)
+	
+	def _refresh_leases(self):
+		r"""
+		Refreshes the modification time of the leases held by this process
+		until the queue is closed.
+		"""
+		while not self.m_closed.wait(self.m_lease_timeout / 4):
+			with self.m_lock:
+				leases = list(self.m_leases)
+			for lease in leases:
+				try:
+					os.utime(lease)
+				except FileNotFoundError:
+					pass
+	
+	def _acquire(self, lease):
+		if not self._try_lease(lease): return False
+		with self.m_lock:
+			self.m_leases.add(lease)
+		return True
+	
+	def _release(self, lease):
+		with self.m_lock:
+			self.m_leases.discard(lease)
+		try:
+			os.remove(lease)
+		except FileNotFoundError:
+			pass
+	
+	def __init__(self, output_directory, lease_timeout = 600):
+		r"""
+		Opens (or creates) the queue in `output_directory`. Leases that have
+		not been refreshed in `lease_timeout` seconds are considered expired.
+		"""
+		self.m_output_dir = output_directory
+		self.m_queue_dir = os.path.join(output_directory, ".queue")
+		os.makedirs(self.m_queue_dir, exist_ok = True)
+		
+		self.m_lease_timeout = lease_timeout
+		# identity of this process among all processes of all machines
+		self.m_owner = f"{socket.gethostname()}.{os.getpid()}"
+		
+		# the tasks in the plan, and the same tasks in the order in which
+		# they are claimed
+		self.m_tasks = None
+		self.m_claim_order = None
+		
+		# leases held by this process, refreshed by a background thread
+		self.m_leases = set()
+		self.m_lock = threading.Lock()
+		self.m_closed = threading.Event()
+		self.m_refresher = threading.Thread(target = self._refresh_leases, daemon = True)
+		self.m_refresher.start()
+	
+	def close(self):
+		r"""
+		Stops refreshing the leases held by this process.
+		"""
+		self.m_closed.set()
+		self.m_refresher.join()
+	
+	def get_plan(self, make_tasks, poll_interval = 1):
+		r"""
+		Returns the list of tasks of the queue. If the plan does not exist yet,
+		one process makes it by calling `make_tasks()`, which must return a list
+		of tasks; the other processes wait for it.
+		
+		Every task is a dictionary with, at least, the keys "name" (unique among
+		all tasks, and usable as a file name) and "treebank_id".
+		"""
+		plan = self._path("plan.json")
+		lease = self._path("plan.lease")
+		while not os.path.exists(plan):
+			if self._acquire(lease):
+				if not os.path.exists(plan):
+					tbp_logging.info("Making the plan of the work queue")
+					self._write_atomically(plan, json.dumps(make_tasks()))
+				self._release(lease)
+			else:
+				time.sleep(poll_interval)
+		
+		with open(plan, 'r') as f:
+			self.m_tasks = json.load(f)
+		self.m_claim_order = sorted(self.m_tasks, key = lambda task: -task.get("cost", 0))
+		return self.m_tasks
+	
+	def is_done(self, task):
+		r"""
+		Returns whether or not the output of `task` exists, or has already been
+		merged (see `merge`).
+		"""
+		return (os.path.exists(self.get_output(task)) or
+			os.path.exists(self._path(task["treebank_id"] + ".merged")))
+	
+	def get_output(self, task):
+		r"""
+		Returns the name of the output file of `task`.
+		"""
+		return self._path(task["name"] + ".hv")
+	
+	def claim(self):
+		r"""
+		Claims an unfinished task that no other (live) process holds, the one
+		with the highest cost. Returns the task, or None if there is none
+		right now.
+		"""
+		for task in self.m_claim_order:
+			if self.is_done(task): continue
+			lease = self._path(task["name"] + ".lease")
+			if not self._acquire(lease): continue
+			if self.is_done(task):
+				# another process finished it in the meantime
+				self._release(lease)
+				continue
+			return task
+		return None
+	
+	def complete(self, task, output_file):
+		r"""
+		Marks `task` as finished: its output, written by the caller into the
+		file `output_file`, is renamed into the output of the task (or removed,
+		if another process finished the task and it has been merged already).
+		"""
+		if os.path.exists(self._path(task["treebank_id"] + ".merged")):
+			os.remove(output_file)
+		else:
+			os.replace(output_file, self.get_output(task))
+		self._release(self._path(task["name"] + ".lease"))
+	
+	def abandon(self, task):
+		r"""
+		Gives up `task` so that another process can claim it.
+		"""
+		self._release(self._path(task["name"] + ".lease"))
+	
+	def get_temporary_output(self, task):
+		r"""
+		Returns the name of a temporary file, unique to this process, where
+		to write the output of `task`.
+		"""
+		return self._path(f"{task['name']}.hv.tmp.{self.m_owner}")
+	
+	def save_stats(self, stats):
+		r"""
+		Saves the statistics `stats` (a dictionary) of the work done by this
+		process, so that every process can read them (see `get_stats`).
+		"""
+		self._write_atomically(self._path(f"{self.m_owner}.stats.json"), json.dumps(stats))
+	
+	def get_stats(self):
+		r"""
+		Returns a dictionary with the statistics saved so far by every process
+		(see `save_stats`), indexed by the identity of the process.
+		"""
+		all_stats = {}
+		for name in sorted(os.listdir(self.m_queue_dir)):
+			if not name.endswith(".stats.json"): continue
+			try:
+				with open(self._path(name), 'r') as f:
+					all_stats[name[:-len(".stats.json")]] = json.load(f)
+			except (OSError, ValueError):
+				pass
+		return all_stats
+	
+	def get_owner(self):
+		r"""
+		Returns the identity of this process among all processes.
+		"""
+		return self.m_owner
+	
+	def all_done(self):
+		r"""
+		Returns whether or not all tasks are finished.
+		"""
+		return all(map(self.is_done, self.m_tasks))
+	
+	def merge(self):
+		r"""
+		Merges the outputs of the tasks of every treebank whose tasks are all
+		finished into the file `<treebank id>.hv` of the output directory. The
+		outputs are concatenated in the order of the tasks in the plan, and
+		then removed.
+		"""
+		treebank_tasks = {}
+		for task in self.m_tasks:
+			treebank_tasks.setdefault(task["treebank_id"], []).append(task)
+		
+		for treebank_id, tasks in treebank_tasks.items():
+			merged = self._path(treebank_id + ".merged")
+			if os.path.exists(merged): continue
+			if not all(map(self.is_done, tasks)): continue
+			
+			final = os.path.join(self.m_output_dir, treebank_id + ".hv")
+			tmp = os.path.join(self.m_output_dir, f".{treebank_id}.hv.tmp.{self.m_owner}")
+			try:
+				with open(tmp, 'w') as out:
+					for task in tasks:
+						with open(self.get_output(task), 'r') as f:
+							out.write(f.read())
+			except FileNotFoundError:
+				# another process merged the treebank in the meantime
+				os.remove(tmp)
+				if os.path.exists(merged): continue
+				raise
+			os.replace(tmp, final)
+			self._write_atomically(merged, "")
+			for task in tasks:
+				try:
+					os.remove(self.get_output(task))
+				except FileNotFoundError:
+					pass
+			tbp_logging.info(f"Merged the output of treebank {treebank_id} into {final}")
+
+if __name__ == "__main__":
+	# TESTS
+	import tempfile
+	
+	with tempfile.TemporaryDirectory() as directory:
+		tasks = [
+			{"name": "a.0", "treebank_id": "a", "cost": 2},
+			{"name": "a.1", "treebank_id": "a", "cost": 2},
+			{"name": "b.0", "treebank_id": "b", "cost": 1},
+		]
+		
+		queue1 = work_queue(directory, lease_timeout = 1)
+		queue2 = work_queue(directory, lease_timeout = 1)
+		queue2.m_owner += ".2"
+		assert( queue1.get_plan(lambda: tasks) == tasks )
+		assert( queue2.get_plan(lambda: []) == tasks )
+		
+		t1 = queue1.claim()
+		t2 = queue2.claim()
+		assert( t1["name"] == "a.0" )
+		assert( t2["name"] == "a.1" )
+		
+		# a crashed process: its lease expires and the task is claimed again
+		queue2.close()
+		queue2.m_leases.clear()
+		time.sleep(1.5)
+		assert( queue1.claim()["name"] == "a.1" )
+		
+		for task, contents in [(t1, "0 1\n"), (t2, "2 0\n")]:
+			tmp = queue1.get_temporary_output(task)
+			with open(tmp, 'w') as f: f.write(contents)
+			queue1.complete(task, tmp)
+		
+		queue1.merge()
+		with open(os.path.join(directory, "a.hv")) as f:
+			assert( f.read() == "0 1\n2 0\n" )
+		# the merged outputs are removed, and their tasks are still finished
+		assert( not os.path.exists(queue1.get_output(t1)) )
+		assert( queue1.is_done(t1) and queue1.is_done(t2) )
+		assert( not os.path.exists(os.path.join(directory, "b.hv")) )
+		assert( not queue1.all_done() )
+		
+		t3 = queue1.claim()
+		assert( t3["name"] == "b.0" )
+		assert( queue1.claim() is None )
+		tmp = queue1.get_temporary_output(t3)
+		with open(tmp, 'w') as f: f.write("")
+		queue1.complete(t3, tmp)
+		assert( queue1.all_done() )
+		queue1.merge()
+		assert( os.path.exists(os.path.join(directory, "b.hv")) )
+		assert( queue1.all_done() )
+		assert( sorted(name for name in os.listdir(queue1.m_queue_dir) if name.endswith(".hv")) == [] )
+		
+		queue1.save_stats({"tasks": 3})
+		assert( queue1.get_stats() == {queue1.get_owner(): {"tasks": 3}} )
+		queue1.close()
+	
+	# the costliest tasks are claimed first, but merged in the order of the plan
+	with tempfile.TemporaryDirectory() as directory:
+		tasks = [
+			{"name": "a.0", "treebank_id": "a", "cost": 1},
+			{"name": "a.1", "treebank_id": "a", "cost": 5},
+		]
+		queue = work_queue(directory)
+		queue.get_plan(lambda: tasks)
+		t1 = queue.claim()
+		t2 = queue.claim()
+		assert( (t1["name"], t2["name"]) == ("a.1", "a.0") )
+		for task in [t1, t2]:
+			tmp = queue.get_temporary_output(task)
+			with open(tmp, 'w') as f: f.write(task["name"] + "\n")
+			queue.complete(task, tmp)
+		queue.merge()
+		with open(os.path.join(directory, "a.hv")) as f:
+			assert( f.read() == "a.0\na.1\n" )
+		queue.close()
@@ -0,0 +1,93 @@
+######################################################################
+#
+#   Treebank parser -- A small application that parses a treebank and converts
+#   it into a collection of head vectors.
+#
+#   Copyright (C) 2021 - 2024
+#
+#   This file is part of Linear Arrangement Library. To see the full code
+#   visit the webpage:
+#       https://github.com/LAL-project/treebank-parser.git
+#
+#   treebank-parser is free software: you can redistribute it
+#   and/or modify it under the terms of the GNU Affero General Public License
+#   as published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   treebank-parser is distributed in the hope that it will be
+#   useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with Linear Arrangement Library.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Contact:
+#
+#       Lluís Alemany Puig (lluis.alemany.puig@upc.edu)
+#           LQMC (Lingüística Quantitativa, Matemàtica i Computacional)
+#           Webpage: https://lqmc.upc.edu/
+#           Jordi Girona St 1-3, Campus Nord UPC, 08034 Barcelona.   CATALONIA, SPAIN
+#           Webpage: https://cqllab.upc.edu/people/lalemany/
+#
+######################################################################
+
+r"""
+This file defines the pool of worker processes that parse several treebank
+files in parallel (the members of an archive, the files of a directory, ...).
+
+Every worker process loads the LAL module once, when it starts, and logs its
+messages with the same functions as the process that made the pool.
+"""
+
+import importlib
+import multiprocessing
+
+import treebank_parser.output_log as tbp_logging
+
+# the LAL module used by the treebanks parsed in this (worker) process
+_lal_module = None
+
+def _init_worker(lal_module_name, log_functions):
+	r"""
+	Initialises a worker process of the pool: loads the LAL module once and
+	uses the logging functions `log_functions`.
+	"""
+	global _lal_module
+	_lal_module = importlib.import_module(lal_module_name)
+	(tbp_logging.info, tbp_logging.debug, tbp_logging.warning,
+		tbp_logging.error, tbp_logging.critical) = log_functions
+
+def get_lal_module():
+	r"""
+	Returns the LAL module loaded by this worker process.
+	"""
+	return _lal_module
+
+def make_pool(workers, lal_module):
+	r"""
+	Returns a pool of `workers` worker processes that use the LAL module
+	`lal_module`.
+	"""
+	log_functions = (tbp_logging.info, tbp_logging.debug, tbp_logging.warning,
+		tbp_logging.error, tbp_logging.critical)
+	
+	return multiprocessing.Pool(
+		processes = workers,
+		initializer = _init_worker,
+		initargs = (lal_module.__name__, log_functions)
+	)
+
+def parse_treebank(parser, input_file, output_file, args, lal_module):
+	r"""
+	Parses the treebank `input_file` (a file name or a text stream) with a new
+	object of the class `parser` and writes its head vectors into `output_file`.
+	Returns the number of sentences parsed, or None if the parse was cancelled
+	(and nothing was written).
+	"""
+	p = parser(input_file, output_file, args, lal_module)
+	p.parse()
+	if p.was_cancelled():
+		return None
+	p.dump_contents()
+	return p.get_num_sentences()